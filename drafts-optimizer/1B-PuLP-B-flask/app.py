@@ -6,7 +6,16 @@ Provides a user interface for defining variables, setting constraints, and runni
 
 Features:
 - Add, import, export, and download optimization variables.
-- Set budget constraints and maximize profit.
+- Paginated, sortable, filterable JSON listing of variables for the lazily loaded table.
+- Bulk JSON endpoint applying many add/update/delete operations atomically (e.g. nightly price syncs).
+- Set budget constraints and maximize profit, optionally under a time limit or gap tolerance
+  (the best solution found is shown with its bound and gap). Solutions are streamed to the
+  page as they improve, so greedy-first mode shows the greedy solution immediately.
+- Exact solves also record the budget and profit ranges over which the result stays optimal;
+  re-running after an edit inside those ranges is answered without calling the solver.
+- Structured JSON log line per solve and Prometheus metrics at /metrics (see telemetry.py).
+- Variables and budget live in a shared SQLite store, so several worker processes
+  (e.g. Gunicorn, see wsgi.py) serve consistent state.
 - Clean separation of concerns (web UI, optimization logic, configuration).
 
 @author: Mafu
@@ -18,25 +27,44 @@ import json
 import threading
 import time
 import webbrowser
-from typing import Tuple, Dict, Any, Optional
-from flask import Flask, render_template, request, flash, redirect, url_for, send_file
+from typing import Tuple, Dict, Any, Iterator, Optional
+from flask import (Blueprint, Flask, Response, current_app, g, render_template, request, flash,
+                   redirect, url_for, send_file, jsonify, stream_with_context)
 from werkzeug.utils import secure_filename
-from optimizer_core import (
-    IntegerVariable, create_integer_variable, optimize, variables_list,
-    clear_variables, OptimizationError
-)
+import optimizer_core
+from optimizer_core import (IntegerVariable, Sensitivity, SolveResult, iter_solutions, sensitivity_analysis,
+                            OptimizationError, enable_solve_cache)
+from state_store import StateStore, BulkOperationError
+from telemetry import MetricsRegistry, Telemetry, configure_logger
 from config import Config
 
+bp = Blueprint('main', __name__)
+
 def create_app(config_class=Config) -> Flask:
     """Create and configure the Flask application."""
     app = Flask(__name__)
     app.config.from_object(config_class)
     config_class.init_app(app)
-    
+    if app.config.get('SOLVE_CACHE_PATH'):
+        enable_solve_cache(app.config['SOLVE_CACHE_PATH'], app.config['SOLVE_CACHE_MAX_ENTRIES'])
+    app.extensions['state_store'] = StateStore(app.config['STATE_DB_PATH'])
+    app.extensions['telemetry'] = Telemetry(MetricsRegistry(app.config['METRICS_DIR']),
+                                            configure_logger(app.config['TELEMETRY_LOG_PATH']))
+    app.register_blueprint(bp)
+
     return app
 
-app = create_app()
-budget = Config.DEFAULT_BUDGET
+def get_store() -> StateStore:
+    """Return the shared state store of the current application."""
+    return current_app.extensions['state_store']
+
+def get_telemetry() -> Telemetry:
+    """Return the telemetry recorder of the current application."""
+    return current_app.extensions['telemetry']
+
+def get_budget() -> float:
+    """Return the current budget from the shared store."""
+    return get_store().get_budget(current_app.config['DEFAULT_BUDGET'])
 
 def safe_filename(filename: str) -> str:
     """Generate a secure filename and ensure .json extension."""
@@ -50,18 +78,127 @@ def handle_file_operation(operation: str, filepath: str, variables: Optional[lis
     try:
         if operation == 'save':
             with open(filepath, 'w') as f:
-                json.dump([var.to_dict() for var in variables or variables_list], f, indent=4)
+                json.dump([var.to_dict() for var in variables or get_store().load_variables()], f, indent=4)
         elif operation == 'load':
             with open(filepath, 'r') as f:
                 data = json.load(f)
-                clear_variables()
-                for item in data:
-                    var = IntegerVariable.from_dict(item)
-                    var.validate()
-                    variables_list.append(var)
+            loaded = []
+            for item in data:
+                var = IntegerVariable.from_dict(item)
+                var.validate()
+                loaded.append(var)
+            get_store().replace_variables(loaded)
     except Exception as e:
         raise IOError(f"Error {operation}ing variables: {str(e)}")
 
+def answer_from_sensitivity(sensitivity: Optional[Sensitivity], variables: list,
+                            budget: float) -> Optional[SolveResult]:
+    """Answer a solve from the ranges of the last exact solve, or return None to solve it."""
+    start = time.perf_counter()
+    answer = sensitivity.answer(variables, budget) if sensitivity else None
+    if answer is None:
+        return None
+    elapsed = time.perf_counter() - start
+    return SolveResult(answer[0], answer[1], 'Optimal', answer[0], 0.0, elapsed, 'sensitivity',
+                       {'sensitivity': elapsed})
+
+def record_sensitivity(variables: list, budget: float, solve: SolveResult) -> Optional[Sensitivity]:
+    """
+    Compute and store the ranges of a proven optimal solve (exact solving only).
+
+    Only run on request (see solve_with_sensitivity), since the probe solves cost far more
+    than the solve itself.
+
+    Profit ranges are capped at SENSITIVITY_TIME_LIMIT seconds. A failed probe solve only costs
+    the ranges: the solve itself is still returned, and None is returned here.
+    """
+    config = current_app.config
+    if (solve.status != 'Optimal' or config['OPTIMIZE_TIME_LIMIT'] is not None
+            or config['OPTIMIZE_GAP_REL'] is not None):
+        return None
+    start = time.perf_counter()
+    try:
+        sensitivity = sensitivity_analysis(variables, budget, solve.allocation,
+                                           profit_ranges=len(variables) <= config['SENSITIVITY_MAX_VARIABLES'],
+                                           time_limit=config['SENSITIVITY_TIME_LIMIT'])
+    except OptimizationError as e:
+        current_app.logger.warning("Sensitivity analysis failed: %s", e)
+        return None
+    get_store().set_sensitivity(sensitivity.to_dict())
+    solve.timings['sensitivity'] = time.perf_counter() - start
+    return sensitivity
+
+def solve_for_ui(variables: list, budget: float) -> Iterator[Tuple[SolveResult, Optional[Sensitivity], bool]]:
+    """
+    Yield (solve, sensitivity, final) as the solution of a UI solve improves.
+
+    Answers from the ranges of the last exact solve when possible, otherwise runs the solver
+    with the configured limits (the greedy solution comes first in greedy-first mode). The
+    final solution is recorded in telemetry. sensitivity is the stored ranges used to answer,
+    or None; ranges of new solves are only computed on request (see solve_with_sensitivity).
+
+    Raises:
+        OptimizationError: If the problem is invalid or cannot be solved.
+    """
+    config = current_app.config
+    start = time.perf_counter()
+    try:
+        stored = get_store().get_sensitivity()
+        sensitivity = Sensitivity.from_dict(stored) if stored else None
+        solve = answer_from_sensitivity(sensitivity, variables, budget)
+        if solve is None:
+            solutions = iter_solutions(variables, budget, config['OPTIMIZE_TIME_LIMIT'], config['OPTIMIZE_GAP_REL'],
+                                       config['OPTIMIZE_HEURISTIC_FIRST'])
+            solve = next(solutions)
+            for improved in solutions:
+                yield solve, None, False
+                solve = improved
+            sensitivity = None
+    except OptimizationError as e:
+        get_telemetry().record_solve(len(variables), budget, time.perf_counter() - start, error=e)
+        raise
+    get_telemetry().record_solve(len(variables), budget, time.perf_counter() - start, solve,
+                                 cache_enabled=optimizer_core.solve_cache is not None)
+    yield solve, sensitivity, True
+
+SENSITIVITY_MESSAGE = "Showing the ranges over which this solution stays optimal."
+
+def sensitivity_available() -> bool:
+    """Whether UI solves are exact, so their what-if ranges can be computed."""
+    config = current_app.config
+    return config['OPTIMIZE_TIME_LIMIT'] is None and config['OPTIMIZE_GAP_REL'] is None
+
+def solve_with_sensitivity(variables: list, budget: float) -> Tuple[SolveResult, Optional[Sensitivity]]:
+    """
+    Solve like a UI solve and compute the ranges of the result, reusing the stored ranges
+    when they belong to this exact problem.
+
+    Returns:
+        (solve, sensitivity), with sensitivity None if the ranges are not available.
+
+    Raises:
+        OptimizationError: If the problem is invalid or cannot be solved.
+    """
+    stored = get_store().get_sensitivity()
+    sensitivity = Sensitivity.from_dict(stored) if stored else None
+    if sensitivity and sensitivity.budget == budget and sensitivity.variables == variables:
+        solve = answer_from_sensitivity(sensitivity, variables, budget)
+        if solve is not None:
+            return solve, sensitivity
+    for solve, _, _ in solve_for_ui(variables, budget):
+        pass
+    return solve, record_sensitivity(variables, budget, solve)
+
+def solve_message(solve: SolveResult, final: bool = True) -> str:
+    """Describe a UI solve for the user."""
+    if not final:
+        return "Greedy solution found; still optimizing..."
+    if solve.source == 'sensitivity':
+        return "Still optimal after your edit: answered from the last solve's ranges."
+    if solve.status == 'Optimal':
+        return "Optimization completed successfully!"
+    return f"Stopped early: best solution is within {solve.gap:.1%} of the optimum."
+
 def parse_variable_form() -> Tuple[Dict[str, Any], bool]:
     """Parse and validate variable form data."""
     try:
@@ -78,13 +215,33 @@ def parse_variable_form() -> Tuple[Dict[str, Any], bool]:
         flash(f"Invalid input: {str(e)}", "error")
         return {}, False
 
+def positive_int_arg(name: str, default: int) -> int:
+    """
+    Read a positive integer query argument.
+
+    Raises:
+        ValueError: If the argument is present but not a positive integer.
+    """
+    value = request.args.get(name)
+    if value is None:
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number <= 0:
+        raise ValueError(f"{name} must be a positive integer")
+    return number
+
 # Routes
-@app.route("/", methods=["GET", "POST"])
+@bp.route("/", methods=["GET", "POST"])
 def index():
     """Handle main page and form submissions."""
-    global budget
+    store = get_store()
     max_profit = None
     result = {}
+    solve = None
+    sensitivity = None
 
     if request.method == "POST":
         if "update_budget" in request.form:
@@ -92,146 +249,272 @@ def index():
                 new_budget = int(request.form["budget"])
                 if new_budget <= 0:
                     raise ValueError("Budget must be positive")
-                budget = new_budget
+                store.set_budget(new_budget)
                 flash("Budget updated successfully!", "success")
             except ValueError as e:
                 flash(f"Invalid budget value: {str(e)}", "error")
-        
+
         elif "add_variable" in request.form:
             data, valid = parse_variable_form()
             if valid:
                 try:
-                    create_integer_variable(**data)
+                    var = IntegerVariable(**data)
+                    var.validate()
+                    store.add_variable(var)
                     flash("Variable added successfully!", "success")
                 except OptimizationError as e:
                     flash(str(e), "error")
-        
+
         elif "optimize" in request.form:
-            if not variables_list:
+            variables = store.load_variables()
+            if not variables:
                 flash("No variables to optimize. Add variables first.", "error")
             else:
                 try:
-                    max_profit, result = optimize(variables_list, budget)
-                    flash("Optimization completed successfully!", "success")
+                    for solve, sensitivity, _ in solve_for_ui(variables, get_budget()):
+                        pass
+                    max_profit, result = solve.profit, solve.allocation
+                    flash(solve_message(solve), "success")
+                except OptimizationError as e:
+                    flash(f"Optimization failed: {str(e)}", "error")
+
+        elif "sensitivity" in request.form:
+            variables = store.load_variables()
+            if not variables:
+                flash("No variables to optimize. Add variables first.", "error")
+            else:
+                try:
+                    solve, sensitivity = solve_with_sensitivity(variables, get_budget())
+                    max_profit, result = solve.profit, solve.allocation
+                    if sensitivity is None:
+                        flash("What-if ranges are not available for this solve.", "error")
+                    else:
+                        flash(SENSITIVITY_MESSAGE, "success")
                 except OptimizationError as e:
                     flash(f"Optimization failed: {str(e)}", "error")
 
     return render_template("index.html",
-                         variables=variables_list,
+                         variable_count=store.count_variables(),
+                         per_page=current_app.config['VARIABLES_PER_PAGE'],
                          max_profit=max_profit,
                          result=result,
-                         budget=budget)
+                         solve=solve,
+                         sensitivity=sensitivity.to_dict() if sensitivity else None,
+                         sensitivity_available=sensitivity_available(),
+                         budget=get_budget())
+
+@bp.route("/api/optimize", methods=["POST"])
+def optimize_stream():
+    """
+    Solve the stored problem, streaming each improving solution as a line of JSON.
+
+    Lines are {"status": "success", "final": bool, "message", "solve", "sensitivity"}, the last
+    one final; a failure ends the stream with {"status": "error", "message"}.
+    """
+    variables = get_store().load_variables()
+    if not variables:
+        return {'status': 'error', 'message': "No variables to optimize. Add variables first."}, 400
+    budget = get_budget()
+
+    def generate():
+        try:
+            for solve, sensitivity, final in solve_for_ui(variables, budget):
+                yield json.dumps({'status': 'success', 'final': final, 'message': solve_message(solve, final),
+                                  'solve': solve.to_dict(),
+                                  'sensitivity': sensitivity.to_dict() if sensitivity else None}) + '\n'
+        except OptimizationError as e:
+            yield json.dumps({'status': 'error', 'message': f"Optimization failed: {str(e)}"}) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@bp.route("/api/sensitivity", methods=["POST"])
+def sensitivity_ranges():
+    """
+    Compute the what-if ranges of the stored problem's optimal solution on request.
+
+    Returns {"status": "success", "final": true, "message", "solve", "sensitivity"}, like the
+    last line of /api/optimize, or a 400 error if the problem cannot be solved or the ranges
+    are not available.
+    """
+    variables = get_store().load_variables()
+    if not variables:
+        return {'status': 'error', 'message': "No variables to optimize. Add variables first."}, 400
+    if not sensitivity_available():
+        return {'status': 'error', 'message': "What-if ranges need exact solving (no time limit or gap)."}, 400
+    try:
+        solve, sensitivity = solve_with_sensitivity(variables, get_budget())
+    except OptimizationError as e:
+        return {'status': 'error', 'message': f"Optimization failed: {str(e)}"}, 400
+    if sensitivity is None:
+        return {'status': 'error', 'message': "What-if ranges are not available for this solve."}, 400
+    return {'status': 'success', 'final': True, 'message': SENSITIVITY_MESSAGE, 'solve': solve.to_dict(),
+            'sensitivity': sensitivity.to_dict()}
+
+@bp.route("/api/variables", methods=["GET"])
+def list_variables():
+    """Return a page of variables as JSON (query args: page, per_page, sort, order, q)."""
+    try:
+        page = positive_int_arg('page', 1)
+        per_page = min(positive_int_arg('per_page', current_app.config['VARIABLES_PER_PAGE']),
+                       current_app.config['VARIABLES_MAX_PER_PAGE'])
+        order = request.args.get('order', 'asc')
+        if order not in ('asc', 'desc'):
+            raise ValueError("order must be 'asc' or 'desc'")
+        return jsonify(get_store().page_variables(page, per_page,
+                                                  request.args.get('sort') or None, order,
+                                                  request.args.get('q') or None))
+    except ValueError as e:
+        return {'status': 'error', 'message': str(e)}, 400
+
+@bp.route("/api/variables/bulk", methods=["POST"])
+def bulk_variables():
+    """
+    Apply a batch of variable operations atomically.
+
+    Body: {"operations": [{"op": "add", "variable": {...}},
+                          {"op": "update", "name": ..., "variable": {fields to change}},
+                          {"op": "delete", "name": ...}, ...]}
+    All operations are validated first; if any is invalid none is applied and the errors are
+    returned with the index of each failing operation.
+    """
+    payload = request.get_json(silent=True)
+    operations = payload.get('operations') if isinstance(payload, dict) else None
+    if not isinstance(operations, list):
+        return {'status': 'error', 'message': "Expected a JSON object with an 'operations' list"}, 400
+    try:
+        counts = get_store().apply_operations(operations)
+    except BulkOperationError as e:
+        return {'status': 'error', 'message': str(e), 'errors': e.errors}, 400
+    return {'status': 'success', **counts}, 200
+
+@bp.route("/metrics", methods=["GET"])
+def metrics():
+    """Expose solve and request metrics in the Prometheus text format."""
+    gauges = {}
+    cache = optimizer_core.solve_cache
+    if cache is not None:
+        stats = cache.stats()
+        gauges['optimizer_solve_cache_entries'] = stats['entries']
+        gauges['optimizer_solve_cache_max_entries'] = stats['max_entries']
+    return Response(get_telemetry().registry.render(gauges), mimetype='text/plain; version=0.0.4')
+
+@bp.before_app_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
 
-@app.route("/export", methods=["POST"])
+@bp.after_app_request
+def record_request(response):
+    start = g.get('request_start')
+    if start is not None:
+        get_telemetry().record_request(request.endpoint or 'unknown', request.method,
+                                       response.status_code, time.perf_counter() - start)
+    return response
+
+@bp.route("/export", methods=["POST"])
 def export_variables():
     """Export variables to a JSON file in the exports folder."""
     try:
         filename = safe_filename(request.form.get("filename", "variables.json"))
-        filepath = os.path.join(app.config['EXPORT_FOLDER'], filename)
+        filepath = os.path.join(current_app.config['EXPORT_FOLDER'], filename)
         handle_file_operation('save', filepath)
         flash(f"Variables exported successfully!", "success")
     except Exception as e:
         flash(f"Export failed: {str(e)}", "error")
-    return redirect(url_for("index"))
+    return redirect(url_for("main.index"))
 
-@app.route("/import", methods=["POST"])
+@bp.route("/import", methods=["POST"])
 def import_variables():
     """Import variables from an uploaded JSON file."""
     if "file" not in request.files:
         flash("No file selected for importing.", "error")
-        return redirect(url_for("index"))
+        return redirect(url_for("main.index"))
 
     file = request.files["file"]
     if not file.filename:
         flash("No file selected for importing.", "error")
-        return redirect(url_for("index"))
+        return redirect(url_for("main.index"))
 
     try:
         filename = safe_filename(file.filename)
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+        filepath = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
         file.save(filepath)
         handle_file_operation('load', filepath)
         flash("Variables imported successfully!", "success")
     except Exception as e:
         flash(f"Import failed: {str(e)}", "error")
-    
-    return redirect(url_for("index"))
 
-@app.route("/download", methods=["POST"])
+    return redirect(url_for("main.index"))
+
+@bp.route("/download", methods=["POST"])
 def download_variables():
     """Download variables as a JSON file."""
     try:
         filename = safe_filename(request.form.get("filename", "variables.json").strip())
-        filepath = os.path.join(app.config['EXPORT_FOLDER'], filename)
+        filepath = os.path.join(current_app.config['EXPORT_FOLDER'], filename)
         handle_file_operation('save', filepath)
         return send_file(filepath, as_attachment=True, download_name=filename)
     except Exception as e:
         flash(f"Download failed: {str(e)}", "error")
-        return redirect(url_for("index"))
+        return redirect(url_for("main.index"))
 
-@app.route("/delete_variable/<name>", methods=["POST"])
+@bp.route("/delete_variable/<name>", methods=["POST"])
 def delete_variable(name):
     """Delete a variable by its name."""
-    global variables_list
     try:
-        # Find and remove the variable with the given name
-        variables_list = [var for var in variables_list if var.name != name]
+        get_store().delete_variable(name)
         flash(f"Variable '{name}' deleted successfully!", "success")
     except Exception as e:
         flash(f"Error deleting variable: {str(e)}", "error")
-    
-    return redirect(url_for("index"))
 
-@app.route("/update_variable", methods=["POST"])
+    return redirect(url_for("main.index"))
+
+@bp.route("/update_variable", methods=["POST"])
 def update_variable():
     """Update an existing variable."""
-    global variables_list
+    store = get_store()
     try:
         old_name = request.form.get('old_name')
         if not old_name:
             return {'status': 'error', 'message': 'Original variable name is required'}, 400
 
         # Find the variable we're updating
-        old_var = next((var for var in variables_list if var.name == old_name), None)
-        if not old_var:
+        if store.get_variable(old_name) is None:
             return {'status': 'error', 'message': f'Variable {old_name} not found'}, 404
 
         data, valid = parse_variable_form()
         if not valid:
             return {'status': 'error', 'message': 'Invalid input data'}, 400
 
-        # If we're not changing the name, or if the new name is available
-        if data['name'] == old_name or not any(var.name == data['name'] for var in variables_list if var.name != old_name):
-            # Create new variable instance to validate before removing old one
-            new_var = IntegerVariable(**data)
-            new_var.validate()
-            
-            # Remove the old variable first
-            variables_list = [var for var in variables_list if var.name != old_name]
-            # Add the new variable
-            variables_list.append(new_var)
-            flash("Variable updated successfully!", "success")
-            return {'status': 'success'}, 200
-        else:
+        # Create new variable instance to validate before replacing the old one
+        new_var = IntegerVariable(**data)
+        new_var.validate()
+        try:
+            if not store.update_variable(old_name, new_var):
+                return {'status': 'error', 'message': f'Variable {old_name} not found'}, 404
+        except OptimizationError:
             return {'status': 'error', 'message': f'A variable named {data["name"]} already exists'}, 400
-        
+        flash("Variable updated successfully!", "success")
+        return {'status': 'success'}, 200
+
     except ValueError as e:
         return {'status': 'error', 'message': f'Invalid value: {str(e)}'}, 400
+    except OptimizationError as e:
+        return {'status': 'error', 'message': str(e)}, 400
     except Exception as e:
         flash(f"Error updating variable: {str(e)}", "error")
         return {'status': 'error', 'message': str(e)}, 500
 
 def run_app(port: int = 5000, debug: bool = True):
-    """Run the Flask application with browser auto-open."""
+    """Run the Flask development server with browser auto-open (see wsgi.py for production)."""
     url = f"http://localhost:{port}"
     def open_browser():
         time.sleep(1)
         webbrowser.open(url)
-    
+
     if not debug:
         threading.Thread(target=open_browser).start()
-    
-    app.run(debug=debug, use_reloader=False, port=port)
+
+    create_app().run(debug=debug, use_reloader=False, port=port)
 
 if __name__ == "__main__":
     run_app()
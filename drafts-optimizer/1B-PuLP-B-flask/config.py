@@ -12,12 +12,39 @@ class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'your_secret_key'
     
     # File Upload Settings
-    UPLOAD_FOLDER = os.path.join(BASE_DIR, 'uploads')
-    EXPORT_FOLDER = os.path.join(BASE_DIR, 'exports')
+    UPLOAD_FOLDER = os.environ.get('UPLOAD_FOLDER') or os.path.join(BASE_DIR, 'uploads')
+    EXPORT_FOLDER = os.environ.get('EXPORT_FOLDER') or os.path.join(BASE_DIR, 'exports')
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
     
+    # Shared state (variables and budget) for all worker processes
+    STATE_DB_PATH = os.environ.get('STATE_DB_PATH') or os.path.join(BASE_DIR, 'state', 'optimizer.db')
+
+    # Variables table pagination
+    VARIABLES_PER_PAGE = 50
+    VARIABLES_MAX_PER_PAGE = 500
+
     # Optimization Settings
     DEFAULT_BUDGET = 97
+    # Anytime solving: return the best incumbent within the limit (None for exact solves)
+    OPTIMIZE_TIME_LIMIT = float(os.environ['OPTIMIZE_TIME_LIMIT']) if os.environ.get('OPTIMIZE_TIME_LIMIT') else None
+    OPTIMIZE_GAP_REL = float(os.environ['OPTIMIZE_GAP_REL']) if os.environ.get('OPTIMIZE_GAP_REL') else None
+    OPTIMIZE_HEURISTIC_FIRST = os.environ.get('OPTIMIZE_HEURISTIC_FIRST', '').lower() in ('1', 'true', 'yes')
+
+    # Sensitivity ranges of exact solves, computed on request, answer what-if edits without
+    # re-solving; profit ranges cost a few extra solves per variable, so only problems up to
+    # this size get them
+    SENSITIVITY_MAX_VARIABLES = int(os.environ.get('SENSITIVITY_MAX_VARIABLES', 25))
+    # Seconds a range request may spend on profit ranges; variables not reached are re-solved when edited
+    SENSITIVITY_TIME_LIMIT = float(os.environ.get('SENSITIVITY_TIME_LIMIT', 0.2))
+
+    # Persistent solve cache (disabled unless a path is given)
+    SOLVE_CACHE_PATH = os.environ.get('SOLVE_CACHE_PATH')
+    SOLVE_CACHE_MAX_ENTRIES = int(os.environ.get('SOLVE_CACHE_MAX_ENTRIES', 1_000_000))
+    
+    # Telemetry: JSON solve log (stderr unless a file is given) and metrics shared across
+    # worker processes through METRICS_DIR (per-process only when unset)
+    TELEMETRY_LOG_PATH = os.environ.get('TELEMETRY_LOG_PATH')
+    METRICS_DIR = os.environ.get('METRICS_DIR')
     
     # Ensure upload and export directories exist
     @staticmethod
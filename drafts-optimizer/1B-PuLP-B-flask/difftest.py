@@ -0,0 +1,342 @@
+"""
+1B-PuLP-B-flask/difftest.py
+
+Randomized differential test and benchmark of the solver paths in optimizer_core and search/
+against CBC.
+
+- Generates random problems with varied bounds, multipliers, integrality, profit signs and
+  budgets (including infeasible ones).
+- Runs every registered engine on each problem. Exact engines must match the reference
+  PULP_CBC_CMD path of optimize within the tolerance (and agree on infeasibility); heuristics
+  and bounds are checked from below and above instead.
+- search/ engines cover LP_PULP (sync, async and cached solves), knapsack tables, shared-memory
+  tables, BatchReturns and scenario certificates. Tables need integral catalogues, so problems
+  an engine does not apply to are counted as skipped.
+- Infeasible problems must fail in every engine (search/ raises ValueError), and engines with a
+  solve cache must not have cached anything for them.
+- Every returned allocation is checked for feasibility and for a profit matching its values.
+- Records each engine's time and its speedup over CBC; mismatching problems are saved so they
+  can be replayed.
+
+New fast paths are added to ENGINES with the check they must pass.
+
+Usage:
+    python difftest.py --cases 300 --seed 1 --json difftest.json
+
+@author: Mafu
+@date: 2026-10-19
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import math
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+import optimizer_core
+from optimizer_core import (IntegerVariable, OptimizationError, optimize, optimize_anytime, optimize_many,
+                            greedy_solution, lp_bound, enable_solve_cache, disable_solve_cache)
+# Modules of the installed search/ package (pip install -e ../../search)
+import numpy as np
+import LP_PULP
+from LP_Interface import LP_optimizeCall, LP_optimizeManyCall
+from batch_policy import BatchReturns
+from scenarios import evaluate_scenarios
+from shared_tables import attach_table, is_integral, knapsack_table
+from solve_cache import problem_key
+
+@contextlib.contextmanager
+def _temporary_cache(enable: Callable = enable_solve_cache, disable: Callable = disable_solve_cache):
+    """Use a throwaway solve cache for the duration of an engine's runs."""
+    directory = tempfile.mkdtemp(prefix='difftest-')
+    enable(os.path.join(directory, 'cache.db'))
+    try:
+        yield
+    finally:
+        disable()
+        for name in os.listdir(directory):
+            os.remove(os.path.join(directory, name))
+        os.rmdir(directory)
+
+def _search_cache():
+    return _temporary_cache(LP_PULP.enableSolveCache, LP_PULP.disableSolveCache)
+
+@dataclass
+class Engine:
+    """
+    A solver path under test.
+
+    Attributes:
+        name: Engine name used in reports and on the command line.
+        run: Function of (variables, budget) returning (profit, allocation or None).
+        check: 'exact' (equal to CBC), 'lower' (feasible, at most CBC) or 'upper' (at least CBC).
+        warm: Run once untimed before timing (e.g. to fill a cache).
+        context: Optional context manager factory active while the engine runs.
+        applies: Optional function of (variables, budget) telling whether the engine handles a
+            problem; other problems are skipped.
+        cache: Optional function returning the solve cache the engine writes to, checked for
+            entries of infeasible problems.
+    """
+    name: str
+    run: Callable[[List[IntegerVariable], float], Tuple[float, Optional[Dict[str, float]]]]
+    check: str = 'exact'
+    warm: bool = False
+    context: Optional[Callable] = None
+    applies: Optional[Callable[[List[IntegerVariable], float], bool]] = None
+    cache: Optional[Callable] = None
+
+def _search_variables(variables: List[IntegerVariable]) -> list:
+    """Make a problem's variables the search/ catalogue (LP_PULP.variables_list) and return it."""
+    LP_PULP.variables_list[:] = [LP_PULP.IntegerVariable(var.name, var.lowerBound, var.upperBound, var.profit,
+                                                          var.integer, var.multiplier) for var in variables]
+    return LP_PULP.variables_list
+
+def _integral(variables: List[IntegerVariable], budget: float) -> bool:
+    return is_integral(variables)
+
+def _lp_pulp_call(variables: List[IntegerVariable], budget: float) -> Tuple[float, None]:
+    _search_variables(variables)
+    return LP_optimizeCall(budget), None
+
+def _lp_pulp_many(variables: List[IntegerVariable], budget: float, budgets: Optional[List[float]] = None
+                  ) -> Tuple[float, None]:
+    # The problem's budget is first; extra budgets exercise the concurrent CBC runs
+    _search_variables(variables)
+    return LP_optimizeManyCall(budgets or [budget], maxConcurrency=2)[0], None
+
+def _knapsack(variables: List[IntegerVariable], budget: float) -> Tuple[float, Dict[str, float]]:
+    profits, allocations = knapsack_table(_search_variables(variables), math.floor(budget))
+    row = math.floor(budget)
+    if not np.isfinite(profits[row]):
+        raise ValueError(f"Budget {budget} is below the lower bounds' spend")
+    return round(float(profits[row]), 2), dict(zip([var.name for var in variables], allocations[row].tolist()))
+
+def _shared_table(variables: List[IntegerVariable], budget: float) -> Tuple[float, Dict[str, float]]:
+    with attach_table(_search_variables(variables), max_budget=math.floor(budget)) as table:
+        found = table.lookup(budget)
+    if found is None:
+        raise ValueError(f"Budget {budget} is below the lower bounds' spend")
+    return found
+
+def _batch_returns(variables: List[IntegerVariable], budget: float) -> Tuple[float, None]:
+    _search_variables(variables)
+    return float(BatchReturns()(np.array([budget]))[0]), None
+
+# Perturbed profit scenarios solved alongside the problem's own profits (row 0)
+SCENARIO_ROWS = 20
+
+def _scenario_certified(variables: List[IntegerVariable], budget: float) -> Tuple[float, Dict[str, float]]:
+    catalogue = _search_variables(variables)
+    nominal = np.array([var.profit for var in catalogue], dtype=float)
+    rng = np.random.default_rng(0)
+    profits = np.vstack([nominal, nominal * rng.uniform(0.8, 1.2, (SCENARIO_ROWS, len(nominal)))])
+    result = evaluate_scenarios(catalogue, budget, profits)
+    return float(result['profits'][0]), dict(zip([var.name for var in variables], result['allocations'][0].tolist()))
+
+ENGINES = [
+    Engine('anytime', lambda v, b: _from_result(optimize_anytime(v, b))),
+    Engine('anytime-heuristic', lambda v, b: _from_result(optimize_anytime(v, b, heuristic_first=True))),
+    Engine('cached', optimize, warm=True, context=_temporary_cache, cache=lambda: optimizer_core.solve_cache),
+    Engine('async', lambda v, b: optimize_many([(v, b)])[0]),
+    Engine('greedy', greedy_solution, check='lower'),
+    Engine('lp-bound', lambda v, b: (lp_bound(v, b), None), check='upper'),
+    Engine('lp-pulp', lambda v, b: LP_PULP.solveModel(_search_variables(v), b)),
+    Engine('lp-pulp-async', lambda v, b: asyncio.run(LP_PULP.solveModelAsync(_search_variables(v), b))),
+    Engine('lp-pulp-cached', _lp_pulp_call, warm=True, context=_search_cache, cache=lambda: LP_PULP.solveCache),
+    Engine('lp-pulp-many', lambda v, b: _lp_pulp_many(v, b, [b, 2 * b])),
+    Engine('lp-pulp-many-cached', lambda v, b: _lp_pulp_many(v, b, [b, 2 * b]), warm=True, context=_search_cache,
+           cache=lambda: LP_PULP.solveCache),
+    Engine('knapsack-table', _knapsack, applies=_integral),
+    Engine('shared-table', _shared_table, applies=_integral),
+    Engine('batch-returns', _batch_returns),
+    Engine('scenario-certified', _scenario_certified),
+]
+
+def _from_result(result) -> Tuple[float, Dict[str, float]]:
+    return result.profit, result.allocation
+
+def random_problem(rng: random.Random, max_variables: int = 12) -> Tuple[List[IntegerVariable], float]:
+    """Return a random (variables, budget) problem."""
+    variables = []
+    for i in range(rng.randint(1, max_variables)):
+        lower = rng.choice([0, 0, 0, rng.randint(1, 3)])
+        variables.append(IntegerVariable(
+            name=f'v{i}',
+            lowerBound=lower,
+            upperBound=rng.choice([None, None, lower + rng.randint(0, 15)]),
+            profit=round(rng.choice([rng.uniform(0.1, 4.0)] * 4 + [rng.uniform(-2.0, 0.0), 0.0]), 2),
+            integer=rng.random() < 0.75,
+            multiplier=rng.choice([1, 1, rng.randint(2, 12)]),
+        ))
+    required = sum(var.lowerBound * var.multiplier for var in variables)
+    budget = required + rng.choice([rng.randint(1, 60), rng.randint(60, 400), round(rng.uniform(1, 100), 2)])
+    if rng.random() < 0.05:
+        budget = max(1, required - rng.randint(1, 5))  # infeasible
+    return variables, budget
+
+# CBC accepts continuous values up to its primal tolerance past a bound
+FEASIBILITY_TOLERANCE = 1e-4
+
+def check_allocation(variables: List[IntegerVariable], budget: float, profit: float,
+                     allocation: Dict[str, float], tolerance: float) -> Optional[str]:
+    """Return why an allocation is invalid, or None if it is feasible and matches its profit."""
+    spend = 0.0
+    value = 0.0
+    for var in variables:
+        amount = allocation.get(var.name)
+        if amount is None:
+            return f"missing {var.name}"
+        units = amount / var.multiplier
+        if (units < var.lowerBound - FEASIBILITY_TOLERANCE
+                or (var.upperBound is not None and units > var.upperBound + FEASIBILITY_TOLERANCE)):
+            return f"{var.name}={units:g} units outside [{var.lowerBound}, {var.upperBound}]"
+        if var.integer and abs(units - round(units)) > FEASIBILITY_TOLERANCE:
+            return f"{var.name}={units:g} units is not integer"
+        spend += amount
+        value += var.profit * amount
+    if spend > budget + FEASIBILITY_TOLERANCE:
+        return f"spend {spend:g} exceeds budget {budget:g}"
+    if abs(value - profit) > tolerance:
+        return f"reported profit {profit} but allocation is worth {value:.4f}"
+    return None
+
+def _timed(engine: Engine, variables: List[IntegerVariable], budget: float):
+    """Run an engine, returning (profit, allocation, seconds) or (error, None, seconds).
+
+    optimizer_core reports failures with OptimizationError, search/ with ValueError.
+    """
+    try:
+        if engine.warm:
+            engine.run(variables, budget)
+        start = time.perf_counter()
+        profit, allocation = engine.run(variables, budget)
+        return profit, allocation, time.perf_counter() - start
+    except (OptimizationError, ValueError) as e:
+        return e, None, 0.0
+
+def run_differential(engines: List[Engine], cases: int, seed: int = 0, max_variables: int = 12,
+                     tolerance: float = 0.011) -> Dict:
+    """
+    Run every engine on random problems and compare it with CBC.
+
+    Args:
+        engines: Engines under test.
+        cases: Number of random problems.
+        seed: Seed of the problem generator.
+        max_variables: Maximum number of variables per problem.
+        tolerance: Absolute profit tolerance (optimize rounds profits to cents).
+
+    Returns:
+        Dictionary with per-engine results ("engines") and the failing problems ("failures").
+    """
+    rng = random.Random(seed)
+    problems = [random_problem(rng, max_variables) for _ in range(cases)]
+    reference = []
+    cbc_times = []
+    saved_cache = optimizer_core.solve_cache
+    optimizer_core.solve_cache = None
+    try:
+        for variables, budget in problems:
+            start = time.perf_counter()
+            try:
+                reference.append(optimize(variables, budget))
+            except OptimizationError as e:
+                reference.append(e)
+            cbc_times.append(time.perf_counter() - start)
+    finally:
+        optimizer_core.solve_cache = saved_cache
+
+    report = {'cases': cases, 'seed': seed, 'cbc_seconds': sum(cbc_times), 'engines': {}, 'failures': []}
+    for engine in engines:
+        times, ratios, failures, skipped = [], [], 0, 0
+        with (engine.context() if engine.context else contextlib.nullcontext()):
+            for index, ((variables, budget), expected) in enumerate(zip(problems, reference)):
+                if engine.applies and not engine.applies(variables, budget):
+                    skipped += 1
+                    continue
+                profit, allocation, seconds = _timed(engine, variables, budget)
+                problem = None
+                failed = isinstance(profit, Exception)
+                if isinstance(expected, OptimizationError) or failed:
+                    if isinstance(expected, OptimizationError) != failed:
+                        problem = f"CBC: {expected}, {engine.name}: {profit}"
+                    elif engine.cache and engine.cache().get(problem_key(variables, budget)) is not None:
+                        problem = f"infeasible budget {budget} was cached"
+                else:
+                    times.append(seconds)
+                    ratios.append(cbc_times[index] / max(seconds, 1e-9))
+                    if engine.check == 'exact' and abs(profit - expected[0]) > tolerance:
+                        problem = f"profit {profit} != CBC {expected[0]}"
+                    elif engine.check == 'lower' and profit > expected[0] + tolerance:
+                        problem = f"heuristic profit {profit} above CBC optimum {expected[0]}"
+                    elif engine.check == 'upper' and profit < expected[0] - tolerance:
+                        problem = f"bound {profit} below CBC optimum {expected[0]}"
+                    elif allocation is not None:
+                        problem = check_allocation(variables, budget, profit, allocation, tolerance)
+                if problem:
+                    failures += 1
+                    report['failures'].append({'engine': engine.name, 'case': index, 'reason': problem,
+                                               'budget': budget, 'variables': [var.to_dict() for var in variables]})
+        report['engines'][engine.name] = {
+            'check': engine.check,
+            'failures': failures,
+            'solved': len(times),
+            'skipped': skipped,
+            'total_seconds': sum(times),
+            'median_ms': statistics.median(times) * 1000 if times else float('nan'),
+            'speedup_total': sum(cbc_times[i] for i, e in enumerate(reference) if not isinstance(e, OptimizationError)
+                                 and (not engine.applies or engine.applies(*problems[i]))) / max(sum(times), 1e-9),
+            'speedup_median': statistics.median(ratios) if ratios else float('nan'),
+        }
+    return report
+
+def print_report(report: Dict) -> None:
+    """Print the per-engine summary as a table."""
+    print(f"\n=== Differential test: {report['cases']} cases, seed {report['seed']} "
+          f"(CBC total {report['cbc_seconds']:.2f}s) ===")
+    print(f"{'Engine':<20} {'Check':<6} {'Solved':>6} {'Skip':>5} {'Fail':>5} {'Median ms':>10} {'Speedup':>8} "
+          f"{'Median x':>9}")
+    for name, row in report['engines'].items():
+        print(f"{name:<20} {row['check']:<6} {row['solved']:>6} {row['skipped']:>5} {row['failures']:>5} "
+              f"{row['median_ms']:>10.2f} "
+              f"{row['speedup_total']:>8.1f} {row['speedup_median']:>9.1f}")
+    for failure in report['failures'][:10]:
+        print(f"FAIL {failure['engine']} case {failure['case']}: {failure['reason']}")
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Compare optimizer engines against the CBC path of optimize.")
+    parser.add_argument("--cases", type=int, default=200, help="Number of random problems")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-variables", type=int, default=12)
+    parser.add_argument("--tolerance", type=float, default=0.011, help="Absolute profit tolerance")
+    parser.add_argument("--engines", help="Comma-separated engines to run (default: all): "
+                        + ", ".join(engine.name for engine in ENGINES))
+    parser.add_argument("--json", help="Also write the report, including failing problems, to this file")
+    return parser.parse_args(argv)
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    engines = ENGINES
+    if args.engines:
+        wanted = args.engines.split(',')
+        unknown = set(wanted) - {engine.name for engine in ENGINES}
+        if unknown:
+            print(f"Unknown engines: {', '.join(sorted(unknown))}", file=sys.stderr)
+            return 2
+        engines = [engine for engine in ENGINES if engine.name in wanted]
+    report = run_differential(engines, args.cases, args.seed, args.max_variables, args.tolerance)
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=4)
+    return 1 if report['failures'] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,28 @@
+"""
+Gunicorn settings for serving the optimizer (see wsgi.py).
+
+Each solve runs CBC in a subprocess, so one worker per core keeps all cores busy.
+"""
+
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+bind = os.environ.get('BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+threads = int(os.environ.get('THREADS', 2))
+timeout = int(os.environ.get('TIMEOUT', 120))
+
+# Workers share metrics through files in one directory per server run (see telemetry.py)
+_default_metrics_dir = os.path.join(tempfile.gettempdir(), f'optimizer-metrics-{os.getpid()}')
+os.environ.setdefault('METRICS_DIR', _default_metrics_dir)
+
+def child_exit(server, worker):
+    # Keep an exited worker's counts in the totals without leaving its file behind
+    from telemetry import mark_process_dead
+    mark_process_dead(os.environ['METRICS_DIR'], worker.pid)
+
+def on_exit(server):
+    if os.environ.get('METRICS_DIR') == _default_metrics_dir:
+        shutil.rmtree(_default_metrics_dir, ignore_errors=True)
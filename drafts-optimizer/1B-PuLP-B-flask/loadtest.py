@@ -0,0 +1,332 @@
+"""
+1B-PuLP-B-flask/loadtest.py
+
+Self-contained load generator for the Flask optimizer.
+
+- Starts the app locally on a throwaway state database and upload folder (development server,
+  or Gunicorn with --server gunicorn), or targets an already running instance with --url.
+  The mix imports catalogues, replacing the target's variables, so --url also requires
+  --allow-overwrite.
+- Replays a weighted mix of optimize, import, update and list requests. Imported catalogues
+  are the sample files in uploads/ plus synthetic catalogues of configurable size.
+- Reports p50/p95/p99 latency, throughput and error rate per request type and overall.
+  Updates race with concurrent imports, so a few 404s on updates are expected under mixed load;
+  they are reported as misses rather than errors. The exit code is 1 if any request errored.
+
+Usage:
+    python loadtest.py --requests 500 --concurrency 8 --mix optimize=4,import=1,update=2,list=3
+
+@author: Mafu
+@date: 2026-10-19
+"""
+
+import argparse
+import glob
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_MIX = {'optimize': 4, 'import': 1, 'update': 2, 'list': 3}
+
+def synthetic_catalogue(size: int, rng: random.Random) -> List[Dict]:
+    """Return a random catalogue of variables in the JSON format accepted by /import."""
+    catalogue = []
+    for i in range(size):
+        lower = rng.choice([0, 0, 0, rng.randint(0, 3)])
+        catalogue.append({
+            'name': f'item {i}',
+            'lowerBound': lower,
+            'upperBound': rng.choice([None, lower + rng.randint(1, 20)]),
+            'profit': round(rng.uniform(0.5, 3.0), 2),
+            'integer': rng.random() < 0.8,
+            'multiplier': rng.randint(1, 10),
+        })
+    return catalogue
+
+def load_catalogues(synthetic_sizes: List[int], seed: int) -> Dict[str, List[Dict]]:
+    """Return the sample catalogues from uploads/ and synthetic ones, keyed by name."""
+    catalogues = {}
+    for path in sorted(glob.glob(os.path.join(BASE_DIR, 'uploads', '*.json'))):
+        with open(path) as f:
+            catalogues[os.path.basename(path)] = json.load(f)
+    rng = random.Random(seed)
+    for size in synthetic_sizes:
+        catalogues[f'synthetic_{size}.json'] = synthetic_catalogue(size, rng)
+    return catalogues
+
+def parse_mix(text: str) -> Dict[str, float]:
+    """Parse 'optimize=4,import=1' into request weights."""
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"Unknown request type {name!r}, expected one of {', '.join(DEFAULT_MIX)}")
+        mix[name] = float(weight) if weight else 1.0
+    if not any(mix.values()):
+        raise argparse.ArgumentTypeError("At least one request type needs a positive weight")
+    return mix
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return float('nan')
+    rank = max(1, -(-len(sorted_values) * q // 100))
+    return sorted_values[int(rank) - 1]
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    """Report redirects (the app's post/redirect/get responses) instead of following them."""
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+class LoadGenerator:
+    """
+    Issue requests against the app and record their latencies.
+
+    Attributes:
+        url: Base URL of the app.
+        catalogues: Catalogues available for import requests.
+        results: (request type, status code or None on connection errors, seconds) per request.
+    """
+    def __init__(self, url: str, catalogues: Dict[str, List[Dict]], budgets: Tuple[int, int],
+                 timeout: float, seed: int):
+        self.url = url.rstrip('/')
+        self.catalogues = catalogues
+        self.budgets = budgets
+        self.timeout = timeout
+        self.results: List[Tuple[str, Optional[int], float]] = []
+        self._names: List[str] = []
+        self._lock = threading.Lock()
+        self._rng = random.Random(seed)
+        self._opener = urllib.request.build_opener(_NoRedirect)
+
+    def _random(self) -> random.Random:
+        with self._lock:
+            return random.Random(self._rng.random())
+
+    def _send(self, path: str, data: Optional[bytes] = None, headers: Optional[Dict] = None) -> int:
+        request = urllib.request.Request(self.url + path, data=data, headers=headers or {})
+        try:
+            with self._opener.open(request, timeout=self.timeout) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            e.read()
+            return e.code
+
+    def _post_form(self, path: str, fields: Dict) -> int:
+        return self._send(path, urllib.parse.urlencode(fields).encode(),
+                          {'Content-Type': 'application/x-www-form-urlencoded'})
+
+    def import_catalogue(self, name: str) -> int:
+        """Upload a catalogue through /import, replacing the app's variables."""
+        boundary = uuid.uuid4().hex
+        body = (f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="{name}"\r\n'
+                f'Content-Type: application/json\r\n\r\n').encode()
+        body += json.dumps(self.catalogues[name]).encode()
+        body += f'\r\n--{boundary}--\r\n'.encode()
+        status = self._send('/import', body, {'Content-Type': f'multipart/form-data; boundary={boundary}'})
+        with self._lock:
+            self._names = [item['name'] for item in self.catalogues[name]]
+        return status
+
+    def request(self, kind: str) -> None:
+        """Issue one request of the given type and record its outcome."""
+        rng = self._random()
+        start = time.perf_counter()
+        try:
+            if kind == 'optimize':
+                if rng.random() < 0.2:
+                    self._post_form('/', {'update_budget': '1', 'budget': rng.randint(*self.budgets)})
+                    start = time.perf_counter()
+                status = self._post_form('/', {'optimize': '1'})
+            elif kind == 'import':
+                status = self.import_catalogue(rng.choice(sorted(self.catalogues)))
+            elif kind == 'update':
+                with self._lock:
+                    name = rng.choice(self._names) if self._names else 'missing'
+                status = self._post_form('/update_variable', {
+                    'old_name': name, 'name': name, 'lowerBound': 0,
+                    'upperBound': rng.choice(['', rng.randint(5, 50)]),
+                    'profit': round(rng.uniform(0.5, 3.0), 2), 'integer': 'on',
+                    'multiplier': rng.randint(1, 10)})
+            else:
+                status = self._send('/api/variables?' + urllib.parse.urlencode({
+                    'page': rng.randint(1, 3), 'sort': rng.choice(['name', 'profit', 'multiplier'])}))
+        except OSError:
+            status = None
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.results.append((kind, status, elapsed))
+
+    def run(self, mix: Dict[str, float], requests: int, concurrency: int,
+            duration: Optional[float] = None) -> float:
+        """
+        Replay the mix with the given concurrency.
+
+        Args:
+            mix: Weight per request type.
+            requests: Number of requests to send (ignored when duration is given).
+            concurrency: Number of requests in flight at once.
+            duration: Optional run time in seconds instead of a request count.
+
+        Returns:
+            Wall-clock seconds of the run.
+        """
+        kinds, weights = zip(*mix.items())
+        schedule = random.Random(self._rng.random())
+        deadline = None if duration is None else time.perf_counter() + duration
+
+        def worker(count):
+            for _ in range(count) if deadline is None else iter(int, 1):
+                if deadline is not None and time.perf_counter() >= deadline:
+                    return
+                with self._lock:
+                    kind = schedule.choices(kinds, weights)[0]
+                self.request(kind)
+
+        counts = [requests // concurrency + (i < requests % concurrency) for i in range(concurrency)]
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(worker, counts))
+        return time.perf_counter() - start
+
+def is_expected_miss(kind: str, status: Optional[int]) -> bool:
+    """Whether a response is an update of a variable that a concurrent import just replaced."""
+    return kind == 'update' and status == 404
+
+def summarize(results: List[Tuple[str, Optional[int], float]], elapsed: float) -> Dict[str, Dict]:
+    """
+    Latency percentiles (ms), throughput and error rate per request type and overall.
+
+    Expected misses (see is_expected_miss) are counted separately and are not errors.
+    """
+    groups = {}
+    for kind, status, seconds in results:
+        groups.setdefault(kind, []).append((kind, status, seconds))
+    groups['total'] = list(results)
+
+    summary = {}
+    for kind, samples in groups.items():
+        latencies = sorted(seconds * 1000 for _, _, seconds in samples)
+        misses = sum(1 for sample_kind, status, _ in samples if is_expected_miss(sample_kind, status))
+        errors = sum(1 for _, status, _ in samples if status is None or status >= 400) - misses
+        summary[kind] = {
+            'requests': len(samples),
+            'errors': errors,
+            'misses': misses,
+            'error_rate': errors / len(samples) if samples else 0.0,
+            'throughput': len(samples) / elapsed if elapsed > 0 else 0.0,
+            'p50_ms': percentile(latencies, 50),
+            'p95_ms': percentile(latencies, 95),
+            'p99_ms': percentile(latencies, 99),
+            'max_ms': latencies[-1] if latencies else float('nan'),
+            'statuses': {str(status): sum(1 for _, s, _ in samples if s == status)
+                         for status in sorted({s for _, s, _ in samples}, key=str)},
+        }
+    return summary
+
+def print_summary(summary: Dict[str, Dict], elapsed: float) -> None:
+    """Print the summary as a table."""
+    print(f"\n=== Load test ({elapsed:.1f}s) ===")
+    print(f"{'Request':<10} {'Count':>7} {'Req/s':>8} {'Errors':>7} {'Misses':>7} {'p50 ms':>9} {'p95 ms':>9} "
+          f"{'p99 ms':>9} {'max ms':>9}")
+    for kind, row in summary.items():
+        print(f"{kind:<10} {row['requests']:>7} {row['throughput']:>8.1f} {row['error_rate']:>7.1%} {row['misses']:>7} "
+              f"{row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f} {row['p99_ms']:>9.1f} {row['max_ms']:>9.1f}")
+
+def start_server(server: str, port: int, workers: int, state_dir: str) -> subprocess.Popen:
+    """Start the app on a fresh state database and wait until it answers."""
+    # Keep uploaded catalogues out of uploads/, whose sample files the mixes are built from
+    env = dict(os.environ, STATE_DB_PATH=os.path.join(state_dir, 'optimizer.db'),
+               UPLOAD_FOLDER=os.path.join(state_dir, 'uploads'), EXPORT_FOLDER=os.path.join(state_dir, 'exports'))
+    if server == 'gunicorn':
+        env.update(BIND=f'127.0.0.1:{port}', WEB_CONCURRENCY=str(workers))
+        command = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app']
+    else:
+        command = [sys.executable, '-c',
+                   f'from app import create_app; create_app().run(port={port}, threaded=True)']
+    process = subprocess.Popen(command, cwd=BASE_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode}")
+        try:
+            urllib.request.urlopen(f'http://127.0.0.1:{port}/api/variables', timeout=1).read()
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("Server did not start within 30 seconds")
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Load test the optimizer web app.")
+    parser.add_argument("--url", help="Target a running app instead of starting one (requires --allow-overwrite)")
+    parser.add_argument("--allow-overwrite", action="store_true",
+                        help="Allow the load test to import catalogues into the --url instance, replacing its variables")
+    parser.add_argument("--server", choices=("dev", "gunicorn"), default="dev",
+                        help="Server to start when --url is not given")
+    parser.add_argument("--workers", type=int, default=4, help="Gunicorn worker processes")
+    parser.add_argument("--port", type=int, default=5055)
+    parser.add_argument("--requests", type=int, default=200, help="Number of requests to send")
+    parser.add_argument("--duration", type=float, help="Run for this many seconds instead")
+    parser.add_argument("--concurrency", type=int, default=8, help="Requests in flight at once")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX,
+                        help="Request weights, e.g. optimize=4,import=1,update=2,list=3")
+    parser.add_argument("--synthetic", type=lambda s: [int(x) for x in s.split(',') if x], default=[50, 500],
+                        help="Sizes of synthetic catalogues, comma separated")
+    parser.add_argument("--budget-range", type=lambda s: tuple(int(x) for x in s.split('-')), default=(50, 500),
+                        help="Budgets chosen for optimize requests, e.g. 50-500")
+    parser.add_argument("--timeout", type=float, default=120, help="Per-request timeout in seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Also write the summary to this JSON file")
+    args = parser.parse_args(argv)
+    if args.url and not args.allow_overwrite:
+        parser.error("--url imports catalogues into the target, replacing its variables and budget; "
+                     "pass --allow-overwrite to confirm")
+    return args
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    catalogues = load_catalogues(args.synthetic, args.seed)
+    state_dir = process = None
+    url = args.url
+    if url is None:
+        state_dir = tempfile.mkdtemp(prefix='loadtest-')
+        process = start_server(args.server, args.port, args.workers, state_dir)
+        url = f'http://127.0.0.1:{args.port}'
+    try:
+        generator = LoadGenerator(url, catalogues, args.budget_range, args.timeout, args.seed)
+        generator.import_catalogue(sorted(catalogues)[0])
+        elapsed = generator.run(args.mix, args.requests, args.concurrency, args.duration)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+            shutil.rmtree(state_dir, ignore_errors=True)
+
+    summary = summarize(generator.results, elapsed)
+    print_summary(summary, elapsed)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'elapsed_seconds': elapsed, 'config': {k: v for k, v in vars(args).items() if k != 'json'},
+                       'summary': summary}, f, indent=4)
+    return 0 if summary['total']['errors'] == 0 else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,19 +7,38 @@ This module is designed to be imported by a Flask app or other interfaces.
 Classes:
     OptimizationError: Custom exception for optimization-related errors.
     IntegerVariable: Class representing an optimization variable.
+    SolveResult: Incumbent solution with its bound and gap.
+    Sensitivity: Budget and profit ranges over which an optimal allocation stays optimal.
 
 Functions:
     create_integer_variable: Add a variable to the shared list.
     optimize: Solve the optimization problem.
+    optimize_async: Solve the optimization problem in an asyncio CBC subprocess.
+    optimize_many: Solve many independent problems concurrently.
+    optimize_anytime: Solve under a deadline/gap tolerance, returning the best incumbent with its bound.
+    iter_solutions: Yield a greedy solution immediately, then improved solutions.
+    sensitivity_analysis: Compute the Sensitivity of an optimal allocation.
+    optimize_with_sensitivity: Solve and also return the Sensitivity of the result.
     clear_variables: Clear the variables list.
+    enable_solve_cache: Reuse results of identical problems through a persistent cache.
 
 @author: Mafu
 @date: 2025-06-14
 """
 
-from dataclasses import dataclass, asdict
-from typing import Optional, Dict, List, Tuple
-from pulp import LpProblem, LpVariable, LpMaximize, lpSum, PULP_CBC_CMD, LpStatus
+import asyncio
+import math
+import os
+import tempfile
+import time
+from dataclasses import dataclass, asdict, field, replace
+from typing import Optional, Dict, Iterator, List, Tuple
+from pulp import (LpProblem, LpVariable, LpMaximize, LpMinimize, lpSum, PULP_CBC_CMD, LpStatus,
+                  LpSolutionOptimal)
+
+# Solver helpers shared with the command-line tools, installed from search/ (pip install -e ../../search)
+from LP_PULP import solveCBCAsync
+from solve_cache import SolveCache, problem_key
 
 class OptimizationError(Exception):
     """Custom exception for optimization-related errors."""
@@ -87,36 +106,43 @@ def clear_variables() -> None:
     """Clear the global variables list."""
     variables_list.clear()
 
-def optimize(variables: List[IntegerVariable], budget: float) -> Tuple[float, Dict[str, int]]:
+# Optional persistent cache of solved problems (see enable_solve_cache)
+solve_cache: Optional[SolveCache] = None
+
+def enable_solve_cache(path: str, max_entries: int = 1_000_000) -> SolveCache:
     """
-    Set up and solve the integer programming problem to maximize profit.
-    
+    Cache optimize results in a SQLite file shared across runs and processes.
+
     Args:
-        variables: List of variables to optimize.
-        budget: Budget constraint value.
-    
+        path: Path of the cache database.
+        max_entries: Maximum number of cached problems before LRU eviction.
+
     Returns:
-        Tuple of (max_profit, result_dict).
-        max_profit is the maximum profit achieved.
-        result_dict maps variable names to their optimal values.
-    
-    Raises:
-        OptimizationError: If optimization fails or produces invalid results.
+        The SolveCache in use.
     """
-    if not variables:
-        raise OptimizationError("No variables to optimize")
-    if budget <= 0:
-        raise OptimizationError("Budget must be positive")
+    global solve_cache
+    solve_cache = SolveCache(path, max_entries)
+    return solve_cache
 
-    # Create and set up the model
+def disable_solve_cache() -> None:
+    """Stop using the persistent solve cache."""
+    global solve_cache
+    if solve_cache is not None:
+        solve_cache.close()
+    solve_cache = None
+
+def _lp_variables(variables: List[IntegerVariable]) -> Dict[str, LpVariable]:
+    """Create the PuLP variables of a problem, keyed by name."""
+    return {var.name: LpVariable(var.name, lowBound=var.lowerBound, upBound=var.upperBound,
+                                 cat='Integer' if var.integer else 'Continuous')
+            for var in variables}
+
+def _build_model(variables: List[IntegerVariable], budget: float) -> Tuple[LpProblem, Dict[str, LpVariable]]:
+    """Build the PuLP model and variables for a profit-maximization problem."""
     model = LpProblem("Production_Optimization", LpMaximize)
-    lp_vars = {}
 
     # Create PuLP variables
-    for var in variables:
-        lp_vars[var.name] = LpVariable(var.name, lowBound=var.lowerBound,
-                                     upBound=var.upperBound,
-                                     cat='Integer' if var.integer else 'Continuous')
+    lp_vars = _lp_variables(variables)
 
     # Add constraints
     budget_constraint = lpSum([var.multiplier * lp_vars[var.name] for var in variables])
@@ -125,25 +151,595 @@ def optimize(variables: List[IntegerVariable], budget: float) -> Tuple[float, Di
     # Set objective function
     total_profit = lpSum([var.profit * var.multiplier * lp_vars[var.name] for var in variables])
     model += total_profit, "Total_Profit"
+    return model, lp_vars
 
-    # Solve the model
-    solver = PULP_CBC_CMD(msg=False)
-    model.solve(solver)
-
+def _extract_result(model: LpProblem, lp_vars: Dict[str, LpVariable],
+                    variables: List[IntegerVariable]) -> Tuple[float, Dict[str, int]]:
+    """Check the solution status and read the profit and allocation from a solved model."""
     # Check solution status
     if LpStatus[model.status] != 'Optimal':
         raise OptimizationError(f"Failed to find optimal solution: {LpStatus[model.status]}")
 
-    # Process results
+    return _read_allocation(lp_vars, variables)
+
+def _read_allocation(lp_vars: Dict[str, LpVariable],
+                     variables: List[IntegerVariable]) -> Tuple[float, Dict[str, int]]:
+    """Read the profit and scaled allocation from the variable values of a model."""
     max_profit = 0
     result = {}
     for var in variables:
         optimal_value = lp_vars[var.name].varValue
         if optimal_value is None:
             optimal_value = 0
-        optimal_value = int(optimal_value)
+        # Round away solver noise (e.g. 2.9999999) on integer variables; continuous ones keep their value
+        optimal_value = int(round(optimal_value)) if var.integer else optimal_value
         scaled_value = optimal_value * var.multiplier
         result[var.name] = scaled_value
         max_profit += var.profit * scaled_value
 
     return float(f'{max_profit:.2f}'), result
+
+def _validate_problem(variables: List[IntegerVariable], budget: float) -> None:
+    """Raise OptimizationError for problems that cannot be solved."""
+    if not variables:
+        raise OptimizationError("No variables to optimize")
+    if budget <= 0:
+        raise OptimizationError("Budget must be positive")
+
+def optimize(variables: List[IntegerVariable], budget: float) -> Tuple[float, Dict[str, int]]:
+    """
+    Set up and solve the integer programming problem to maximize profit.
+    
+    Args:
+        variables: List of variables to optimize.
+        budget: Budget constraint value.
+    
+    Returns:
+        Tuple of (max_profit, result_dict).
+        max_profit is the maximum profit achieved.
+        result_dict maps variable names to their optimal values.
+    
+    Raises:
+        OptimizationError: If optimization fails or produces invalid results.
+    """
+    _validate_problem(variables, budget)
+
+    cache = solve_cache
+    if cache is not None:
+        key = problem_key(variables, budget)
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+    # Create and set up the model
+    model, lp_vars = _build_model(variables, budget)
+
+    # Solve the model
+    solver = PULP_CBC_CMD(msg=False)
+    model.solve(solver)
+
+    max_profit, result = _extract_result(model, lp_vars, variables)
+    if cache is not None:
+        cache.put(key, max_profit, result)
+    return max_profit, result
+
+async def _solve_cbc_async(model: LpProblem, solver: PULP_CBC_CMD) -> None:
+    """
+    Solve a model with the CBC binary in an asyncio subprocess.
+
+    Runs search/LP_PULP.solveCBCAsync, which awaits the process instead of blocking on it,
+    so many solves can run concurrently from a single thread.
+    """
+    try:
+        await solveCBCAsync(model, solver)
+    except RuntimeError as e:
+        raise OptimizationError(str(e)) from e
+
+async def optimize_async(variables: List[IntegerVariable], budget: float,
+                         semaphore: Optional[asyncio.Semaphore] = None) -> Tuple[float, Dict[str, int]]:
+    """
+    Asynchronous version of optimize that runs CBC without blocking the event loop.
+
+    Args:
+        variables: List of variables to optimize.
+        budget: Budget constraint value.
+        semaphore: Optional semaphore capping the number of concurrent CBC processes.
+
+    Returns:
+        Tuple of (max_profit, result_dict), as for optimize.
+
+    Raises:
+        OptimizationError: If optimization fails or produces invalid results.
+    """
+    _validate_problem(variables, budget)
+
+    cache = solve_cache
+    if cache is not None:
+        key = problem_key(variables, budget)
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+    model, lp_vars = _build_model(variables, budget)
+    solver = PULP_CBC_CMD(msg=False)
+    if semaphore is None:
+        await _solve_cbc_async(model, solver)
+    else:
+        async with semaphore:
+            await _solve_cbc_async(model, solver)
+
+    max_profit, result = _extract_result(model, lp_vars, variables)
+    if cache is not None:
+        cache.put(key, max_profit, result)
+    return max_profit, result
+
+async def optimize_many_async(problems: List[Tuple[List[IntegerVariable], float]],
+                              max_concurrency: Optional[int] = None) -> List[Tuple[float, Dict[str, int]]]:
+    """
+    Solve many independent problems concurrently.
+
+    Args:
+        problems: List of (variables, budget) pairs.
+        max_concurrency: Maximum number of CBC processes at once (default: CPU count).
+
+    Returns:
+        List of (max_profit, result_dict) in the same order as problems.
+
+    Raises:
+        OptimizationError: If any optimization fails.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency or os.cpu_count() or 1)
+    return await asyncio.gather(*(optimize_async(variables, budget, semaphore)
+                                  for variables, budget in problems))
+
+def optimize_many(problems: List[Tuple[List[IntegerVariable], float]],
+                  max_concurrency: Optional[int] = None) -> List[Tuple[float, Dict[str, int]]]:
+    """Blocking wrapper around optimize_many_async for synchronous callers."""
+    return asyncio.run(optimize_many_async(problems, max_concurrency))
+
+@dataclass
+class SolveResult:
+    """
+    Best solution found for a problem, with a bound on the optimal profit.
+
+    status is 'Optimal' when proven optimal, 'Feasible' when the solver stopped on the
+    time limit or gap tolerance, and 'Heuristic' for the greedy solution.
+    timings holds the seconds spent in each phase so far (cache, bound, greedy, build, solve, extract).
+    """
+    profit: float
+    allocation: Dict[str, int]
+    status: str
+    bound: float
+    gap: float
+    elapsed: float
+    source: str
+    timings: Dict[str, float] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict:
+        """Convert to a dictionary for JSON responses."""
+        return asdict(self)
+
+def _relative_gap(profit: float, bound: float) -> float:
+    """Relative gap between an incumbent and a bound (0 when they meet)."""
+    if bound - profit <= 1e-9:
+        return 0.0
+    return (bound - profit) / max(abs(bound), 1e-9)
+
+def _required_spend(variables: List[IntegerVariable]) -> Tuple[float, float]:
+    """Return (spend, profit) of setting every variable to its lower bound."""
+    spend = sum(var.multiplier * var.lowerBound for var in variables)
+    profit = sum(var.profit * var.multiplier * var.lowerBound for var in variables)
+    return spend, profit
+
+def lp_bound(variables: List[IntegerVariable], budget: float) -> float:
+    """
+    Upper bound on the optimal profit from the continuous relaxation.
+
+    With a single budget constraint the relaxation is solved greedily: after the lower
+    bounds, budget goes to the highest profit per unit of budget first, fractionally.
+
+    Raises:
+        OptimizationError: If the lower bounds alone exceed the budget.
+    """
+    spend, bound = _required_spend(variables)
+    remaining = budget - spend
+    if remaining < 0:
+        raise OptimizationError("Failed to find optimal solution: Infeasible")
+    for var in sorted(variables, key=lambda v: v.profit, reverse=True):
+        if var.profit <= 0 or remaining <= 0:
+            break
+        capacity = math.inf if var.upperBound is None else (var.upperBound - var.lowerBound) * var.multiplier
+        amount = min(remaining, capacity)
+        bound += var.profit * amount
+        remaining -= amount
+    return bound
+
+def greedy_solution(variables: List[IntegerVariable], budget: float) -> Tuple[float, Dict[str, int]]:
+    """
+    Fast feasible solution: lower bounds first, then the most profitable variables
+    (whole units for integer variables, fractional amounts for continuous ones).
+
+    Returns:
+        Tuple of (profit, result_dict) in the same form as optimize.
+
+    Raises:
+        OptimizationError: If the lower bounds alone exceed the budget.
+    """
+    spend, _ = _required_spend(variables)
+    remaining = budget - spend
+    if remaining < 0:
+        raise OptimizationError("Failed to find optimal solution: Infeasible")
+    units = {var.name: var.lowerBound for var in variables}
+    for var in sorted(variables, key=lambda v: v.profit, reverse=True):
+        if var.profit <= 0:
+            break
+        extra = int(remaining // var.multiplier) if var.integer else remaining / var.multiplier
+        if var.upperBound is not None:
+            extra = min(extra, var.upperBound - var.lowerBound)
+        if extra > 0:
+            units[var.name] += extra
+            remaining -= extra * var.multiplier
+
+    max_profit = 0
+    result = {}
+    for var in variables:
+        result[var.name] = units[var.name] * var.multiplier
+        max_profit += var.profit * result[var.name]
+    return float(f'{max_profit:.2f}'), result
+
+def _cbc_best_bound(log_path: str) -> Optional[float]:
+    """Best bound on the optimum reported in a CBC log of a maximization, or None if absent."""
+    try:
+        with open(log_path) as f:
+            for line in f:
+                if line.startswith('Upper bound:'):
+                    return float(line.split(':', 1)[1])
+    except (OSError, ValueError):
+        pass
+    return None
+
+def iter_solutions(variables: List[IntegerVariable], budget: float, time_limit: Optional[float] = None,
+                   gap_rel: Optional[float] = None, heuristic_first: bool = False) -> Iterator[SolveResult]:
+    """
+    Yield improving solutions: optionally a greedy one immediately, then CBC's incumbent.
+
+    CBC is warm-started from the greedy solution and given whatever remains of time_limit.
+    If a limit stops it without an incumbent, only the greedy solution is produced. When a
+    limit stops it early, the bound is CBC's best bound (no weaker than the LP relaxation).
+
+    Args:
+        variables: List of variables to optimize.
+        budget: Budget constraint value.
+        time_limit: Wall-clock budget in seconds for the whole call (None for no limit).
+        gap_rel: Relative gap at which CBC may stop early (None for proven optimality).
+        heuristic_first: Yield the greedy solution before running CBC.
+
+    Raises:
+        OptimizationError: If the problem is invalid or infeasible, or if CBC fails to prove
+            optimality without a time limit or gap tolerance.
+    """
+    start = time.perf_counter()
+    _validate_problem(variables, budget)
+    timings = {}
+    mark = start
+
+    def lap(phase):
+        nonlocal mark
+        now = time.perf_counter()
+        timings[phase] = now - mark
+        mark = now
+
+    cache = solve_cache
+    exact = time_limit is None and gap_rel is None
+    if cache is not None:
+        key = problem_key(variables, budget)
+        cached = cache.get(key)
+        lap('cache')
+        if cached is not None:
+            yield SolveResult(cached[0], cached[1], 'Optimal', cached[0], 0.0,
+                              time.perf_counter() - start, 'cache', dict(timings))
+            return
+
+    bound = lp_bound(variables, budget)
+    lap('bound')
+    greedy_profit, greedy_result = greedy_solution(variables, budget)
+    lap('greedy')
+    best = SolveResult(greedy_profit, greedy_result, 'Heuristic', bound,
+                       _relative_gap(greedy_profit, bound), time.perf_counter() - start, 'greedy',
+                       dict(timings))
+    if heuristic_first:
+        yield best
+
+    remaining = None if time_limit is None else time_limit - (time.perf_counter() - start)
+    if remaining is not None and remaining <= 0:
+        if not heuristic_first:
+            yield best
+        return
+
+    model, lp_vars = _build_model(variables, budget)
+    for var in variables:
+        lp_vars[var.name].setInitialValue(greedy_result[var.name] / var.multiplier)
+    log_path = None
+    if not exact:
+        # CBC reports its best bound only in the log
+        handle, log_path = tempfile.mkstemp(prefix='cbc-', suffix='.log')
+        os.close(handle)
+    solver = PULP_CBC_CMD(msg=False, timeLimit=remaining, gapRel=gap_rel, warmStart=True, logPath=log_path)
+    lap('build')
+    try:
+        model.solve(solver)
+        cbc_bound = _cbc_best_bound(log_path) if log_path else None
+    finally:
+        if log_path:
+            os.remove(log_path)
+    lap('solve')
+
+    status = LpStatus[model.status]
+    # CBC reports a stop on the time limit with an incumbent as Optimal with a feasible solution
+    proven = status == 'Optimal' and model.sol_status == LpSolutionOptimal and gap_rel is None
+    if status in ('Infeasible', 'Unbounded') or (exact and not proven):
+        raise OptimizationError(f"Failed to find optimal solution: {status}")
+    if status == 'Optimal' or (status == 'Not Solved' and model.sol_status > 0):
+        profit, result = _read_allocation(lp_vars, variables)
+        if proven:
+            bound = profit
+        elif cbc_bound is not None:
+            bound = max(min(bound, cbc_bound), profit)
+        if proven or profit > best.profit:
+            best = SolveResult(profit, result, 'Optimal' if proven else 'Feasible', bound,
+                               _relative_gap(profit, bound), time.perf_counter() - start, 'cbc')
+        else:
+            best = replace(best, bound=bound, gap=_relative_gap(best.profit, bound))
+        if proven and exact and cache is not None:
+            cache.put(key, profit, result)
+        lap('extract')
+
+    best.elapsed = time.perf_counter() - start
+    best.timings = dict(timings)
+    yield best
+
+def optimize_anytime(variables: List[IntegerVariable], budget: float, time_limit: Optional[float] = None,
+                     gap_rel: Optional[float] = None, heuristic_first: bool = False) -> SolveResult:
+    """
+    Solve within a deadline and/or gap tolerance, returning the best incumbent found.
+
+    Unlike optimize, hitting the limit is not an error: the best solution so far is returned
+    with an upper bound on the optimal profit and the relative gap between the two.
+
+    Args:
+        variables: List of variables to optimize.
+        budget: Budget constraint value.
+        time_limit: Wall-clock budget in seconds (None for no limit).
+        gap_rel: Relative gap at which CBC may stop early (None for proven optimality).
+        heuristic_first: Compute a greedy solution first and keep it if CBC finds nothing better.
+
+    Returns:
+        The best SolveResult found.
+
+    Raises:
+        OptimizationError: If the problem is invalid or infeasible.
+    """
+    result = None
+    for result in iter_solutions(variables, budget, time_limit, gap_rel, heuristic_first):
+        pass
+    return result
+
+@dataclass
+class Sensitivity:
+    """
+    Ranges over which an optimal allocation stays optimal, used to answer what-if edits
+    without calling the solver.
+
+    budget_range is [low, high): the allocation stays optimal from its own spend up to, but
+    excluding, the cheapest budget that affords a strictly better solution. profit_ranges maps
+    variable names to the closed [low, high] range of that variable's profit, all else unchanged,
+    over which the allocation stays optimal. Unbounded ends are math.inf or -math.inf. Variables
+    without a range are answered by re-solving.
+    """
+    variables: List[IntegerVariable]
+    budget: float
+    profit: float
+    allocation: Dict[str, float]
+    budget_range: Tuple[float, float]
+    profit_ranges: Dict[str, Tuple[float, float]] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict:
+        """Convert to a JSON-serializable dictionary (unbounded ends become None)."""
+        def finite(bounds):
+            return [bound if math.isfinite(bound) else None for bound in bounds]
+        return {
+            'variables': [var.to_dict() for var in self.variables],
+            'budget': self.budget,
+            'profit': self.profit,
+            'allocation': self.allocation,
+            'budget_range': finite(self.budget_range),
+            'profit_ranges': {name: finite(bounds) for name, bounds in self.profit_ranges.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'Sensitivity':
+        """Create a Sensitivity from the output of to_dict."""
+        def bounds(pair):
+            low, high = pair
+            return (-math.inf if low is None else low, math.inf if high is None else high)
+        return cls(variables=[IntegerVariable.from_dict(item) for item in data['variables']],
+                   budget=data['budget'], profit=data['profit'], allocation=data['allocation'],
+                   budget_range=bounds(data['budget_range']),
+                   profit_ranges={name: bounds(pair) for name, pair in data['profit_ranges'].items()})
+
+    def answer(self, variables: List[IntegerVariable], budget: float) -> Optional[Tuple[float, Dict[str, float]]]:
+        """
+        Answer an edited problem from the ranges, if the stored allocation is still optimal.
+
+        Only the budget or a single variable's profit may differ from the analysed problem,
+        and the new value must lie in its range.
+
+        Returns:
+            Tuple of (max_profit, result_dict) as for optimize, or None if the problem must be re-solved.
+        """
+        if len(variables) != len(self.variables):
+            return None
+        known = {var.name: var for var in self.variables}
+        changed = []
+        for var in variables:
+            old = known.get(var.name)
+            if old is None or replace(old, profit=var.profit) != var:
+                return None
+            if var.profit != old.profit:
+                changed.append(var)
+        budget_changed = budget != self.budget
+        if len(changed) + budget_changed > 1:
+            return None
+        if budget_changed and not self.budget_range[0] <= budget < self.budget_range[1]:
+            return None
+        if changed:
+            low, high = self.profit_ranges.get(changed[0].name, (math.inf, -math.inf))
+            if not low <= changed[0].profit <= high:
+                return None
+
+        result = {var.name: self.allocation[var.name] for var in variables}
+        max_profit = sum(var.profit * result[var.name] for var in variables)
+        return float(f'{max_profit:.2f}'), result
+
+def _allocation_value(variables: List[IntegerVariable], allocation: Dict[str, float]) -> float:
+    """Unrounded profit of a scaled allocation."""
+    return sum(var.profit * allocation[var.name] for var in variables)
+
+# Smallest profit gain counted as an improvement: profits are reported to the penny, so an
+# absolute margin keeps real gains visible however large the profit is
+IMPROVEMENT_MARGIN = 0.005
+
+def _best_value(variables: List[IntegerVariable], budget: float) -> Tuple[float, Dict[str, float]]:
+    """Solve like optimize (through the solve cache), returning the unrounded profit and the allocation."""
+    _, result = optimize(variables, budget)
+    return _allocation_value(variables, result), result
+
+def _cheapest_improvement(variables: List[IntegerVariable], value: float) -> float:
+    """Smallest budget affording a solution strictly more profitable than value (math.inf if none)."""
+    model = LpProblem("Cheapest_Improvement", LpMinimize)
+    lp_vars = _lp_variables(variables)
+    model += lpSum([var.multiplier * lp_vars[var.name] for var in variables]), "Total_Spend"
+    model += (lpSum([var.profit * var.multiplier * lp_vars[var.name] for var in variables])
+              >= value + IMPROVEMENT_MARGIN, "Improvement")
+    model.solve(PULP_CBC_CMD(msg=False))
+    if LpStatus[model.status] == 'Infeasible':
+        return math.inf
+    if LpStatus[model.status] != 'Optimal':
+        raise OptimizationError(f"Failed to find the budget range: {LpStatus[model.status]}")
+    _, result = _read_allocation(lp_vars, variables)
+    return sum(result.values())
+
+def _profit_range(variables: List[IntegerVariable], budget: float, allocation: Dict[str, float],
+                  index: int, max_probes: int = 60, deadline: Optional[float] = None) -> Tuple[float, float]:
+    """
+    Profit range of one variable over which an allocation stays optimal.
+
+    The optimal profit as a function of the variable's profit p is the upper envelope of the
+    lines p * spend(x) + rest(x) of all feasible allocations x, so the allocation is optimal on
+    an interval. Each end is found by doubling the step from the current profit until a probe
+    solve finds a better allocation, then by intersecting the current line with the lines of the
+    better allocations until the intersection itself is still optimal. When the probes run out,
+    the last verified profit is used, which keeps the range conservative; the same goes for
+    probes cut short by the deadline (a time.perf_counter() value).
+    """
+    var = variables[index]
+    amount = allocation[var.name]
+    units = amount / var.multiplier
+    rest = _allocation_value(variables, allocation) - var.profit * amount
+
+    def probe(profit: float) -> Tuple[bool, float, float]:
+        probed = list(variables)
+        probed[index] = replace(var, profit=profit)
+        value, result = _best_value(probed, budget)
+        current = rest + profit * amount
+        return value < current + IMPROVEMENT_MARGIN, value, result[var.name]
+
+    def expired() -> bool:
+        return deadline is not None and time.perf_counter() >= deadline
+
+    def breakpoint(direction: int) -> float:
+        verified = var.profit
+        step = max(1.0, abs(var.profit))
+        for _ in range(max_probes):
+            if expired():
+                return verified
+            profit = verified + direction * step
+            optimal, value, spend = probe(profit)
+            if not optimal:
+                break
+            verified = profit
+            step *= 2
+        else:
+            return verified
+        for _ in range(max_probes):
+            if abs(spend - amount) < 1e-12 or expired():
+                return verified
+            profit = (rest - (value - profit * spend)) / (spend - amount)
+            optimal, value, spend = probe(profit)
+            if optimal:
+                return profit
+        return verified
+
+    required, _ = _required_spend(variables)
+    room = (budget - required) / var.multiplier + var.lowerBound
+    most = math.floor(room + 1e-9) if var.integer else room
+    if var.upperBound is not None:
+        most = min(most, var.upperBound)
+    # CBC leaves continuous values within about 1e-7 of their bounds
+    high = math.inf if units >= most - 1e-6 * max(1.0, abs(most)) else breakpoint(1)
+    low = -math.inf if units <= var.lowerBound + 1e-6 * max(1.0, var.lowerBound) else breakpoint(-1)
+    return low, high
+
+def sensitivity_analysis(variables: List[IntegerVariable], budget: float, allocation: Dict[str, float],
+                         profit_ranges: bool = True, time_limit: Optional[float] = None) -> Sensitivity:
+    """
+    Compute the budget and profit ranges over which an optimal allocation stays optimal.
+
+    The budget range takes at most one extra solve. Each profit range takes a few solves per end,
+    except for ends that are unbounded (e.g. a variable already at its upper bound). Probe solves
+    go through the solve cache, so repeating the analysis of a problem is cheap when it is enabled.
+
+    Args:
+        variables: List of variables of the solved problem.
+        budget: Budget constraint value of the solved problem.
+        allocation: Optimal result_dict returned by optimize.
+        profit_ranges: Also compute the per-variable profit ranges.
+        time_limit: Seconds to spend on profit ranges (None for no limit). Ranges being probed
+            when it runs out are narrowed to what was verified; later variables get none.
+
+    Returns:
+        The Sensitivity of the allocation.
+
+    Raises:
+        OptimizationError: If the problem is invalid or a probe solve fails.
+    """
+    _validate_problem(variables, budget)
+    value = _allocation_value(variables, allocation)
+    spend = sum(allocation[var.name] for var in variables)
+    # Any extra budget improves on the allocation while a profitable continuous variable has room
+    growing = any(var.profit > 0 and not var.integer and
+                  (var.upperBound is None or allocation[var.name] < var.upperBound * var.multiplier * (1 - 1e-6))
+                  for var in variables)
+    budget_range = (spend, spend if growing else _cheapest_improvement(variables, value))
+    ranges = {}
+    if profit_ranges:
+        deadline = None if time_limit is None else time.perf_counter() + time_limit
+        for index, var in enumerate(variables):
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+            ranges[var.name] = _profit_range(variables, budget, allocation, index, deadline=deadline)
+    return Sensitivity(list(variables), budget, float(f'{value:.2f}'), dict(allocation), budget_range, ranges)
+
+def optimize_with_sensitivity(variables: List[IntegerVariable], budget: float,
+                              profit_ranges: bool = True) -> Tuple[float, Dict[str, int], Sensitivity]:
+    """
+    Solve like optimize and also return the ranges over which the result stays optimal.
+
+    Returns:
+        Tuple of (max_profit, result_dict, sensitivity).
+
+    Raises:
+        OptimizationError: If optimization fails or produces invalid results.
+    """
+    max_profit, result = optimize(variables, budget)
+    return max_profit, result, sensitivity_analysis(variables, budget, result, profit_ranges)
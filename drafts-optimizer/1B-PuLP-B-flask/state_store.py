@@ -0,0 +1,339 @@
+"""
+state_store.py
+
+Shared application state (variables and budget) for the Flask app, stored in SQLite.
+
+- Every worker process reads and writes the same database file, so multiple Gunicorn
+  workers see consistent data.
+- WAL mode lets readers proceed while another worker writes (connections are set up by
+  sqlite_connection.py from the search/ package, like the solve cache's).
+- Variables keep their insertion order; pages are filtered and sorted in SQL.
+- Batches of add/update/delete operations are validated together and applied in one
+  transaction, so other workers see either none or all of them.
+- The sensitivity ranges of the last exact solve are kept with the settings, so any worker
+  can answer what-if edits from them.
+
+@author: Mafu
+@date: 2026-10-19
+"""
+
+import json
+import math
+import sqlite3
+from typing import Any, Dict, List, Optional
+from optimizer_core import IntegerVariable, OptimizationError
+from sqlite_connection import ThreadConnections
+
+FIELDS = ('name', 'lowerBound', 'upperBound', 'profit', 'integer', 'multiplier')
+
+class BulkOperationError(OptimizationError):
+    """
+    A batch of variable operations was rejected; nothing was applied.
+
+    Attributes:
+        errors: One {'index', 'message'} dictionary per invalid operation.
+    """
+    def __init__(self, errors: List[Dict[str, Any]]):
+        super().__init__(f"{len(errors)} invalid operation(s), nothing was applied")
+        self.errors = errors
+
+# Range of SQLite INTEGER columns (larger Python ints cannot be bound)
+SQLITE_MIN_INTEGER, SQLITE_MAX_INTEGER = -2 ** 63, 2 ** 63 - 1
+
+def _is_number(value: Any) -> bool:
+    """Whether a JSON value is a finite number SQLite can store (booleans are not numbers)."""
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return False
+    if isinstance(value, int):
+        return SQLITE_MIN_INTEGER <= value <= SQLITE_MAX_INTEGER
+    return math.isfinite(value)
+
+def _is_whole(value: Any) -> bool:
+    """Whether a JSON value is a whole number within SQLite's 64-bit INTEGER range."""
+    return _is_number(value) and float(value).is_integer() and SQLITE_MIN_INTEGER <= value <= SQLITE_MAX_INTEGER
+
+def _merge_variable(fields: Any, base: Optional[IntegerVariable] = None) -> IntegerVariable:
+    """
+    Build a validated variable from JSON fields, on top of an existing variable for updates.
+
+    Raises:
+        OptimizationError: If a field is unknown, has the wrong type or the variable is invalid.
+    """
+    if not isinstance(fields, dict):
+        raise OptimizationError("'variable' must be an object")
+    unknown = set(fields) - set(FIELDS)
+    if unknown:
+        raise OptimizationError(f"Unknown field(s): {', '.join(sorted(unknown))}")
+    data = base.to_dict() if base else {}
+    data.update(fields)
+    if 'name' not in data or 'profit' not in data:
+        raise OptimizationError("'name' and 'profit' are required")
+    var = IntegerVariable(**data)
+    if not isinstance(var.name, str) or not var.name:
+        raise OptimizationError("'name' must be a non-empty string")
+    if not _is_number(var.profit):
+        raise OptimizationError(f"Profit must be a finite number for {var.name}")
+    if (not _is_whole(var.lowerBound) or not _is_whole(var.multiplier)
+            or not (var.upperBound is None or _is_whole(var.upperBound))):
+        raise OptimizationError(f"Bounds and multiplier must be 64-bit integers for {var.name}")
+    if not isinstance(var.integer, bool):
+        raise OptimizationError(f"'integer' must be true or false for {var.name}")
+    var.lowerBound, var.multiplier = int(var.lowerBound), int(var.multiplier)
+    var.upperBound = None if var.upperBound is None else int(var.upperBound)
+    var.validate()
+    return var
+
+class StateStore:
+    """
+    SQLite-backed store for the variables list and settings such as the budget.
+
+    Each thread (and each forked process) opens its own connection to the database file.
+
+    Attributes:
+        path: Path of the SQLite database file.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._connections = ThreadConnections(path)
+        connection = self._connection()
+        connection.executescript("""
+            CREATE TABLE IF NOT EXISTS variables (
+                position INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL UNIQUE,
+                lowerBound INTEGER NOT NULL,
+                upperBound INTEGER,
+                profit REAL NOT NULL,
+                integer INTEGER NOT NULL,
+                multiplier INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS settings (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+        """)
+        # One index per sortable field, matching the ORDER BY of page_variables, so sorted pages
+        # walk an index instead of sorting the whole table
+        for field in FIELDS:
+            connection.execute(f"CREATE INDEX IF NOT EXISTS variables_by_{field} "
+                               f"ON variables ({field} IS NULL, {field})")
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return this thread's connection."""
+        return self._connections.get()
+
+    @staticmethod
+    def _row_to_variable(row) -> IntegerVariable:
+        name, lower, upper, profit, integer, multiplier = row
+        return IntegerVariable(name=name, lowerBound=lower, upperBound=upper, profit=profit,
+                               integer=bool(integer), multiplier=multiplier)
+
+    @staticmethod
+    def _variable_to_row(var: IntegerVariable) -> tuple:
+        return (var.name, var.lowerBound, var.upperBound, var.profit, int(bool(var.integer)), var.multiplier)
+
+    # Variables
+
+    def load_variables(self) -> List[IntegerVariable]:
+        """Return a snapshot of all variables in insertion order."""
+        rows = self._connection().execute(
+            f"SELECT {', '.join(FIELDS)} FROM variables ORDER BY position").fetchall()
+        return [self._row_to_variable(row) for row in rows]
+
+    def count_variables(self) -> int:
+        """Return the number of stored variables."""
+        return self._connection().execute("SELECT COUNT(*) FROM variables").fetchone()[0]
+
+    def get_variable(self, name: str) -> Optional[IntegerVariable]:
+        """Return the variable with the given name, or None."""
+        row = self._connection().execute(
+            f"SELECT {', '.join(FIELDS)} FROM variables WHERE name = ?", (name,)).fetchone()
+        return self._row_to_variable(row) if row else None
+
+    def add_variable(self, var: IntegerVariable) -> None:
+        """
+        Append a variable.
+
+        Raises:
+            OptimizationError: If a variable with the same name already exists.
+        """
+        try:
+            self._connection().execute(
+                f"INSERT INTO variables ({', '.join(FIELDS)}) VALUES (?, ?, ?, ?, ?, ?)",
+                self._variable_to_row(var))
+        except sqlite3.IntegrityError:
+            raise OptimizationError(f"A variable named {var.name} already exists")
+
+    def update_variable(self, old_name: str, var: IntegerVariable) -> bool:
+        """
+        Replace a variable in place, keeping its position.
+
+        Returns:
+            False if no variable named old_name exists.
+
+        Raises:
+            OptimizationError: If the new name is taken by another variable.
+        """
+        try:
+            cursor = self._connection().execute(
+                f"UPDATE variables SET {', '.join(f'{field} = ?' for field in FIELDS)} WHERE name = ?",
+                self._variable_to_row(var) + (old_name,))
+        except sqlite3.IntegrityError:
+            raise OptimizationError(f"A variable named {var.name} already exists")
+        return cursor.rowcount > 0
+
+    def delete_variable(self, name: str) -> bool:
+        """Delete a variable by name. Returns False if it did not exist."""
+        return self._connection().execute("DELETE FROM variables WHERE name = ?", (name,)).rowcount > 0
+
+    def replace_variables(self, variables: List[IntegerVariable]) -> None:
+        """Atomically replace every variable with a new list."""
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.execute("DELETE FROM variables")
+            connection.executemany(
+                f"INSERT INTO variables ({', '.join(FIELDS)}) VALUES (?, ?, ?, ?, ?, ?)",
+                [self._variable_to_row(var) for var in variables])
+        except sqlite3.IntegrityError:
+            connection.execute("ROLLBACK")
+            raise OptimizationError("Variable names must be unique")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+
+    def apply_operations(self, operations: List[Dict[str, Any]]) -> Dict[str, int]:
+        """
+        Validate and apply a batch of variable operations as one atomic change.
+
+        Operations run in order against the current variables:
+        {'op': 'add', 'variable': {...}}, {'op': 'update', 'name': ..., 'variable': {fields to change}}
+        and {'op': 'delete', 'name': ...}. Every operation is checked before anything is written;
+        updated variables keep their position and added ones go last.
+
+        Returns:
+            Counts of added, updated and deleted variables, and the new total.
+
+        Raises:
+            BulkOperationError: If any operation is invalid (nothing is applied).
+        """
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            rows = connection.execute(
+                f"SELECT position, {', '.join(FIELDS)} FROM variables ORDER BY position").fetchall()
+            # name -> (position or None for added variables, variable)
+            current = {row[1]: (row[0], self._row_to_variable(row[1:])) for row in rows}
+            touched, deleted, errors = set(), set(), []
+            counts = {'added': 0, 'updated': 0, 'deleted': 0}
+            for index, operation in enumerate(operations):
+                try:
+                    if not isinstance(operation, dict):
+                        raise OptimizationError("Operation must be an object")
+                    op, name = operation.get('op'), operation.get('name')
+                    if op == 'add':
+                        var = _merge_variable(operation.get('variable'))
+                        if var.name in current:
+                            raise OptimizationError(f"A variable named {var.name} already exists")
+                        current[var.name] = (None, var)
+                    elif op in ('update', 'delete'):
+                        if name not in current:
+                            raise OptimizationError(f"Variable {name} not found")
+                        position, old = current[name]
+                        if op == 'delete':
+                            del current[name]
+                            deleted.add(position)
+                        else:
+                            var = _merge_variable(operation.get('variable'), old)
+                            if var.name != name and var.name in current:
+                                raise OptimizationError(f"A variable named {var.name} already exists")
+                            del current[name]
+                            current[var.name] = (position, var)
+                            touched.add(position)
+                    else:
+                        raise OptimizationError(f"Unknown operation {op!r}, expected 'add', 'update' or 'delete'")
+                    counts[{'add': 'added', 'update': 'updated', 'delete': 'deleted'}[op]] += 1
+                except (OptimizationError, TypeError, ValueError) as e:
+                    errors.append({'index': index, 'message': str(e)})
+            if errors:
+                raise BulkOperationError(errors)
+
+            # Rewrite changed rows in place by position; names are unique in the final state,
+            # so deleting before inserting avoids transient conflicts (e.g. swapped names)
+            connection.executemany("DELETE FROM variables WHERE position = ?",
+                                   [(position,) for position in (touched | deleted) - {None}])
+            kept = [(position, var) for position, var in current.values() if position is not None and position in touched]
+            connection.executemany(
+                f"INSERT INTO variables (position, {', '.join(FIELDS)}) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(position,) + self._variable_to_row(var) for position, var in kept])
+            connection.executemany(
+                f"INSERT INTO variables ({', '.join(FIELDS)}) VALUES (?, ?, ?, ?, ?, ?)",
+                [self._variable_to_row(var) for position, var in current.values() if position is None])
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+        counts['total'] = len(current)
+        return counts
+
+    def page_variables(self, page: int = 1, per_page: int = 50, sort: Optional[str] = None,
+                       order: str = 'asc', query: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Return one page of variables, optionally filtered by name and sorted by a field.
+
+        Unbounded upper bounds sort after every finite bound. Ties keep insertion order, reversed
+        when sorting in descending order.
+        """
+        if sort is not None and sort not in FIELDS:
+            raise ValueError(f"Cannot sort by {sort!r}")
+        direction = 'DESC' if order == 'desc' else 'ASC'
+        where, params = '', []
+        if query:
+            where = "WHERE name LIKE ? ESCAPE '\\'"
+            escaped = query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            params.append(f"%{escaped}%")
+        order_by = f"{sort} IS NULL {direction}, {sort} {direction}, position {direction}" if sort else "position"
+
+        connection = self._connection()
+        total = connection.execute(f"SELECT COUNT(*) FROM variables {where}", params).fetchone()[0]
+        pages = max(1, -(-total // per_page))
+        page = min(max(1, page), pages)
+        rows = connection.execute(
+            f"SELECT {', '.join(FIELDS)} FROM variables {where} ORDER BY {order_by} LIMIT ? OFFSET ?",
+            params + [per_page, (page - 1) * per_page]).fetchall()
+        return {
+            'items': [self._row_to_variable(row).to_dict() for row in rows],
+            'page': page,
+            'per_page': per_page,
+            'pages': pages,
+            'total': total,
+        }
+
+    # Settings
+
+    def get_budget(self, default: float) -> float:
+        """Return the stored budget, or default if none has been set."""
+        row = self._connection().execute("SELECT value FROM settings WHERE key = 'budget'").fetchone()
+        if row is None:
+            return default
+        value = float(row[0])
+        return int(value) if value.is_integer() else value
+
+    def set_budget(self, budget: float) -> None:
+        """Store the budget."""
+        self._connection().execute(
+            "INSERT OR REPLACE INTO settings (key, value) VALUES ('budget', ?)", (str(budget),))
+
+    def get_sensitivity(self) -> Optional[Dict[str, Any]]:
+        """Return the stored sensitivity of the last exact solve (see Sensitivity.to_dict), or None."""
+        row = self._connection().execute("SELECT value FROM settings WHERE key = 'sensitivity'").fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set_sensitivity(self, data: Dict[str, Any]) -> None:
+        """Store the sensitivity of the last exact solve."""
+        self._connection().execute(
+            "INSERT OR REPLACE INTO settings (key, value) VALUES ('sensitivity', ?)", (json.dumps(data),))
+
+    def close(self) -> None:
+        """Close this thread's connection."""
+        self._connections.close()
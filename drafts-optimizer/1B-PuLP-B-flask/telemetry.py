@@ -0,0 +1,299 @@
+"""
+telemetry.py
+
+Structured per-solve logging and Prometheus metrics for the Flask app.
+
+- Every solve is logged as one JSON line with the variable count, budget, status, source,
+  gap and phase timings (or the error that stopped it).
+- Counters and latency histograms for solves and HTTP requests are exposed in the
+  Prometheus text format (see the /metrics endpoint in app.py).
+- With a metrics directory, each worker process writes its metrics to <pid>-<start>.json there
+  and /metrics sums every file, so any Gunicorn worker can answer a scrape for all of them.
+  When a worker exits, mark_process_dead (called from Gunicorn's child_exit hook) folds its
+  file into exited.json, so totals never go backwards and recycled pids never collide.
+
+@author: Mafu
+@date: 2026-10-19
+"""
+
+import atexit
+import glob
+import json
+import logging
+import math
+import os
+import tempfile
+import threading
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, math.inf)
+SIZE_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000, math.inf)
+
+# name: (type, help, buckets)
+METRICS = {
+    'optimizer_solves_total': ('counter', 'Solves by final status and source of the solution.', None),
+    'optimizer_solve_duration_seconds': ('histogram', 'Wall-clock time of a solve.', LATENCY_BUCKETS),
+    'optimizer_solve_phase_seconds': ('histogram', 'Time spent in each phase of a solve.', LATENCY_BUCKETS),
+    'optimizer_solve_variables': ('histogram', 'Number of variables per solve.', SIZE_BUCKETS),
+    'optimizer_solve_cache_lookups_total': ('counter', 'Solve cache lookups by result.', None),
+    'optimizer_solve_cache_entries': ('gauge', 'Problems stored in the solve cache.', None),
+    'optimizer_solve_cache_max_entries': ('gauge', 'Solve cache capacity before LRU eviction.', None),
+    'optimizer_http_requests_total': ('counter', 'HTTP requests by endpoint, method and status code.', None),
+    'optimizer_http_request_duration_seconds': ('histogram', 'HTTP request latency by endpoint.', LATENCY_BUCKETS),
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+def _labels(labels: Optional[Dict[str, object]]) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in (labels or {}).items()))
+
+def _format_labels(labels: Iterable[Tuple[str, str]]) -> str:
+    pairs = []
+    for key, value in labels:
+        escaped = value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{key}="{escaped}"')
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+class MetricsRegistry:
+    """
+    Thread-safe counters and histograms, optionally shared between processes via files.
+
+    Attributes:
+        directory: Directory holding one metrics file per process (None for this process only).
+        flush_interval: Minimum seconds between writes of this process's file.
+    """
+    def __init__(self, directory: Optional[str] = None, flush_interval: float = 1.0):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+        self._histograms: Dict[Tuple[str, Labels], list] = {}
+        self._lock = threading.Lock()
+        self._last_flush = 0.0
+        self._pid = None
+        self._path = None
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            atexit.register(self.flush, True)
+
+    def inc(self, name: str, labels: Optional[Dict[str, object]] = None, amount: float = 1) -> None:
+        """Increase a counter."""
+        key = (name, _labels(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+        self.flush()
+
+    def observe(self, name: str, value: float, labels: Optional[Dict[str, object]] = None) -> None:
+        """Record an observation in a histogram."""
+        buckets = METRICS[name][2]
+        key = (name, _labels(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [[0] * len(buckets), 0.0, 0]
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    histogram[0][i] += 1
+                    break
+            histogram[1] += value
+            histogram[2] += 1
+        self.flush()
+
+    def snapshot(self) -> Dict[str, list]:
+        """Return this process's metrics in a JSON-serializable form."""
+        with self._lock:
+            return {
+                'counters': [[name, list(map(list, labels)), value]
+                             for (name, labels), value in self._counters.items()],
+                'histograms': [[name, list(map(list, labels)), list(counts), total, count]
+                               for (name, labels), (counts, total, count) in self._histograms.items()],
+            }
+
+    def flush(self, force: bool = False) -> None:
+        """Write this process's metrics file if the flush interval has passed."""
+        if not self.directory:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_flush < self.flush_interval:
+            return
+        self._last_flush = now
+        _write_snapshot(self.file_path(), self.snapshot())
+
+    def file_path(self) -> str:
+        """Path of this process's metrics file, unique even if the pid is later reused."""
+        pid = os.getpid()
+        if self._pid != pid:
+            self._pid, self._path = pid, os.path.join(self.directory, f'{pid}-{time.time_ns()}.json')
+        return self._path
+
+    def collect(self) -> Tuple[Dict, Dict]:
+        """Return (counters, histograms) summed over every process sharing the directory."""
+        snapshots = [self.snapshot()]
+        own = self.file_path() if self.directory else None
+        for path in glob.glob(os.path.join(self.directory, '*.json')) if self.directory else []:
+            if path == own:
+                continue
+            snapshot = _read_snapshot(path)
+            if snapshot is not None:
+                snapshots.append(snapshot)
+        return _merge_snapshots(snapshots)
+
+    def render(self, gauges: Optional[Dict[str, float]] = None) -> str:
+        """
+        Render every metric in the Prometheus text exposition format.
+
+        Args:
+            gauges: Point-in-time values (by metric name) to include in the output.
+        """
+        counters, histograms = self.collect()
+        lines = []
+        for name, (kind, help_text, buckets) in METRICS.items():
+            if kind == 'counter':
+                samples = [(labels, value) for (metric, labels), value in counters.items() if metric == name]
+            elif kind == 'histogram':
+                samples = [(labels, value) for (metric, labels), value in histograms.items() if metric == name]
+            else:
+                samples = [((), gauges[name])] if gauges and name in gauges else []
+            if not samples:
+                continue
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            for labels, value in sorted(samples):
+                if kind != 'histogram':
+                    lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+                    continue
+                counts, total, count = value
+                cumulative = 0
+                for bound, bucket_count in zip(buckets, counts):
+                    cumulative += bucket_count
+                    lines.append(f'{name}_bucket{_format_labels(labels + (("le", _format_value(bound)),))} {cumulative}')
+                lines.append(f'{name}_sum{_format_labels(labels)} {_format_value(total)}')
+                lines.append(f'{name}_count{_format_labels(labels)} {count}')
+        return '\n'.join(lines) + '\n'
+
+def _read_snapshot(path: str) -> Optional[Dict[str, list]]:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _write_snapshot(path: str, snapshot: Dict[str, list]) -> None:
+    """Replace a metrics file atomically, so readers never see a partial file."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(snapshot, f)
+    os.replace(tmp_path, path)
+
+def _merge_snapshots(snapshots: Iterable[Dict[str, list]]) -> Tuple[Dict, Dict]:
+    """Sum snapshots into (counters, histograms) keyed by (name, labels)."""
+    counters, histograms = {}, {}
+    for snapshot in snapshots:
+        for name, labels, value in snapshot['counters']:
+            key = (name, tuple(map(tuple, labels)))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, counts, total, count in snapshot['histograms']:
+            key = (name, tuple(map(tuple, labels)))
+            merged = histograms.setdefault(key, [[0] * len(counts), 0.0, 0])
+            merged[0] = [a + b for a, b in zip(merged[0], counts)]
+            merged[1] += total
+            merged[2] += count
+    return counters, histograms
+
+EXITED_FILE = 'exited.json'
+
+def mark_process_dead(directory: str, pid: int) -> None:
+    """
+    Fold the metrics files of an exited process into the directory's exited.json.
+
+    Call from a single process (Gunicorn's master, in the child_exit hook) once the worker
+    has exited. Its counts stay in the totals, but its file is removed.
+    """
+    paths = glob.glob(os.path.join(directory, f'{pid}-*.json'))
+    if not paths:
+        return
+    exited_path = os.path.join(directory, EXITED_FILE)
+    snapshots = [snapshot for snapshot in map(_read_snapshot, [exited_path] + paths) if snapshot is not None]
+    counters, histograms = _merge_snapshots(snapshots)
+    _write_snapshot(exited_path, {
+        'counters': [[name, list(map(list, labels)), value] for (name, labels), value in counters.items()],
+        'histograms': [[name, list(map(list, labels)), counts, total, count]
+                       for (name, labels), (counts, total, count) in histograms.items()],
+    })
+    for path in paths:
+        os.remove(path)
+
+class Telemetry:
+    """
+    Records solves and HTTP requests as metrics and JSON log lines.
+
+    Attributes:
+        registry: Metrics of this process (and of its siblings when sharing a directory).
+        logger: Logger receiving one JSON line per solve.
+    """
+    def __init__(self, registry: MetricsRegistry, logger: Optional[logging.Logger] = None):
+        self.registry = registry
+        self.logger = logger or logging.getLogger('optimizer.telemetry')
+
+    def record_solve(self, variables: int, budget: float, elapsed: float, result=None,
+                     error: Optional[Exception] = None, cache_enabled: bool = False) -> None:
+        """
+        Record one solve.
+
+        Args:
+            variables: Number of variables in the problem.
+            budget: Budget constraint value.
+            elapsed: Wall-clock seconds of the solve.
+            result: SolveResult of a successful solve.
+            error: Exception that made the solve fail.
+            cache_enabled: Whether the solve cache was consulted.
+        """
+        status = result.status if result is not None else 'Error'
+        source = result.source if result is not None else 'none'
+        timings = result.timings if result is not None else {}
+        registry = self.registry
+        registry.inc('optimizer_solves_total', {'status': status, 'source': source})
+        registry.observe('optimizer_solve_duration_seconds', elapsed, {'status': status})
+        registry.observe('optimizer_solve_variables', variables)
+        for phase, seconds in timings.items():
+            registry.observe('optimizer_solve_phase_seconds', seconds, {'phase': phase})
+        if cache_enabled and 'cache' in timings:
+            registry.inc('optimizer_solve_cache_lookups_total', {'result': 'hit' if source == 'cache' else 'miss'})
+
+        record = {
+            'event': 'solve',
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'pid': os.getpid(),
+            'variables': variables,
+            'budget': budget,
+            'status': status,
+            'source': source,
+            'elapsed': round(elapsed, 6),
+            'timings': {phase: round(seconds, 6) for phase, seconds in timings.items()},
+        }
+        if result is not None:
+            record.update(profit=result.profit, bound=result.bound, gap=result.gap)
+        if error is not None:
+            record['error'] = str(error)
+        self.logger.log(logging.ERROR if error is not None else logging.INFO, json.dumps(record))
+
+    def record_request(self, endpoint: str, method: str, code: int, elapsed: float) -> None:
+        """Record one HTTP request."""
+        self.registry.inc('optimizer_http_requests_total', {'endpoint': endpoint, 'method': method, 'code': code})
+        self.registry.observe('optimizer_http_request_duration_seconds', elapsed, {'endpoint': endpoint})
+
+def configure_logger(path: Optional[str] = None) -> logging.Logger:
+    """Send solve records to a file (or stderr) as bare JSON lines."""
+    logger = logging.getLogger('optimizer.telemetry')
+    if not logger.handlers:
+        handler = logging.FileHandler(path) if path else logging.StreamHandler()
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+    return logger
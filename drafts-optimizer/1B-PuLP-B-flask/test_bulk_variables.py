@@ -0,0 +1,81 @@
+"""
+Tests for the atomic /api/variables/bulk endpoint.
+
+Run with pytest from this directory.
+
+@author: Mafu
+@date: 2026-10-19
+"""
+
+import pytest
+
+from app import create_app
+from config import Config
+
+@pytest.fixture
+def client(tmp_path):
+    class TestConfig(Config):
+        STATE_DB_PATH = str(tmp_path / 'state.db')
+        UPLOAD_FOLDER = str(tmp_path / 'uploads')
+        EXPORT_FOLDER = str(tmp_path / 'exports')
+        TELEMETRY_LOG_PATH = str(tmp_path / 'telemetry.log')
+        METRICS_DIR = None
+        SOLVE_CACHE_PATH = None
+    return create_app(TestConfig).test_client()
+
+def variable(name, profit=1.0, **fields):
+    return dict({'name': name, 'lowerBound': 0, 'upperBound': None, 'profit': profit, 'multiplier': 1}, **fields)
+
+def bulk(client, *operations):
+    return client.post('/api/variables/bulk', json={'operations': list(operations)})
+
+def names(client):
+    return [item['name'] for item in client.get('/api/variables').get_json()['items']]
+
+def test_valid_batch_is_applied_in_order(client):
+    bulk(client, {'op': 'add', 'variable': variable('a')}, {'op': 'add', 'variable': variable('b')})
+    response = bulk(client, {'op': 'update', 'name': 'a', 'variable': {'profit': 2.0}},
+                    {'op': 'delete', 'name': 'b'}, {'op': 'add', 'variable': variable('c')})
+    assert response.status_code == 200
+    assert response.get_json() == {'status': 'success', 'added': 1, 'updated': 1, 'deleted': 1, 'total': 2}
+    assert names(client) == ['a', 'c']
+
+def test_mixed_batch_with_one_failure_applies_nothing(client):
+    bulk(client, {'op': 'add', 'variable': variable('a')})
+    response = bulk(client, {'op': 'add', 'variable': variable('b')},
+                    {'op': 'update', 'name': 'a', 'variable': {'profit': 5.0}},
+                    {'op': 'delete', 'name': 'a'},
+                    {'op': 'add', 'variable': variable('c', profit='lots')})
+    assert response.status_code == 400
+    assert [error['index'] for error in response.get_json()['errors']] == [3]
+    items = client.get('/api/variables').get_json()['items']
+    assert [(item['name'], item['profit']) for item in items] == [('a', 1.0)]
+
+def test_duplicate_add_is_rejected(client):
+    bulk(client, {'op': 'add', 'variable': variable('a')})
+    response = bulk(client, {'op': 'add', 'variable': variable('b')}, {'op': 'add', 'variable': variable('b')},
+                    {'op': 'add', 'variable': variable('a')})
+    assert response.status_code == 400
+    errors = response.get_json()['errors']
+    assert [error['index'] for error in errors] == [1, 2]
+    assert all('already exists' in error['message'] for error in errors)
+    assert names(client) == ['a']
+
+@pytest.mark.parametrize('fields', [{'profit': float('nan')}, {'profit': float('inf')}, {'profit': 10 ** 30},
+                                    {'lowerBound': 1e300}, {'upperBound': 2 ** 63}, {'multiplier': -2 ** 64}])
+def test_non_finite_or_out_of_range_number_is_rejected(client, fields):
+    # The JSON encoder writes NaN and Infinity literals, which the endpoint's parser accepts
+    response = bulk(client, {'op': 'add', 'variable': variable('a')}, {'op': 'add', 'variable': variable('b', **fields)})
+    assert response.status_code == 400
+    assert [error['index'] for error in response.get_json()['errors']] == [1]
+    assert names(client) == []
+
+def test_update_of_unknown_name_is_rejected(client):
+    bulk(client, {'op': 'add', 'variable': variable('a')})
+    response = bulk(client, {'op': 'update', 'name': 'missing', 'variable': {'profit': 2.0}},
+                    {'op': 'delete', 'name': 'missing'})
+    assert response.status_code == 400
+    errors = response.get_json()['errors']
+    assert [error['index'] for error in errors] == [0, 1]
+    assert all('not found' in error['message'] for error in errors)
+    assert names(client) == ['a']
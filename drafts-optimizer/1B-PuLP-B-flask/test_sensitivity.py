@@ -0,0 +1,47 @@
+"""
+Regression tests for the sensitivity ranges in optimizer_core.
+
+Run with pytest from this directory.
+
+@author: Mafu
+@date: 2026-10-19
+"""
+
+from optimizer_core import IntegerVariable, optimize, sensitivity_analysis
+
+def large_problem():
+    """A profit of a million where one more unit of budget still buys 50p more."""
+    variables = [IntegerVariable('A', 0, None, 1.0, True, 1000),
+                 IntegerVariable('B', 0, 1, 0.5, True, 1)]
+    return variables, 1_000_000
+
+def test_budget_range_ends_at_small_improvement_on_large_profit():
+    variables, budget = large_problem()
+    _, allocation = optimize(variables, budget)
+    sensitivity = sensitivity_analysis(variables, budget, allocation)
+    assert sensitivity.budget_range == (1_000_000, 1_000_001)
+    assert sensitivity.answer(variables, 1_000_001) is None
+    assert optimize(variables, 1_000_001)[0] == 1_000_000.5
+
+def test_profit_range_ends_at_small_improvement_on_large_profit():
+    variables = [IntegerVariable('A', 0, None, 1.0, True, 1000),
+                 IntegerVariable('x0', 0, 3, 0.01, True, 2),
+                 IntegerVariable('x1', 0, 3, 0.66, True, 3),
+                 IntegerVariable('x2', 0, 3, 0.03, True, 1)]
+    budget = 1_000_008
+    _, allocation = optimize(variables, budget)
+    sensitivity = sensitivity_analysis(variables, budget, allocation)
+    # Below 1/60, three units of x1 are better swapped for two of x0 and one more of x2
+    low, _ = sensitivity.profit_ranges['x1']
+    assert abs(low - 1 / 60) < 1e-6
+    edited = list(variables)
+    edited[2] = IntegerVariable('x1', 0, 3, 0.012, True, 3)
+    assert sensitivity.answer(edited, budget) is None
+    assert optimize(edited, budget)[0] == 1_000_000.15
+
+def test_time_limit_leaves_ranges_out():
+    variables, budget = large_problem()
+    _, allocation = optimize(variables, budget)
+    sensitivity = sensitivity_analysis(variables, budget, allocation, time_limit=0)
+    assert sensitivity.profit_ranges == {}
+    assert sensitivity.budget_range == (1_000_000, 1_000_001)
@@ -0,0 +1,18 @@
+"""
+1B-PuLP-B-flask/wsgi.py
+
+WSGI entry point for production serving with several worker processes, e.g.:
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+All workers share variables and budget through the SQLite state store (STATE_DB_PATH),
+so requests see consistent data whichever worker handles them.
+
+The solver helpers shared with the command-line tools are installed from search/ first:
+
+    pip install -e ../../search
+"""
+
+from app import create_app
+
+app = create_app()
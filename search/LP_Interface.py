@@ -5,12 +5,15 @@ Interface for setting up and solving a linear programming (LP) problem using hel
 
 - Defines variables for an optimization problem (e.g., cake production).
 - Provides functions to add variables to the model and to call the optimizer.
+- Importing this module has no side effects; load variables with addVariablesToModel or
+  loadVariablesFile before solving.
 
 @author: Mafu
 @date: 2025-06-14
 """
 
-from LP_PULP import dictList2Var, optimizeCall
+import json
+from LP_PULP import dictList2Var, optimizeCall, optimizeManyCall, variables_list
 
 Budget = 13  # Budget constraint for the optimization problem
 
@@ -34,6 +37,23 @@ def addVariablesToModel(Lv = ListofVar):
     dictList2Var(Lv)
 
 
+def loadVariablesFile(path):
+    """
+    Load variable definitions from a JSON file (same format as the Flask app exports).
+
+    Args:
+        path (str): Path to a JSON list of variable dictionaries.
+    """
+    with open(path, "r") as f:
+        dictList2Var(json.load(f))
+
+
+def _requireVariables():
+    """Raise instead of solving an empty model, which would silently return a profit of 0."""
+    if not variables_list:
+        raise ValueError("No variables loaded; call addVariablesToModel() or loadVariablesFile() first")
+
+
 def LP_optimizeCall(Budget, Show = False):
     """
     Call the optimizer with the given budget and display option.
@@ -43,5 +63,24 @@ def LP_optimizeCall(Budget, Show = False):
         Show (bool): Whether to display detailed output (default: False).
     Returns:
         Result of optimizeCall from LP_PULP.
+    Raises:
+        ValueError: If no variables have been loaded.
     """
+    _requireVariables()
     return optimizeCall(Budget, Show)
+
+
+def LP_optimizeManyCall(Budgets, maxConcurrency = None):
+    """
+    Call the optimizer for many budgets concurrently.
+
+    Args:
+        Budgets (list): Budgets to solve for.
+        maxConcurrency (int): Maximum number of CBC processes at once (default: CPU count).
+    Returns:
+        list: Result of optimizeCall for each budget, in the same order.
+    Raises:
+        ValueError: If no variables have been loaded.
+    """
+    _requireVariables()
+    return optimizeManyCall(Budgets, maxConcurrency)
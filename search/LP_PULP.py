@@ -7,12 +7,17 @@ Core logic for defining and solving integer linear programming (ILP) problems us
 - Defines the IntegerVariable class for optimization variables.
 - Provides functions to create variables, build and solve the optimization model, and interface with variable lists.
 - Used as a backend for higher-level interfaces (see LP_Interface.py).
+- Independent solves can run concurrently as asyncio CBC subprocesses (see optimizeManyCall).
+- PuLP and asyncio are imported only when a model is solved, so importing this module is cheap.
+- Results of optimizeCall and optimizeManyCall can be kept in a persistent cache shared across runs
+  (see enableSolveCache).
 
 @author: Mafu
 @date: 2024-10-11
 """
 
-from pulp import LpProblem, LpVariable, LpMaximize, lpSum, PULP_CBC_CMD
+import os
+from solve_cache import SolveCache, problem_key
 
 class IntegerVariable:
     """
@@ -78,18 +83,17 @@ def create_integer_variable(name: str, lowerBound: int, upperBound: int, profit:
     #print(f"Added variable: {var}")
 
 
-def optimize(variables: list[IntegerVariable], Budget, msgShow = False, EachVariableShow = True):
+def buildModel(variables: list[IntegerVariable], Budget):
     """
-    Set up and solve the integer programming problem to maximize profit.
+    Build the PuLP model for maximizing profit under the budget constraint.
 
     Args:
         variables (list[IntegerVariable]): List of variables to optimize.
         Budget (float): The budget constraint for the optimization.
-        msgShow (bool): Whether to show solver messages (default: False).
-        EachVariableShow (bool): Whether to print each variable's result (default: True).
     Returns:
-        float: The maximum profit achieved (rounded to 2 decimal places).
+        tuple: (model, lp_vars) where lp_vars maps variable names to PuLP variables.
     """
+    from pulp import LpProblem, LpVariable, LpMaximize, lpSum
     model = LpProblem("Cake_Production", LpMaximize)
     lp_vars = {}
     
@@ -104,29 +108,175 @@ def optimize(variables: list[IntegerVariable], Budget, msgShow = False, EachVari
     # Define the objective (maximize profit)
     total_profit = lpSum([var.profit * var.multiplier * lp_vars[var.name] for var in variables])
     model += total_profit, "Total_Profit"
+    return model, lp_vars
+
+def solveModel(variables: list[IntegerVariable], Budget, msgShow = False):
+    """
+    Solve the integer programming problem and return the profit and allocation.
+
+    Args:
+        variables (list[IntegerVariable]): List of variables to optimize.
+        Budget (float): The budget constraint for the optimization.
+        msgShow (bool): Whether to show solver messages (default: False).
+    Returns:
+        tuple: (max_profit rounded to 2 decimal places, dict of scaled values per variable name).
+    Raises:
+        ValueError: If CBC does not prove a solution optimal (e.g. the problem is infeasible).
+    """
+    from pulp import PULP_CBC_CMD
+    model, lp_vars = buildModel(variables, Budget)
     
     # Solve the optimization problem
     solver = PULP_CBC_CMD(msg=msgShow)
     model.solve(solver)
-    
-    # Print results for each variable
-    max_profit = 0
-    if EachVariableShow:
-        print("\n")
 
+    checkOptimal(model, Budget)
+    return readSolution(variables, lp_vars)
+
+def checkOptimal(model, Budget):
+    """
+    Check that CBC proved a solved model optimal, so its solution may be used or cached.
+
+    Args:
+        model (LpProblem): The solved model.
+        Budget (float): The budget constraint of the model (for the error message).
+    Raises:
+        ValueError: If the model is infeasible, unbounded, unsolved or only feasible.
+    """
+    from pulp import LpStatus, LpSolutionOptimal
+    if LpStatus[model.status] != "Optimal" or model.sol_status != LpSolutionOptimal:
+        raise ValueError(f"Solve at budget {Budget} failed: {LpStatus[model.status]}")
+
+def readSolution(variables: list[IntegerVariable], lp_vars):
+    """
+    Read the profit and allocation of a solved model.
+
+    Args:
+        variables (list[IntegerVariable]): Variables of the model.
+        lp_vars (dict): PuLP variables by name, as returned by buildModel.
+    Returns:
+        tuple: (max_profit rounded to 2 decimal places, dict of scaled values per variable name).
+    """
+    max_profit = 0
+    allocation = {}
     for var in variables:
-        optimal_value = int(lp_vars[var.name].varValue)
+        optimal_value = lp_vars[var.name].varValue or 0
+        # Round away solver noise on integer variables; continuous ones keep their value
+        optimal_value = int(round(optimal_value)) if var.integer else optimal_value
         scaled_value = optimal_value * var.multiplier
-        if EachVariableShow:
-            print(f'Optimal number of {var.name}: {scaled_value}')
+        allocation[var.name] = scaled_value
         max_profit += var.profit * scaled_value
-    
-    # Print total maximum profit
+    return float(f'{max_profit:.2f}'), allocation
+
+def optimize(variables: list[IntegerVariable], Budget, msgShow = False, EachVariableShow = True):
+    """
+    Set up and solve the integer programming problem to maximize profit.
+
+    Args:
+        variables (list[IntegerVariable]): List of variables to optimize.
+        Budget (float): The budget constraint for the optimization.
+        msgShow (bool): Whether to show solver messages (default: False).
+        EachVariableShow (bool): Whether to print each variable's result (default: True).
+    Returns:
+        float: The maximum profit achieved (rounded to 2 decimal places).
+    """
+    max_profit, allocation = solveModel(variables, Budget, msgShow)
     if EachVariableShow:
-        print(f'Maximum profit: £{max_profit:.2f}')
-    
+        showSolution(max_profit, allocation)
+    return max_profit
+
+def showSolution(max_profit, allocation):
+    """Print the result for each variable and the maximum profit."""
+    print("\n")
+    for name, scaled_value in allocation.items():
+        print(f'Optimal number of {name}: {scaled_value}')
+    print(f'Maximum profit: £{max_profit:.2f}')
+
+async def solveCBCAsync(model, solver):
+    """
+    Solve a model with the CBC binary in an asyncio subprocess instead of blocking on it.
+
+    Mirrors PULP_CBC_CMD.solve_CBC, but awaits the process, so many solves can run concurrently
+    from a single thread. Also used by the Flask optimizer_core.
+
+    Args:
+        model (LpProblem): The model to solve; variable values are assigned in place.
+        solver (PULP_CBC_CMD): Solver carrying the CBC path and options.
+    Raises:
+        RuntimeError: If CBC is not available or exits without a solution.
+    """
+    import asyncio
+    from pulp import LpMaximize
+    if not solver.available():
+        raise RuntimeError(f"CBC solver not available at {solver.path}")
+    tmpMps, tmpSol = solver.create_tmp_files(model.name, "mps", "sol")
+    process = None
+    # Cover writing the MPS file and starting CBC too, so no temporary file outlives a failure
+    try:
+        vs, variablesNames, constraintsNames, _ = model.writeMPS(tmpMps, rename=1)
+        args = [solver.path, tmpMps]
+        if model.sense == LpMaximize:
+            args.append("-max")
+        if solver.timeLimit is not None:
+            args += ["-sec", str(solver.timeLimit)]
+        for option in solver.options + solver.getOptions():
+            args += ("-" + option).split()
+        args += ["-solve", "-printingOptions", "all", "-solution", tmpSol]
+
+        process = await asyncio.create_subprocess_exec(
+            *args, stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL)
+        returnCode = await process.wait()
+        if returnCode != 0 or not os.path.exists(tmpSol):
+            raise RuntimeError(f"CBC exited with code {returnCode}")
+        status, values, _, _, _, sol_status = solver.readsol_MPS(tmpSol, model, vs, variablesNames, constraintsNames)
+        model.assignVarsVals(values)
+        model.assignStatus(status, sol_status)
+    except asyncio.CancelledError:
+        if process is not None and process.returncode is None:
+            process.kill()
+            await process.wait()
+        raise
+    finally:
+        solver.delete_tmp_files(tmpMps, tmpSol)
+
+async def solveModelAsync(variables: list[IntegerVariable], Budget, semaphore = None):
+    """
+    Asynchronous version of solveModel that does not block the event loop.
 
-    return float(f'{max_profit:.2f}')
+    Args:
+        variables (list[IntegerVariable]): List of variables to optimize.
+        Budget (float): The budget constraint for the optimization.
+        semaphore (asyncio.Semaphore): Optional cap on concurrent CBC processes.
+    Returns:
+        tuple: (max_profit rounded to 2 decimal places, dict of scaled values per variable name).
+    Raises:
+        ValueError: If CBC does not prove a solution optimal (e.g. the problem is infeasible).
+    """
+    from pulp import PULP_CBC_CMD
+    model, lp_vars = buildModel(variables, Budget)
+    solver = PULP_CBC_CMD(msg=False)
+    if semaphore is None:
+        await solveCBCAsync(model, solver)
+    else:
+        async with semaphore:
+            await solveCBCAsync(model, solver)
+    checkOptimal(model, Budget)
+    return readSolution(variables, lp_vars)
+
+async def optimizeAsync(variables: list[IntegerVariable], Budget, semaphore = None):
+    """
+    Asynchronous version of optimize (without printing) that does not block the event loop.
+
+    Args:
+        variables (list[IntegerVariable]): List of variables to optimize.
+        Budget (float): The budget constraint for the optimization.
+        semaphore (asyncio.Semaphore): Optional cap on concurrent CBC processes.
+    Returns:
+        float: The maximum profit achieved (rounded to 2 decimal places).
+    """
+    max_profit, _ = await solveModelAsync(variables, Budget, semaphore)
+    return max_profit
 
 def dictList2Var(dictList):
     """
@@ -141,7 +291,31 @@ def dictList2Var(dictList):
 
     # Create IntegerVariable instances and add them to the list
     for i in dictList:
-        create_integer_variable(name=i["name"], lowerBound=i["lowerBound"], upperBound=i["upperBound"], profit=i["profit"], multiplier=i["multiplier"])
+        create_integer_variable(name=i["name"], lowerBound=i["lowerBound"], upperBound=i["upperBound"], profit=i["profit"], integer=i.get("integer", True), multiplier=i["multiplier"])
+
+# Optional persistent cache of solved problems (see enableSolveCache)
+solveCache = None
+
+def enableSolveCache(path, maxEntries = 1_000_000):
+    """
+    Cache optimizeCall and optimizeManyCall results in a SQLite file shared across runs and processes.
+
+    Args:
+        path (str): Path of the cache database.
+        maxEntries (int): Maximum number of cached problems before LRU eviction.
+    Returns:
+        SolveCache: The cache in use (see SolveCache.stats for hit rates).
+    """
+    global solveCache
+    solveCache = SolveCache(path, maxEntries)
+    return solveCache
+
+def disableSolveCache():
+    """Stop using the persistent solve cache."""
+    global solveCache
+    if solveCache is not None:
+        solveCache.close()
+    solveCache = None
 
 def optimizeCall(Budget, Show):
     """
@@ -152,5 +326,61 @@ def optimizeCall(Budget, Show):
         Show (bool): Whether to print each variable's result.
     Returns:
         float: The maximum profit achieved.
+    Raises:
+        ValueError: If the problem cannot be solved to optimality; nothing is cached.
+    """
+    if solveCache is None:
+        return optimize(variables_list, Budget, EachVariableShow = Show)
+
+    key = problem_key(variables_list, Budget)
+    cached = solveCache.get(key)
+    if cached is None:
+        cached = solveModel(variables_list, Budget)
+        solveCache.put(key, *cached)
+    max_profit, allocation = cached
+    if Show:
+        showSolution(max_profit, allocation)
+    return max_profit
+
+def optimizeManyCall(Budgets, maxConcurrency = None):
+    """
+    Call optimize for many budgets concurrently with the IntegerVariable instances.
+
+    Repeated budgets are solved once, and budgets found in the solve cache are not solved.
+    Only optimal solves are cached.
+
+    Args:
+        Budgets (list): Budgets to solve for.
+        maxConcurrency (int): Maximum number of CBC processes at once (default: CPU count).
+    Returns:
+        list: Maximum profit for each budget, in the same order.
+    Raises:
+        ValueError: If any budget cannot be solved to optimality (the others are still cached).
     """
-    return optimize(variables_list, Budget, EachVariableShow = Show)
\ No newline at end of file
+    import asyncio
+    profits = {}
+    if solveCache is not None:
+        keys = {Budget: problem_key(variables_list, Budget) for Budget in Budgets}
+        for Budget, key in keys.items():
+            cached = solveCache.get(key)
+            if cached is not None:
+                profits[Budget] = cached[0]
+    missing = list(dict.fromkeys(Budget for Budget in Budgets if Budget not in profits))
+
+    async def solveAll():
+        semaphore = asyncio.Semaphore(maxConcurrency or os.cpu_count() or 1)
+        return await asyncio.gather(*(solveModelAsync(variables_list, Budget, semaphore) for Budget in missing),
+                                    return_exceptions=True)
+    errors = []
+    if missing:
+        for Budget, result in zip(missing, asyncio.run(solveAll())):
+            if isinstance(result, Exception):
+                errors.append(result)
+                continue
+            max_profit, allocation = result
+            profits[Budget] = max_profit
+            if solveCache is not None:
+                solveCache.put(keys[Budget], max_profit, allocation)
+    if errors:
+        raise errors[0]
+    return [profits[Budget] for Budget in Budgets]
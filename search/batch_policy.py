@@ -0,0 +1,276 @@
+"""
+batch_policy.py
+
+Batch evaluation of fixed investment schedules for the savings/productivity model of generate.py.
+
+- A schedule is one investment percentage (0-100) per month; N schedules form an N x months
+  matrix and are advanced through the investmentHandler recurrence in lockstep with NumPy,
+  without building Node objects.
+- Solver calls are deduplicated per month over the unique allocations, and remembered across
+  months. Integral catalogues (see shared_tables.is_integral) only change profit at integer
+  budgets, so allocations are floored first and answered from a bounded-knapsack table that
+  grows with the largest allocation seen. When every profitable variable is unbounded, the
+  table becomes periodic in the best variable's multiplier past some budget (the optimum just
+  adds one more of it); once the period is verified on the table, budgets of any size are
+  answered from it. Other budgets past the table fall back to the solver.
+- Other catalogues are deduplicated on exact budgets, or optionally on budgets floored to a
+  resolution (e.g. 0.01); the optimal profit never decreases with the budget, so flooring
+  can only underestimate returns.
+- Schedules sharing a prefix reach the same states and budgets, so the work beyond plain array
+  arithmetic grows with the number of distinct budgets rather than with the number of schedules.
+
+Usage:
+    python batch_policy.py --levels 12 --percentages 0 25 50 75 100 --samples 1000000
+
+Dependencies:
+- LP_Interface.py (for LP optimization logic)
+- shared_tables.py (knapsack tables for integral catalogues)
+- value_iteration.py (vectorized investment step)
+- NumPy
+
+@author: Mafu
+@date: 2026-10-19
+"""
+
+import argparse
+import time
+import numpy as np
+import LP_PULP
+from LP_Interface import addVariablesToModel, loadVariablesFile, LP_optimizeCall, LP_optimizeManyCall
+from shared_tables import is_integral, knapsack_table
+from value_iteration import TERMINAL_SCORES, investment_step
+
+class BatchReturns:
+    """
+    Vectorized Budget -> return lookups with deduplicated solver calls.
+
+    Attributes:
+        returnFunc (callable): Function of Budget returning the optimal profit (default: the LP optimizer).
+        workers (int): Concurrent CBC processes for the default optimizer (default: one at a time).
+        integral (bool): Whether budgets are floored and answered from a knapsack table.
+        max_table_budget (int): Largest budget tabulated for integral catalogues.
+        resolution (float): If given, other catalogues floor budgets to multiples of it.
+        solver_calls (int): Number of budgets solved (or passed to returnFunc) so far.
+    """
+    def __init__(self, returnFunc = None, workers = None, max_table_budget = 1_000_000, resolution = None):
+        if returnFunc is None and not LP_PULP.variables_list:
+            raise ValueError("No variables loaded; call addVariablesToModel() or loadVariablesFile() first")
+        self.returnFunc = returnFunc
+        self.workers = workers
+        self.integral = returnFunc is None and is_integral(LP_PULP.variables_list)
+        self.max_table_budget = int(max_table_budget)
+        self.resolution = resolution
+        self.solver_calls = 0
+        self._table = np.empty(0)
+        self._raw = np.empty(0)
+        self._period = None  # (multiplier, profit per multiplier) once the table is periodic
+        self._memo = {}
+
+    def _grow_table(self, budget):
+        # Double the table so repeated growth costs O(largest budget) overall
+        size = min(self.max_table_budget, max(int(budget), 2 * len(self._table), 1024))
+        self._raw, _ = knapsack_table(LP_PULP.variables_list, size)
+        self._table = np.round(self._raw, 2)
+        self._period = self._find_period()
+
+    def _find_period(self):
+        """
+        Check whether f(b) = f(b - w) + v holds from the end of the table onwards.
+
+        With unbounded profitable variables, f(b) = max(f(b - 1), f(b - w_i) + v_i) over their
+        multipliers w_i and values v_i = w_i * profit_i. If f(b) = f(b - w) + v for the best
+        variable (w, v) on the last max(w_i) budgets of the table, the recurrence carries it to
+        every larger budget.
+        """
+        profitable = [var for var in LP_PULP.variables_list if var.profit > 0]
+        if not profitable or any(var.upperBound is not None for var in profitable):
+            return None
+        best = max(profitable, key=lambda var: var.profit)
+        weight, value = int(best.multiplier), best.multiplier * best.profit
+        window = max(int(var.multiplier) for var in profitable)
+        if len(self._raw) <= window + weight:
+            return None
+        tail = self._raw[-window:]
+        shifted = self._raw[-window - weight:-weight]
+        if not np.all(np.isfinite(shifted)) or not np.allclose(tail - shifted, value, rtol=0, atol=1e-9 * max(1.0, abs(tail[-1]))):
+            return None
+        return weight, value
+
+    def _extend(self, budgets):
+        """Optimal profit of budgets past the table, from its verified period."""
+        weight, value = self._period
+        last = len(self._raw) - 1
+        steps = np.ceil((budgets - last) / weight)
+        return np.round(self._raw[(budgets - steps * weight).astype(np.int64)] + steps * value, 2)
+
+    def _solve(self, budgets):
+        if self.returnFunc is not None:
+            return [self.returnFunc(Budget=budget) for budget in budgets]
+        if self.workers and self.workers > 1:
+            return LP_optimizeManyCall(budgets, self.workers)
+        return [LP_optimizeCall(Budget=budget) for budget in budgets]
+
+    def keys(self, budgets):
+        """Budgets actually solved for: floored for integral catalogues or to the resolution."""
+        if self.integral:
+            return np.floor(budgets)
+        if self.resolution:
+            return np.floor(budgets / self.resolution + 1e-9) * self.resolution
+        return budgets
+
+    def __call__(self, budgets):
+        """
+        Return the optimal profit for every budget of an array.
+
+        Args:
+            budgets (ndarray): Budgets to invest.
+        Returns:
+            ndarray: Optimal profit per budget, with the shape of budgets.
+        """
+        budgets = np.asarray(budgets, dtype=float)
+        unique, inverse = np.unique(self.keys(budgets), return_inverse=True)
+        returns = np.empty(len(unique))
+        pending = np.ones(len(unique), dtype=bool)
+
+        if self.integral and len(unique):
+            while unique[-1] >= len(self._table) and self._period is None and len(self._table) <= self.max_table_budget:
+                self._grow_table(unique[-1] if unique[-1] <= 2 * len(self._table) else 0)
+            inside = unique < len(self._table)
+            values = np.full(len(unique), -np.inf)
+            values[inside] = self._table[unique[inside].astype(np.int64)]
+            if self._period is not None:
+                values[~inside] = self._extend(unique[~inside])
+            # Budgets below the lower bounds' spend are left to the solver, as SharedTable does
+            hit = np.isfinite(values)
+            returns[hit] = values[hit]
+            pending &= ~hit
+
+        missing = []
+        for index in np.flatnonzero(pending):
+            value = self._memo.get(unique[index])
+            if value is None:
+                missing.append(index)
+            else:
+                returns[index] = value
+        if missing:
+            solved = self._solve([float(unique[index]) for index in missing])
+            self.solver_calls += len(missing)
+            for index, value in zip(missing, solved):
+                self._memo[unique[index]] = returns[index] = value
+        return returns[inverse].reshape(budgets.shape)
+
+def evaluate_policies(percentages, productivity = 10, savings = 10, returnFunc = None, workers = None,
+                      max_table_budget = 1_000_000, resolution = None):
+    """
+    Evaluate many investment schedules at once.
+
+    Args:
+        percentages (array-like): N x months matrix of investment percentages (0-100), one row per
+            schedule; a single schedule may be given as a 1-D sequence.
+        productivity (float): Initial productivity.
+        savings (float): Initial savings.
+        returnFunc (callable): Function of Budget returning the investment return (default: the LP
+            optimizer, with knapsack tables for integral catalogues).
+        workers (int): Concurrent CBC processes for the default optimizer (default: one at a time).
+        max_table_budget (int): Largest budget answered from the knapsack table.
+        resolution (float): Floor the budgets of non-integral catalogues to multiples of this
+            (default: solve every distinct budget exactly).
+    Returns:
+        dict: "productivity" and "savings" arrays of final values per schedule, and "stats".
+    """
+    start = time.perf_counter()
+    percentages = np.atleast_2d(np.asarray(percentages, dtype=float))
+    if percentages.size and (percentages.min() < 0 or percentages.max() > 100):
+        raise ValueError("Investment percentages must be between 0 and 100")
+    rows, months = percentages.shape
+    returns = BatchReturns(returnFunc, workers, max_table_budget, resolution)
+
+    P = np.full(rows, float(productivity))
+    S = np.full(rows, float(savings))
+    unique_budgets = 0
+    for month in range(months):
+        # Same allocation as investmentHandler: savings * (percentage / 100)
+        allocation = S * (percentages[:, month] / 100)
+        unique_budgets += len(np.unique(returns.keys(allocation)))
+        P, S = investment_step(P, S, percentages[:, month], returns(allocation))
+
+    return {
+        "productivity": P,
+        "savings": S,
+        "stats": {
+            "schedules": rows,
+            "months": months,
+            "allocations": rows * months,
+            "unique_budgets": unique_budgets,
+            "solver_calls": returns.solver_calls,
+            "table_budgets": len(returns._table),
+            "elapsed_seconds": time.perf_counter() - start,
+        },
+    }
+
+def best_policies(result, percentages, score = "sum", k = 10):
+    """
+    Return the k best schedules of an evaluation.
+
+    Args:
+        result (dict): Return value of evaluate_policies.
+        percentages (array-like): The evaluated schedule matrix.
+        score (str): "savings", "productivity" or "sum".
+        k (int): Number of schedules returned.
+    Returns:
+        list: Dictionaries with row, score, percentages, productivity and savings, best first.
+    """
+    values = TERMINAL_SCORES[score](result["productivity"], result["savings"])
+    k = min(k, len(values))
+    order = np.argpartition(-values, k - 1)[:k] if k else np.empty(0, dtype=int)
+    order = order[np.argsort(-values[order], kind="stable")]
+    percentages = np.atleast_2d(np.asarray(percentages, dtype=float))
+    return [{"row": int(row), "score": float(values[row]), "percentages": percentages[row].tolist(),
+             "productivity": float(result["productivity"][row]), "savings": float(result["savings"][row])}
+            for row in order]
+
+def parse_args(argv = None):
+    """Parse command-line arguments for a batch evaluation."""
+    parser = argparse.ArgumentParser(description="Evaluate many investment schedules at once.")
+    parser.add_argument("--levels", type=int, default=12, help="number of months per schedule (default: 12)")
+    parser.add_argument("--percentages", type=float, nargs="+", default=[0, 25, 50, 75, 100],
+                        help="percentages schedules are drawn from (default: 0 25 50 75 100)")
+    parser.add_argument("--samples", type=int, default=100000, help="number of random schedules (default: 100000)")
+    parser.add_argument("--schedules", help="file of schedules, one row of percentages per line (overrides --samples)")
+    parser.add_argument("--seed", type=int, help="seed for the random schedules")
+    parser.add_argument("--productivity", type=float, default=10, help="initial productivity (default: 10)")
+    parser.add_argument("--savings", type=float, default=10, help="initial savings (default: 10)")
+    parser.add_argument("--variables", help="JSON file of variables to invest in (default: catalogue in LP_Interface.py)")
+    parser.add_argument("--resolution", type=float, help="floor budgets of non-integral catalogues to multiples "
+                        "of this before solving (default: exact)")
+    parser.add_argument("--workers", type=int, default=1, help="concurrent CBC processes (default: 1)")
+    parser.add_argument("--score", choices=sorted(TERMINAL_SCORES), default="sum", help="objective to rank by (default: sum)")
+    parser.add_argument("--top", type=int, default=5, help="number of best schedules shown (default: 5)")
+    return parser.parse_args(argv)
+
+def main(argv = None):
+    """Evaluate schedules from the command line and display the best ones."""
+    args = parse_args(argv)
+    if args.variables:
+        loadVariablesFile(args.variables)
+    else:
+        addVariablesToModel()
+
+    if args.schedules:
+        schedules = np.loadtxt(args.schedules, ndmin=2)
+    else:
+        rng = np.random.default_rng(args.seed)
+        schedules = rng.choice(args.percentages, size=(args.samples, args.levels))
+    result = evaluate_policies(schedules, args.productivity, args.savings, workers=args.workers,
+                               resolution=args.resolution)
+
+    print("\n=== Best Schedules ===")
+    for entry in best_policies(result, schedules, args.score, args.top):
+        print(f"Score: {entry['score']:.2f} Productivity: {entry['productivity']:.2f} Savings: {entry['savings']:.2f} "
+              f"Investment %: {' '.join(f'{p:g}' for p in entry['percentages'])}")
+    stats = result["stats"]
+    print(f"\nSchedules: {stats['schedules']} Months: {stats['months']} Unique budgets: {stats['unique_budgets']} "
+          f"Solver calls: {stats['solver_calls']} Elapsed: {stats['elapsed_seconds']:.2f}s")
+
+if __name__ == "__main__":
+    main()
@@ -7,7 +7,20 @@ Simulates investment and productivity growth using a tree structure and linear p
 - Each node represents a state (month, productivity, savings, investment %).
 - At each step, a percentage of savings is invested, and the return is calculated using an LP optimizer.
 - The tree is built using breadth-first search (BFS) to explore all possible investment strategies.
+- Long BFS runs can be checkpointed to disk level by level and resumed after a crash.
+- An adaptive mode explores a coarse percentage grid first and refines only around the best paths.
+- A beam-search mode keeps only the top-k nodes per month, making long horizons tractable.
+- A rolling-horizon mode looks a few months ahead, commits only the first decision and moves on,
+  so memory and work per month are bounded by the lookahead window.
 - Functions are provided to find and display nodes with the highest savings, productivity, and total value.
+- Pareto frontiers of (savings, productivity) per month answer any weighted objective.
+- NodeLeaderboard keeps top-k nodes per metric and per month in a single pass over a tree or node stream.
+- Tree engines accept a returnFunc in place of the LP optimizer, e.g. the expected return over
+  profit scenarios from scenarios.ScenarioEngine (--profit-distributions on the command line),
+  or lookups in a budget table shared by every process using the catalogue (--shared-table).
+- Importing the module has no side effects; run it as a script for the command-line interface:
+
+    python generate.py --levels 12 --step 10 --engine beam --width 20 --workers 4
 
 Dependencies:
 - LP_Interface.py (for LP optimization logic)
@@ -17,16 +30,21 @@ Dependencies:
 @date: 2025-06-14
 """
 
+import argparse
+import heapq
+import json
+import os
+import time
 from collections import deque
-from LP_Interface import addVariablesToModel, LP_optimizeCall
-addVariablesToModel()
+from concurrent.futures import ThreadPoolExecutor
+from LP_Interface import addVariablesToModel, loadVariablesFile, LP_optimizeCall, LP_optimizeManyCall
 
 """
 This script builds a tree of investment decisions and uses LP optimization to simulate returns.
 """
 
 # Investment handler function
-def investmentHandler(current_productivity, current_savings, percentage):
+def investmentHandler(current_productivity, current_savings, percentage, investmentReturn = None):
     """
     Handles investment allocation and productivity update for a given node.
 
@@ -34,6 +52,7 @@ def investmentHandler(current_productivity, current_savings, percentage):
         current_productivity (float): Current productivity value.
         current_savings (float): Current savings value.
         percentage (float): Percentage of savings to invest (0-100).
+        investmentReturn (float): Precomputed LP return for the allocation (default: solve it now).
     Returns:
         tuple: (newProductivity, newSavings) after investment and productivity update.
     """
@@ -45,7 +64,8 @@ def investmentHandler(current_productivity, current_savings, percentage):
     investmentAllocation = current_savings * percentage
 
     # Use LP optimizer to determine investment return
-    investmentReturn = LP_optimizeCall(Budget=investmentAllocation)
+    if investmentReturn is None:
+        investmentReturn = LP_optimizeCall(Budget=investmentAllocation)
 
     newProductivity = current_productivity
     newProductivity += investmentReturn
@@ -75,17 +95,18 @@ class Node:
 
         self.children = []  # List to hold child nodes
 
-    def create_child(self, nodeName, percentage = 0):
+    def create_child(self, nodeName, percentage = 0, investmentReturn = None):
         """
         Create a child node with updated productivity and savings after investment.
 
         Args:
             nodeName (str): Name/label for the child node.
             percentage (float): Investment percentage for this child.
+            investmentReturn (float): Precomputed LP return for the allocation (default: solve it now).
         Returns:
             Node: The created child node.
         """
-        newProductivity, newSavings = investmentHandler(self.productivity, self.savings, percentage)
+        newProductivity, newSavings = investmentHandler(self.productivity, self.savings, percentage, investmentReturn)
         child = Node(self, nodeName, self.month + 1, newProductivity, newSavings, percentage)
         self.children.append(child)  # Add a child node
         return child
@@ -116,7 +137,49 @@ class Tree:
             print(node.nodeName, "Month:", node.month, "Productivity:", node.productivity, "Savings:", node.savings)  # Display the current node
             queue.extend(node.children)  # Enqueue all the children
 
-def create_tree_bfs(root_name = "Root", levels = 1, step = 50):
+def investment_returns(budgets, workers = None, returnFunc = None):
+    """
+    Compute the investment return of each budget.
+
+    Args:
+        budgets (list): Budgets to evaluate.
+        workers (int): If greater than 1, evaluate up to this many budgets concurrently
+            (CBC processes for the LP optimizer, threads for returnFunc).
+        returnFunc (callable): Function of Budget returning the investment return
+            (default: the LP optimizer).
+    Returns:
+        list: The return of each budget, in the same order.
+    """
+    if returnFunc is None:
+        if not workers or workers <= 1:
+            return [LP_optimizeCall(Budget=budget) for budget in budgets]
+        return LP_optimizeManyCall(budgets, workers)
+    if not workers or workers <= 1:
+        return [returnFunc(Budget=budget) for budget in budgets]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(lambda budget: returnFunc(Budget=budget), budgets))
+
+def expand_nodes(nodes, percentages, workers = None, returnFunc = None):
+    """
+    Create one child per percentage for every node, in breadth-first order.
+
+    Args:
+        nodes (list): Nodes to expand.
+        percentages (iterable): Investment percentages (0-100) for the children.
+        workers (int): If greater than 1, evaluate the returns of all children concurrently
+            (see investment_returns).
+        returnFunc (callable): Function of Budget returning the investment return
+            (default: the LP optimizer).
+    Returns:
+        list: The created children.
+    """
+    percentages = list(percentages)
+    budgets = [node.savings * i / 100 for node in nodes for i in percentages]
+    returns = iter(investment_returns(budgets, workers, returnFunc))
+    return [node.create_child(f"{node.nodeName}-{i:g}", i, next(returns)) for node in nodes for i in percentages]
+
+def create_tree_bfs(root_name = "Root", levels = 1, step = 50, productivity = 10, savings = 10, workers = None,
+                    returnFunc = None):
     """
     Build a tree of investment decisions using BFS.
 
@@ -124,61 +187,753 @@ def create_tree_bfs(root_name = "Root", levels = 1, step = 50):
         root_name (str): Name for the root node.
         levels (int): Number of levels (months) to simulate.
         step (int): Step size for investment percentage (0-100).
+        productivity (float): Initial productivity.
+        savings (float): Initial savings.
+        workers (int): Concurrent CBC processes used per level (default: solve one at a time).
+        returnFunc (callable): Function of Budget returning the investment return (default: the LP optimizer).
     Returns:
         Node: The root node of the created tree.
     """
-    root = Node(None, root_name, 0, 10, 10)
-    if levels == 0:
-        return root
+    root = Node(None, root_name, 0, productivity, savings)
 
-    queue = [(root, 0)]  # Queue stores nodes and their current level
+    frontier = [root]  # Nodes of the current level, in BFS order
+    for _ in range(levels):
+        frontier = expand_nodes(frontier, range(0, 101, step), workers, returnFunc)
 
-    while queue:
-        current_node, current_level = queue.pop(0)
+    return root
+
+def checkpoint_dtype():
+    """
+    Record layout for checkpointed nodes: index of the parent in the previous level's file,
+    investment percentage used to reach the node, and the resulting state.
+
+    NumPy is imported here so that importing this module stays fast.
+    """
+    import numpy as np
+    return np.dtype([
+        ("parent", np.int64),
+        ("percentage", np.float64),
+        ("productivity", np.float64),
+        ("savings", np.float64),
+    ])
+
+def _checkpoint_level_path(checkpoint_dir, level):
+    return os.path.join(checkpoint_dir, f"level_{level}.bin")
+
+def _read_manifest(checkpoint_dir):
+    with open(os.path.join(checkpoint_dir, "manifest.json"), "r") as f:
+        return json.load(f)
+
+def _write_manifest(checkpoint_dir, manifest):
+    """Atomically replace the manifest so readers never see a partial file."""
+    path = os.path.join(checkpoint_dir, "manifest.json")
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=4)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+def load_checkpoint_level(checkpoint_dir, level):
+    """
+    Memory-map the committed nodes of one level of a checkpointed tree.
+
+    Safe to call while a run is still writing: only records covered by the manifest
+    are exposed, so partially written chunks are never visible.
+
+    Args:
+        checkpoint_dir (str): Checkpoint directory.
+        level (int): Level (month) to load.
+    Returns:
+        numpy.ndarray: Read-only array of checkpoint_dtype() records.
+    """
+    import numpy as np
+    manifest = _read_manifest(checkpoint_dir)
+    count = manifest["level_counts"][level] if level < len(manifest["level_counts"]) else 0
+    if count == 0:
+        return np.empty(0, dtype=checkpoint_dtype())
+    return np.memmap(_checkpoint_level_path(checkpoint_dir, level), dtype=checkpoint_dtype(), mode="r", shape=(count,))
+
+def checkpoint_node_name(checkpoint_dir, level, index):
+    """
+    Rebuild the name of a checkpointed node from its chain of parents.
+
+    Args:
+        checkpoint_dir (str): Checkpoint directory.
+        level (int): Level (month) of the node.
+        index (int): Index of the node within its level.
+    Returns:
+        str: Node name in the same format as create_tree_bfs.
+    """
+    manifest = _read_manifest(checkpoint_dir)
+    parts = []
+    while level > 0:
+        record = load_checkpoint_level(checkpoint_dir, level)[index]
+        parts.append(f"{record['percentage']:g}")
+        index = int(record["parent"])
+        level -= 1
+    return "-".join([manifest["root_name"]] + parts[::-1])
+
+def create_tree_bfs_checkpointed(checkpoint_dir, root_name = "Root", levels = 1, step = 50, checkpoint_every = 1000,
+                                 productivity = 10, savings = 10, workers = None, returnFunc = None):
+    """
+    Build the same tree as create_tree_bfs, checkpointing progress to disk.
+
+    Nodes are stored level by level as fixed-size records appended to level_<n>.bin
+    files, with a manifest recording how many records of each level are committed.
+    Use resume_tree_bfs to continue an interrupted run.
+
+    Args:
+        checkpoint_dir (str): Directory for the checkpoint (must not hold a previous run).
+        root_name (str): Name for the root node.
+        levels (int): Number of levels (months) to simulate.
+        step (int): Step size for investment percentage (0-100).
+        checkpoint_every (int): Number of parent nodes expanded between checkpoints.
+        productivity (float): Initial productivity.
+        savings (float): Initial savings.
+        workers (int): Concurrent evaluations per checkpoint chunk (see investment_returns).
+        returnFunc (callable): Function of Budget returning the investment return (default: the LP optimizer).
+    Returns:
+        dict: The final manifest.
+    """
+    import numpy as np
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    if os.path.exists(os.path.join(checkpoint_dir, "manifest.json")):
+        raise FileExistsError(f"Checkpoint already exists in {checkpoint_dir}, use resume_tree_bfs to continue it")
+
+    root = np.array([(-1, np.nan, productivity, savings)], dtype=checkpoint_dtype())
+    with open(_checkpoint_level_path(checkpoint_dir, 0), "wb") as f:
+        f.write(root.tobytes())
+    manifest = {
+        "root_name": root_name,
+        "levels": levels,
+        "step": step,
+        "level_counts": [1],
+        "parents_done": 0,
+        "completed": False,
+    }
+    _write_manifest(checkpoint_dir, manifest)
+    return _run_checkpointed_bfs(checkpoint_dir, manifest, checkpoint_every, workers, returnFunc)
+
+def resume_tree_bfs(checkpoint_dir, checkpoint_every = 1000, workers = None, returnFunc = None):
+    """
+    Continue a checkpointed tree build from its last committed checkpoint.
+
+    Levels, step and starting values come from the checkpoint; returnFunc should be the
+    one the run was started with, or the resumed levels will use different returns.
+
+    Args:
+        checkpoint_dir (str): Directory of an existing checkpoint.
+        checkpoint_every (int): Number of parent nodes expanded between checkpoints.
+        workers (int): Concurrent evaluations per checkpoint chunk (see investment_returns).
+        returnFunc (callable): Function of Budget returning the investment return (default: the LP optimizer).
+    Returns:
+        dict: The final manifest.
+    """
+    manifest = _read_manifest(checkpoint_dir)
+    if manifest["completed"]:
+        return manifest
+    # Drop any records written after the last committed checkpoint
+    level = len(manifest["level_counts"]) - 1
+    path = _checkpoint_level_path(checkpoint_dir, level)
+    if os.path.exists(path):
+        with open(path, "r+b") as f:
+            f.truncate(manifest["level_counts"][level] * checkpoint_dtype().itemsize)
+    return _run_checkpointed_bfs(checkpoint_dir, manifest, checkpoint_every, workers, returnFunc)
+
+def _run_checkpointed_bfs(checkpoint_dir, manifest, checkpoint_every, workers = None, returnFunc = None):
+    """Expand levels from the manifest's position, committing a checkpoint every few parents."""
+    import numpy as np
+    dtype = checkpoint_dtype()
+    percentages = list(range(0, 101, manifest["step"]))
+    while True:
+        # The last entry of level_counts is the level currently being written
+        level = len(manifest["level_counts"]) - 1
+        if level == 0 or manifest["parents_done"] == manifest["level_counts"][level - 1]:
+            if level >= manifest["levels"]:
+                manifest["completed"] = True
+                _write_manifest(checkpoint_dir, manifest)
+                return manifest
+            open(_checkpoint_level_path(checkpoint_dir, level + 1), "wb").close()
+            manifest["level_counts"].append(0)
+            manifest["parents_done"] = 0
+            _write_manifest(checkpoint_dir, manifest)
+            continue
 
-        if current_level < levels:  # Add children if within level limit
-            for i in range(0, 101, step):
-                childname = f"{current_node.nodeName}-{i}"
-                child = current_node.create_child(childname, i)
-                queue.append((child, current_level + 1))
+        parents = load_checkpoint_level(checkpoint_dir, level - 1)
+        with open(_checkpoint_level_path(checkpoint_dir, level), "ab") as f:
+            while manifest["parents_done"] < len(parents):
+                start = manifest["parents_done"]
+                end = min(start + checkpoint_every, len(parents))
+                budgets = [float(parents[index]["savings"]) * i / 100 for index in range(start, end) for i in percentages]
+                returns = iter(investment_returns(budgets, workers, returnFunc))
+                chunk = []
+                for index in range(start, end):
+                    parent = parents[index]
+                    for i in percentages:
+                        newProductivity, newSavings = investmentHandler(float(parent["productivity"]), float(parent["savings"]),
+                                                                        i, next(returns))
+                        chunk.append((index, i, newProductivity, newSavings))
+                f.write(np.array(chunk, dtype=dtype).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+                manifest["level_counts"][level] += len(chunk)
+                manifest["parents_done"] = end
+                _write_manifest(checkpoint_dir, manifest)
 
+def load_tree_from_checkpoint(checkpoint_dir):
+    """
+    Rebuild a Node tree from a checkpoint for use with find_highest_nodes and friends.
+
+    Args:
+        checkpoint_dir (str): Checkpoint directory.
+    Returns:
+        Node: The root node of the rebuilt tree (committed nodes only).
+    """
+    manifest = _read_manifest(checkpoint_dir)
+    record = load_checkpoint_level(checkpoint_dir, 0)[0]
+    root = Node(None, manifest["root_name"], 0, float(record["productivity"]), float(record["savings"]))
+    previous = [root]
+    for level in range(1, len(manifest["level_counts"])):
+        current = []
+        for record in load_checkpoint_level(checkpoint_dir, level):
+            parent = previous[int(record["parent"])]
+            percentage = float(record["percentage"])
+            child = Node(parent, f"{parent.nodeName}-{percentage:g}", level,
+                         float(record["productivity"]), float(record["savings"]), percentage)
+            parent.children.append(child)
+            current.append(child)
+        previous = current
     return root
 
-from collections import deque
+def score_savings(node):
+    """Score a node by its savings."""
+    return node.savings
 
-def find_highest_nodes(root):
+def score_productivity(node):
+    """Score a node by its productivity."""
+    return node.productivity
+
+def score_sum(node):
+    """Score a node by its total value (savings + productivity)."""
+    return node.productivity + node.savings
+
+# Named scoring functions, matching the metrics reported by find_highest_nodes
+SCORE_FUNCTIONS = {
+    "savings": score_savings,
+    "productivity": score_productivity,
+    "sum": score_sum,
+}
+
+def get_score_function(score):
     """
-    Traverse the tree and find nodes with highest savings, productivity, and total sum.
+    Resolve a scoring function from a name or callable.
 
     Args:
-        root (Node): The root node of the tree.
+        score (str or callable): One of "savings", "productivity", "sum", or a callable taking a Node.
     Returns:
-        tuple: Dictionaries for highest savings, productivity, and total sum nodes.
+        callable: Function mapping a Node to a comparable score.
+    """
+    if callable(score):
+        return score
+    try:
+        return SCORE_FUNCTIONS[score]
+    except KeyError:
+        raise ValueError(f"Unknown score {score!r}, expected one of {sorted(SCORE_FUNCTIONS)} or a callable")
+
+def get_path(node):
+    """
+    Return the list of nodes from the root down to the given node.
+
+    Args:
+        node (Node): The last node of the path.
+    Returns:
+        list: Nodes ordered from root to node.
+    """
+    path = []
+    while node is not None:
+        path.append(node)
+        node = node.parent
+    path.reverse()
+    return path
+
+def create_tree_beam(root_name = "Root", levels = 1, step = 50, width = 10, score = "sum",
+                     productivity = 10, savings = 10, workers = None, returnFunc = None):
+    """
+    Build a pruned tree of investment decisions using beam search.
+
+    Only the top `width` nodes of each month (by `score`) are expanded further, so the
+    number of nodes grows linearly with `levels` instead of exponentially. Pruned
+    children are detached from their parents, leaving only the surviving branches.
+
+    Args:
+        root_name (str): Name for the root node.
+        levels (int): Number of levels (months) to simulate.
+        step (int): Step size for investment percentage (0-100).
+        width (int): Number of nodes kept per month (beam width).
+        score (str or callable): "savings", "productivity", "sum" or a callable taking a Node.
+        productivity (float): Initial productivity.
+        savings (float): Initial savings.
+        workers (int): Concurrent CBC processes used per month (default: solve one at a time).
+        returnFunc (callable): Function of Budget returning the investment return (default: the LP optimizer).
+    Returns:
+        tuple: (root, best_path, stats) where best_path is the list of nodes from the root
+        to the best final-month node and stats is a dictionary of search statistics.
+    """
+    if width < 1:
+        raise ValueError("Beam width must be at least 1")
+    score_func = get_score_function(score)
+    start = time.perf_counter()
+
+    root = Node(None, root_name, 0, productivity, savings)
+    beam = [root]
+    percentages = list(range(0, 101, step))
+    stats = {
+        "width": width,
+        "levels": levels,
+        "step": step,
+        "nodes_evaluated": 0,
+        "full_tree_nodes": sum(len(percentages) ** level for level in range(1, levels + 1)),
+        "per_month": [],
+    }
+
+    for month in range(1, levels + 1):
+        candidates = expand_nodes(beam, percentages, workers, returnFunc)
+        stats["nodes_evaluated"] += len(candidates)
+
+        # Detach pruned children so memory stays bounded by the beam width
+        beam = _prune_level(candidates, width, score_func)
+
+        stats["per_month"].append({
+            "month": month,
+            "candidates": len(candidates),
+            "kept": len(beam),
+            "best_score": score_func(beam[0]),
+            "cutoff_score": score_func(beam[-1]),
+        })
+
+    best_node = max(beam, key=score_func)
+    stats["best_score"] = score_func(best_node)
+    stats["elapsed_seconds"] = time.perf_counter() - start
+    return root, get_path(best_node), stats
+
+def beam_width_tradeoff(widths, root_name = "Root", levels = 1, step = 50, score = "sum",
+                        productivity = 10, savings = 10, workers = None, returnFunc = None):
+    """
+    Run beam search for several widths and report the quality/cost trade-off.
+
+    Args:
+        widths (iterable): Beam widths to try.
+        root_name (str): Name for the root node.
+        levels (int): Number of levels (months) to simulate.
+        step (int): Step size for investment percentage (0-100).
+        score (str or callable): Scoring function passed to create_tree_beam.
+        productivity (float): Initial productivity.
+        savings (float): Initial savings.
+        workers (int): Concurrent CBC processes used per month (default: solve one at a time).
+        returnFunc (callable): Function of Budget returning the investment return (default: the LP optimizer).
+    Returns:
+        list: One dictionary per width with best score, nodes evaluated and elapsed time.
+    """
+    results = []
+    for width in widths:
+        _, best_path, stats = create_tree_beam(root_name, levels, step, width, score,
+                                               productivity, savings, workers, returnFunc)
+        results.append({
+            "width": width,
+            "best_score": stats["best_score"],
+            "best_percentages": [node.generationPercentage for node in best_path[1:]],
+            "nodes_evaluated": stats["nodes_evaluated"],
+            "elapsed_seconds": stats["elapsed_seconds"],
+        })
+    return results
+
+def create_tree_grid(root_name = "Root", grids = (), productivity = 10, savings = 10, workers = None,
+                     returnFunc = None):
+    """
+    Build a tree where each level has its own list of investment percentages.
+
+    Args:
+        root_name (str): Name for the root node.
+        grids (list): One list of percentages (0-100) per level (month).
+        productivity (float): Initial productivity.
+        savings (float): Initial savings.
+        workers (int): Concurrent CBC processes used per level (default: solve one at a time).
+        returnFunc (callable): Function of Budget returning the investment return (default: the LP optimizer).
+    Returns:
+        Node: The root node of the created tree.
+    """
+    root = Node(None, root_name, 0, productivity, savings)
+    frontier = [root]
+    for percentages in grids:
+        frontier = expand_nodes(frontier, percentages, workers, returnFunc)
+    return root
+
+def create_tree_adaptive(root_name = "Root", levels = 1, coarse_step = 25, refine_depth = 3,
+                         tolerance = 0.01, keep = 1, width = 10, score = "sum", productivity = 10, savings = 10,
+                         workers = None, returnFunc = None):
+    """
+    Build the investment tree coarse-to-fine, refining only around the most promising percentages.
+
+    The first pass explores every month at `coarse_step`. Each refinement halves the step and
+    rebuilds the tree using, for each month, only the percentages of the `keep` best final-month
+    paths and their neighbours at the new step. Refinement stops after `refine_depth` passes or
+    once the best score improves by no more than `tolerance`.
+
+    Every pass is pruned per month like create_tree_beam: only the top `width` nodes of a month
+    are expanded, so a pass evaluates at most width * grid size nodes per month instead of the
+    full product of its grids.
+
+    Args:
+        root_name (str): Name for the root node.
+        levels (int): Number of levels (months) to simulate.
+        coarse_step (int): Step size for the first, full pass (0-100).
+        refine_depth (int): Maximum number of refinement passes.
+        tolerance (float): Minimum score improvement required to keep refining.
+        keep (int): Number of best paths refined around at each pass.
+        width (int): Number of nodes kept per month within a pass (at least `keep`).
+        score (str or callable): "savings", "productivity", "sum" or a callable taking a Node.
+        productivity (float): Initial productivity.
+        savings (float): Initial savings.
+        workers (int): Concurrent CBC processes used per level (default: solve one at a time).
+        returnFunc (callable): Function of Budget returning the investment return (default: the LP optimizer).
+    Returns:
+        tuple: (root, best_path, stats) for the tree with the best score.
+    """
+    if width < 1:
+        raise ValueError("Adaptive width must be at least 1")
+    score_func = get_score_function(score)
+    start = time.perf_counter()
+    step = coarse_step
+    width = max(width, keep)
+    grids = [list(range(0, 101, coarse_step))] * levels
+    stats = {"levels": levels, "coarse_step": coarse_step, "width": width, "nodes_evaluated": 0, "passes": []}
+    best_score = float('-inf')
+
+    for depth in range(refine_depth + 1):
+        root = Node(None, root_name, 0, productivity, savings)
+        frontier = [root]
+        nodes = 0
+        for percentages in grids:
+            candidates = expand_nodes(frontier, percentages, workers, returnFunc)
+            nodes += len(candidates)
+            frontier = _prune_level(candidates, width, score_func)
+        top = heapq.nlargest(keep, frontier, key=score_func)
+        stats["nodes_evaluated"] += nodes
+        improvement = score_func(top[0]) - best_score
+        stats["passes"].append({
+            "depth": depth,
+            "step": step,
+            "grid_sizes": [len(grid) for grid in grids],
+            "nodes": nodes,
+            "best_score": score_func(top[0]),
+            "best_percentages": [node.generationPercentage for node in get_path(top[0])[1:]],
+        })
+        if improvement > 0:
+            best_root, best_node, best_score = root, top[0], score_func(top[0])
+        if depth == refine_depth or (depth > 0 and improvement <= tolerance):
+            break
+
+        step = step / 2
+        paths = [get_path(node)[1:] for node in top]
+        grids = [sorted({min(100, max(0, path[month].generationPercentage + offset * step))
+                         for path in paths for offset in (-1, 0, 1)})
+                 for month in range(levels)]
+
+    stats["final_step"] = step
+    stats["best_score"] = best_score
+    stats["full_tree_nodes"] = sum(int(100 / step + 1) ** level for level in range(1, levels + 1))
+    stats["elapsed_seconds"] = time.perf_counter() - start
+    return best_root, get_path(best_node), stats
+
+def _prune_level(candidates, width, score_func):
+    """Keep the top `width` candidates and detach the rest from their parents."""
+    kept = heapq.nlargest(width, candidates, key=score_func)
+    kept_ids = set(map(id, kept))
+    for node in {id(c.parent): c.parent for c in candidates}.values():
+        node.children = [c for c in node.children if id(c) in kept_ids]
+    return kept
+
+def create_tree_rolling(root_name = "Root", levels = 1, step = 50, window = 3, width = None, score = "sum",
+                        productivity = 10, savings = 10, workers = None, returnFunc = None):
+    """
+    Plan the investment path with a rolling (receding) horizon.
+
+    At each month the tree is looked ahead `window` months, the best lookahead node (by `score`)
+    is found, and only its first decision is committed before moving one month forward. The
+    lookahead below the committed node is kept, so each month only expands one new level of
+    leaves; the branches not taken are detached, keeping memory bounded by the window instead
+    of the horizon.
+
+    Args:
+        root_name (str): Name for the root node.
+        levels (int): Number of levels (months) to simulate.
+        step (int): Step size for investment percentage (0-100).
+        window (int): Number of months looked ahead before each decision.
+        width (int): If given, keep only the top `width` nodes per lookahead month (beam search
+            within the window); by default the window is explored in full.
+        score (str or callable): "savings", "productivity", "sum" or a callable taking a Node.
+        productivity (float): Initial productivity.
+        savings (float): Initial savings.
+        workers (int): Concurrent CBC processes used per expansion (default: solve one at a time).
+        returnFunc (callable): Function of Budget returning the investment return (default: the LP optimizer).
+    Returns:
+        tuple: (root, best_path, stats) where root holds only the committed path and stats is a
+        dictionary of search statistics.
+    """
+    if window < 1:
+        raise ValueError("Rolling window must be at least 1 month")
+    if width is not None and width < 1:
+        raise ValueError("Lookahead width must be at least 1")
+    score_func = get_score_function(score)
+    start = time.perf_counter()
+
+    root = Node(None, root_name, 0, productivity, savings)
+    percentages = list(range(0, 101, step))
+    stats = {
+        "window": window,
+        "width": width,
+        "levels": levels,
+        "step": step,
+        "nodes_evaluated": 0,
+        "full_tree_nodes": sum(len(percentages) ** level for level in range(1, levels + 1)),
+        "per_month": [],
+    }
+
+    def extend(frontier):
+        candidates = expand_nodes(frontier, percentages, workers, returnFunc)
+        stats["nodes_evaluated"] += len(candidates)
+        return _prune_level(candidates, width, score_func) if width else candidates
+
+    frontier = [root]
+    for _ in range(min(window, levels)):
+        frontier = extend(frontier)
+
+    committed = root
+    for month in range(1, levels + 1):
+        best_leaf = max(frontier, key=score_func)
+        decision = best_leaf
+        while decision.parent is not committed:
+            decision = decision.parent
+        committed.children = [decision]
+
+        # Keep only the lookahead below the committed decision
+        survivors = []
+        for leaf in frontier:
+            node = leaf
+            while node.month > month:
+                node = node.parent
+            if node is decision:
+                survivors.append(leaf)
+        stats["per_month"].append({
+            "month": month,
+            "percentage": decision.generationPercentage,
+            "lookahead_nodes": len(frontier),
+            "lookahead_score": score_func(best_leaf),
+        })
+        committed = decision
+        frontier = extend(survivors) if survivors[0].month < levels else survivors
+
+    # The committed node of the last month is a leaf: nothing is left below it
+    stats["best_score"] = score_func(committed)
+    stats["elapsed_seconds"] = time.perf_counter() - start
+    return root, get_path(committed), stats
+
+def iter_nodes_bfs(root):
+    """
+    Yield every node of the tree in breadth-first order.
+
+    Args:
+        root (Node): The root node of the tree.
+    Yields:
+        Node: Each node, starting with the root.
     """
-    highest_savings = {"value": float('-inf'), "node": None}
-    highest_productivity = {"value": float('-inf'), "node": None}
-    highest_sum = {"value": float('-inf'), "node": None}
-    
     queue = deque([root])
-    
     while queue:
         node = queue.popleft()
-        # Check for highest savings
-        if node.savings > highest_savings["value"]:
-            highest_savings["value"] = node.savings
-            highest_savings["node"] = node
-        # Check for highest productivity
-        if node.productivity > highest_productivity["value"]:
-            highest_productivity["value"] = node.productivity
-            highest_productivity["node"] = node
-        # Calculate and check for highest sum
-        current_sum = node.productivity + node.savings
-        if current_sum > highest_sum["value"]:
-            highest_sum["value"] = current_sum
-            highest_sum["node"] = node
+        yield node
         queue.extend(node.children)
-    
-    return highest_savings, highest_productivity, highest_sum
+
+class NodeLeaderboard:
+    """
+    Single-pass aggregation of the top-k nodes per metric, overall and per month.
+
+    Each metric keeps a bounded min-heap of size k, so memory stays O(k * metrics * months)
+    regardless of how many nodes are streamed through. On equal values the node seen
+    first is kept, matching the behaviour of find_highest_nodes.
+
+    Attributes:
+        k (int): Number of nodes kept per metric (and per month).
+        metrics (dict): Metric name -> key function taking a Node.
+    """
+    def __init__(self, k = 1, metrics = None):
+        if k < 1:
+            raise ValueError("k must be at least 1")
+        self.k = k
+        self.metrics = dict(SCORE_FUNCTIONS)
+        if metrics:
+            self.metrics.update(metrics)
+        self.count = 0
+        self._overall = {name: [] for name in self.metrics}
+        self._monthly = {}  # month -> {metric name -> heap}
+
+    def _push(self, heap, value, node):
+        # Later nodes get a smaller tie-breaker, so earlier nodes win on equal values
+        entry = (value, -self.count, node)
+        if len(heap) < self.k:
+            heapq.heappush(heap, entry)
+        elif entry[:2] > heap[0][:2]:
+            heapq.heapreplace(heap, entry)
+
+    def add(self, node):
+        """Add a single node to every leaderboard."""
+        monthly = self._monthly.get(node.month)
+        if monthly is None:
+            monthly = self._monthly[node.month] = {name: [] for name in self.metrics}
+        for name, key in self.metrics.items():
+            value = key(node)
+            self._push(self._overall[name], value, node)
+            self._push(monthly[name], value, node)
+        self.count += 1
+
+    def update(self, source):
+        """
+        Add many nodes in a single pass.
+
+        Args:
+            source (Node or iterable): A root node (the whole tree is traversed) or any iterable of nodes.
+        Returns:
+            NodeLeaderboard: self, for chaining.
+        """
+        nodes = iter_nodes_bfs(source) if isinstance(source, Node) else source
+        for node in nodes:
+            self.add(node)
+        return self
+
+    @staticmethod
+    def _ranked(heap):
+        return [(value, node) for value, _, node in sorted(heap, key=lambda entry: entry[:2], reverse=True)]
+
+    def top(self, metric):
+        """
+        Return the top-k (value, node) pairs for a metric, best first.
+
+        Args:
+            metric (str): Metric name ("savings", "productivity", "sum" or a user-supplied key).
+        """
+        return self._ranked(self._overall[metric])
+
+    def top_by_month(self, metric, month = None):
+        """
+        Return the top-k (value, node) pairs for a metric within each month, best first.
+
+        Args:
+            metric (str): Metric name.
+            month (int): If given, return only the list for that month.
+        Returns:
+            dict or list: Month -> ranked list, or a single ranked list when month is given.
+        """
+        if month is not None:
+            return self._ranked(self._monthly.get(month, {}).get(metric, []))
+        return {m: self._ranked(heaps[metric]) for m, heaps in sorted(self._monthly.items())}
+
+    def months(self):
+        """Return the months seen so far, in order."""
+        return sorted(self._monthly)
+
+def aggregate_nodes(source, k = 1, metrics = None):
+    """
+    Build leaderboards for a tree or a stream of nodes in one traversal.
+
+    Args:
+        source (Node or iterable): A root node or any iterable of nodes.
+        k (int): Number of nodes kept per metric (and per month).
+        metrics (dict): Extra metric name -> key function pairs.
+    Returns:
+        NodeLeaderboard: The populated leaderboard.
+    """
+    return NodeLeaderboard(k, metrics).update(source)
+
+def pareto_frontier(nodes):
+    """
+    Return the non-dominated nodes when maximizing both savings and productivity.
+
+    Sorts once by (savings, productivity) descending and sweeps, keeping each node whose
+    productivity beats every node with at least its savings: O(n log n).
+
+    Args:
+        nodes (iterable): Nodes to filter.
+    Returns:
+        list: Frontier nodes, ordered by savings descending (productivity ascending).
+    """
+    frontier = []
+    best_productivity = float('-inf')
+    for node in sorted(nodes, key=lambda n: (n.savings, n.productivity), reverse=True):
+        if node.productivity > best_productivity:
+            frontier.append(node)
+            best_productivity = node.productivity
+    return frontier
+
+def pareto_frontiers(source):
+    """
+    Compute the savings/productivity Pareto frontier per month and for the final horizon.
+
+    Args:
+        source (Node or iterable): A root node (the whole tree is traversed) or any iterable of nodes.
+    Returns:
+        dict: "by_month" (month -> frontier), "final" (frontier of the last month) and
+        "overall" (frontier across all months).
+    """
+    by_month = {}
+    nodes = iter_nodes_bfs(source) if isinstance(source, Node) else source
+    for node in nodes:
+        by_month.setdefault(node.month, []).append(node)
+    frontiers = {month: pareto_frontier(group) for month, group in sorted(by_month.items())}
+    return {
+        "by_month": frontiers,
+        "final": frontiers[max(frontiers)] if frontiers else [],
+        # The overall frontier is contained in the union of the monthly ones
+        "overall": pareto_frontier(node for frontier in frontiers.values() for node in frontier),
+    }
+
+def best_weighted(frontier, savings_weight = 1.0, productivity_weight = 1.0):
+    """
+    Answer a weighted objective from a Pareto frontier without touching the full tree.
+
+    For non-negative weights the maximum of savings_weight * savings + productivity_weight *
+    productivity over all nodes is always attained on the frontier.
+
+    Args:
+        frontier (list): Frontier nodes from pareto_frontier or pareto_frontiers.
+        savings_weight (float): Weight on savings (>= 0).
+        productivity_weight (float): Weight on productivity (>= 0).
+    Returns:
+        tuple: (value, node) for the best node, or (None, None) for an empty frontier.
+    """
+    if savings_weight < 0 or productivity_weight < 0:
+        raise ValueError("Weights must be non-negative to be answered from the frontier")
+    best = (None, None)
+    for node in frontier:
+        value = savings_weight * node.savings + productivity_weight * node.productivity
+        if best[0] is None or value > best[0]:
+            best = (value, node)
+    return best
+
+def find_highest_nodes(root):
+    """
+    Traverse the tree and find nodes with highest savings, productivity, and total sum.
+
+    Args:
+        root (Node): The root node of the tree.
+    Returns:
+        tuple: Dictionaries for highest savings, productivity, and total sum nodes.
+    """
+    leaderboard = aggregate_nodes(root)
+    highest = []
+    for metric in ("savings", "productivity", "sum"):
+        value, node = leaderboard.top(metric)[0]
+        highest.append({"value": value, "node": node})
+    return tuple(highest)
 
 def display_highest_nodes(root):
     """
@@ -209,15 +964,137 @@ def display_highest_nodes(root):
     print(f"Total Sum: {highest_sum['value']:.2f}")
     print(f"Investment %: {highest_sum['node'].generationPercentage}%")
 
-# Create the tree using BFS
-num_levels = 5
-step = 100
-tree_root = create_tree_bfs("R", num_levels, step)
+def display_path(path):
+    """
+    Display a path month by month.
+
+    Args:
+        path (list): Nodes (as returned by get_path) or dictionaries with month,
+            percentage, productivity and savings keys.
+    """
+    print("\n=== Best Path ===")
+    for point in path:
+        if isinstance(point, Node):
+            point = {"month": point.month, "percentage": point.generationPercentage,
+                     "productivity": point.productivity, "savings": point.savings}
+        percentage = "-" if point["percentage"] is None else f"{point['percentage']:g}%"
+        print(f"Month: {point['month']} Investment %: {percentage} "
+              f"Productivity: {point['productivity']:.2f} Savings: {point['savings']:.2f}")
+
+ENGINES = ("bfs", "beam", "adaptive", "rolling", "value-iteration", "milp")
+
+def parse_args(argv = None):
+    """Parse command-line arguments for the simulation."""
+    parser = argparse.ArgumentParser(description="Simulate investment and productivity growth over a horizon of months.")
+    parser.add_argument("--levels", type=int, default=5, help="number of months to simulate (default: 5)")
+    parser.add_argument("--step", type=int, default=100, help="step size for investment percentage, 0-100 (default: 100)")
+    parser.add_argument("--productivity", type=float, default=10, help="initial productivity (default: 10)")
+    parser.add_argument("--savings", type=float, default=10, help="initial savings (default: 10)")
+    parser.add_argument("--variables", help="JSON file of variables to invest in (default: catalogue in LP_Interface.py)")
+    parser.add_argument("--engine", choices=ENGINES, default="bfs", help="search engine (default: bfs)")
+    parser.add_argument("--workers", type=int, default=1, help="concurrent CBC processes (or profit scenario threads) "
+                        "for tree engines (default: 1)")
+    parser.add_argument("--checkpoint-dir", help="checkpoint the bfs engine to this directory so an interrupted run "
+                        "can be continued with --resume")
+    parser.add_argument("--checkpoint-every", type=int, default=1000,
+                        help="parent nodes expanded between checkpoints (default: 1000)")
+    parser.add_argument("--resume", action="store_true", help="continue the checkpointed run in --checkpoint-dir "
+                        "(its levels, step and starting values are used)")
+    parser.add_argument("--width", type=int, default=10, help="nodes kept per month by the beam and adaptive engines (default: 10)")
+    parser.add_argument("--window", type=int, default=3, help="months looked ahead by the rolling engine (default: 3)")
+    parser.add_argument("--lookahead-width", type=int, help="nodes kept per lookahead month by the rolling engine "
+                        "(default: explore the whole window)")
+    parser.add_argument("--score", choices=sorted(SCORE_FUNCTIONS), default="sum", help="objective to maximize (default: sum)")
+    parser.add_argument("--profit-distributions", help="JSON file of per-variable profit distributions; returns become "
+                        "a statistic over sampled profit scenarios (see scenarios.py)")
+    parser.add_argument("--scenarios", type=int, default=1000, help="number of profit scenarios (default: 1000)")
+    parser.add_argument("--scenario-statistic", default="mean",
+                        help="statistic of the scenario returns to maximize: mean, p<q> or worst_<q>_mean (default: mean)")
+    parser.add_argument("--seed", type=int, help="seed for the profit scenarios")
+    parser.add_argument("--shared-table", type=float, metavar="MAX_BUDGET",
+                        help="answer budgets up to MAX_BUDGET from a shared-memory table, published once "
+                        "for all processes using the same catalogue (see shared_tables.py)")
+    args = parser.parse_args(argv)
+    if (args.profit_distributions or args.shared_table) and args.engine == "milp":
+        parser.error("the milp engine does not support --profit-distributions or --shared-table")
+    if args.engine == "milp" and args.workers != 1:
+        parser.error("the milp engine solves a single model and does not support --workers")
+    if args.checkpoint_dir and args.engine != "bfs":
+        parser.error("--checkpoint-dir is only supported by the bfs engine")
+    if args.resume and not args.checkpoint_dir:
+        parser.error("--resume requires --checkpoint-dir")
+    if args.profit_distributions and args.shared_table:
+        parser.error("--profit-distributions and --shared-table cannot be combined")
+    return args
+
+def main(argv = None):
+    """Run the simulation from the command line."""
+    args = parse_args(argv)
+    if args.variables:
+        loadVariablesFile(args.variables)
+    else:
+        addVariablesToModel()
+
+    returnFunc = engine = table = None
+    if args.profit_distributions:
+        from scenarios import ScenarioEngine, load_distributions
+        engine = ScenarioEngine(distributions=load_distributions(args.profit_distributions), scenarios=args.scenarios,
+                                seed=args.seed, statistic=args.scenario_statistic)
+        returnFunc = engine.returnFunc
+    elif args.shared_table:
+        from shared_tables import attach_table
+        table = attach_table(max_budget=args.shared_table, workers=args.workers)
+        returnFunc = table.returnFunc
+    try:
+        run_engine(args, returnFunc)
+    finally:
+        if table is not None:
+            table.release()
 
-# Display the tree
-# tree = Tree(tree_root)
-# tree.display_bfs()
+    if engine is not None:
+        stats = engine.stats()
+        print(f"Profit scenarios: {stats['scenarios']} at {stats['budgets']} budgets, {stats['solves']} exact solves "
+              f"for {stats['scenario_evaluations']} scenario evaluations")
 
-# Display Highest
+def run_engine(args, returnFunc = None):
+    """Run the search engine selected on the command line and display its result."""
+    if args.engine == "bfs" and args.checkpoint_dir:
+        if args.resume:
+            resume_tree_bfs(args.checkpoint_dir, args.checkpoint_every, args.workers, returnFunc)
+        else:
+            create_tree_bfs_checkpointed(args.checkpoint_dir, "R", args.levels, args.step, args.checkpoint_every,
+                                         args.productivity, args.savings, args.workers, returnFunc)
+        display_highest_nodes(load_tree_from_checkpoint(args.checkpoint_dir))
+    elif args.engine == "bfs":
+        tree_root = create_tree_bfs("R", args.levels, args.step, args.productivity, args.savings, args.workers, returnFunc)
+        display_highest_nodes(tree_root)
+    elif args.engine == "beam":
+        _, path, stats = create_tree_beam("R", args.levels, args.step, args.width, args.score,
+                                          args.productivity, args.savings, args.workers, returnFunc)
+        display_path(path)
+        print(f"\nScore: {stats['best_score']:.2f} Nodes evaluated: {stats['nodes_evaluated']}")
+    elif args.engine == "adaptive":
+        _, path, stats = create_tree_adaptive("R", args.levels, args.step, width=args.width, score=args.score,
+                                              productivity=args.productivity, savings=args.savings, workers=args.workers,
+                                              returnFunc=returnFunc)
+        display_path(path)
+        print(f"\nScore: {stats['best_score']:.2f} Nodes evaluated: {stats['nodes_evaluated']}")
+    elif args.engine == "rolling":
+        _, path, stats = create_tree_rolling("R", args.levels, args.step, args.window, args.lookahead_width, args.score,
+                                             args.productivity, args.savings, args.workers, returnFunc)
+        display_path(path)
+        print(f"\nScore: {stats['best_score']:.2f} Nodes evaluated: {stats['nodes_evaluated']}")
+    elif args.engine == "value-iteration":
+        from value_iteration import solve_value_iteration
+        result = solve_value_iteration(args.levels, args.step, args.productivity, args.savings, args.score,
+                                       **({"returnFunc": returnFunc} if returnFunc else {}))
+        display_path(result["path"])
+        print(f"\nScore: {result['score']:.2f}")
+    elif args.engine == "milp":
+        from multiperiod_milp import solve_multiperiod
+        result = solve_multiperiod(args.levels, args.productivity, args.savings, args.score, args.step)
+        display_path(result["path"])
+        print(f"\nScore: {result['score']:.2f} Status: {result['status']}")
 
-display_highest_nodes(tree_root)
\ No newline at end of file
+if __name__ == "__main__":
+    main()
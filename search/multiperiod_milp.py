@@ -0,0 +1,162 @@
+"""
+multiperiod_milp.py
+
+Exact multi-period MILP formulation of the investment horizon simulated in generate.py.
+
+- Instead of enumerating every percentage sequence and solving the single-period LP at each
+  node, the whole horizon is built as one model and solved once for the true optimum.
+- Per-month investments and product quantities are decision variables; the savings and
+  productivity recurrences of investmentHandler become linear constraints.
+- With step=None the invested fraction is continuous; with a step the fraction is restricted
+  to the same percentage grid as create_tree_bfs (linearized with big-M constraints), so the
+  result matches the best node of the full tree. The grid version adds binaries per month and
+  percentage and is much harder to solve; use it with a timeLimit beyond short horizons.
+
+Dependencies:
+- LP_PULP.py (variable definitions)
+- PuLP
+
+@author: Mafu
+@date: 2026-10-19
+"""
+
+import time
+from pulp import (LpProblem, LpVariable, LpMaximize, lpSum, PULP_CBC_CMD, LpStatus,
+                  LpSolutionOptimal, LpSolutionIntegerFeasible)
+import LP_PULP
+from LP_Interface import addVariablesToModel
+
+def savings_upper_bounds(levels, productivity, savings, variables):
+    """
+    Upper bounds on savings for months 0..levels, used as big-M constants.
+
+    The monthly return can never exceed the best profit per unit of budget times the
+    whole savings, so the bounds hold for every schedule.
+    """
+    rate = max([var.profit for var in variables] + [0.0])
+    bounds = [savings]
+    p_high, s_high = productivity, savings
+    for _ in range(levels):
+        p_high, s_high = p_high + rate * s_high, s_high + p_high
+        bounds.append(s_high)
+    return bounds
+
+def solve_multiperiod(levels = 12, productivity = 10, savings = 10, score = "sum", step = None,
+                      variables = None, timeLimit = None, msgShow = False):
+    """
+    Solve the whole investment horizon as a single MILP.
+
+    Args:
+        levels (int): Number of months to plan.
+        productivity (float): Initial productivity.
+        savings (float): Initial savings.
+        score (str): Objective at the horizon, one of "savings", "productivity", "sum".
+        step (int): If given, restrict investment percentages to multiples of step (0-100).
+        variables (list[IntegerVariable]): Catalogue to invest in (default: LP_PULP.variables_list).
+        timeLimit (float): Optional solver time limit in seconds.
+        msgShow (bool): Whether to show solver messages.
+    Returns:
+        dict: "status", "score", "path" (per-month percentages, allocations and states) and "stats".
+            The status is "Optimal", or "Time limit" when the time limit stopped the search with
+            an incumbent.
+    Raises:
+        ValueError: If the model has no solution (infeasible, unbounded, or stopped without one).
+    """
+    if score not in ("savings", "productivity", "sum"):
+        raise ValueError(f"Unknown score {score!r}, expected 'savings', 'productivity' or 'sum'")
+    if variables is None:
+        variables = LP_PULP.variables_list
+    start = time.perf_counter()
+    months = range(levels)
+
+    model = LpProblem("Multi_Period_Investment", LpMaximize)
+    P = [productivity] + [LpVariable(f"productivity_{t + 1}") for t in months]
+    S = [savings] + [LpVariable(f"savings_{t + 1}", lowBound=0) for t in months]
+    invest = [LpVariable(f"invest_{t}", lowBound=0) for t in months]
+    quantity = [[LpVariable(f"quantity_{t}_{i}", lowBound=var.lowerBound, upBound=var.upperBound,
+                            cat='Integer' if var.integer else 'Continuous')
+                 for i, var in enumerate(variables)] for t in months]
+
+    fractions = None
+    if step is not None:
+        fractions = [i / 100 for i in range(0, 101, step)]
+        big_m = savings_upper_bounds(levels, productivity, savings, variables)
+
+    for t in months:
+        spend = lpSum([var.multiplier * quantity[t][i] for i, var in enumerate(variables)])
+        investmentReturn = lpSum([var.profit * var.multiplier * quantity[t][i] for i, var in enumerate(variables)])
+        model += (spend <= invest[t], f"Budget_{t}")
+        model += (S[t + 1] == S[t] - invest[t] + P[t], f"Savings_{t}")
+        model += (P[t + 1] == P[t] + investmentReturn, f"Productivity_{t}")
+
+        if fractions is None:
+            model += (invest[t] <= S[t], f"Invest_Limit_{t}")
+        else:
+            # invest_t = sum_k fraction_k * S_t * choose_tk, with w_tk = S_t * choose_tk linearized
+            choose = [LpVariable(f"choose_{t}_{k}", cat='Binary') for k in range(len(fractions))]
+            share = [LpVariable(f"share_{t}_{k}", lowBound=0) for k in range(len(fractions))]
+            model += (lpSum(choose) == 1, f"One_Percentage_{t}")
+            for k in range(len(fractions)):
+                model += (share[k] <= big_m[t] * choose[k], f"Share_On_{t}_{k}")
+                model += (share[k] <= S[t], f"Share_Max_{t}_{k}")
+                model += (share[k] >= S[t] - big_m[t] * (1 - choose[k]), f"Share_Min_{t}_{k}")
+            model += (invest[t] == lpSum([f * share[k] for k, f in enumerate(fractions)]), f"Invest_Grid_{t}")
+
+    if score == "savings":
+        model += S[levels], "Final_Savings"
+    elif score == "productivity":
+        model += P[levels], "Final_Productivity"
+    else:
+        model += P[levels] + S[levels], "Final_Total"
+
+    model.solve(PULP_CBC_CMD(msg=msgShow, timeLimit=timeLimit))
+    status = LpStatus[model.status]
+    # CBC reports Optimal with an integer-feasible solution when the time limit hits
+    if status != "Optimal" or model.sol_status not in (LpSolutionOptimal, LpSolutionIntegerFeasible):
+        raise ValueError(f"Multi-period MILP has no solution: {status}")
+    if model.sol_status == LpSolutionIntegerFeasible:
+        status = "Time limit"
+
+    def value(x):
+        return x if isinstance(x, (int, float)) else (x.varValue or 0.0)
+
+    path = [{"month": 0, "percentage": None, "invested": None, "allocation": None,
+             "productivity": productivity, "savings": savings}]
+    for t in months:
+        invested = value(invest[t])
+        current_savings = value(S[t])
+        path.append({
+            "month": t + 1,
+            "percentage": 100 * invested / current_savings if current_savings > 0 else 0.0,
+            "invested": invested,
+            "allocation": {var.name: round(value(quantity[t][i])) * var.multiplier if var.integer
+                           else value(quantity[t][i]) * var.multiplier
+                           for i, var in enumerate(variables)},
+            "productivity": value(P[t + 1]),
+            "savings": value(S[t + 1]),
+        })
+
+    final = path[-1]
+    return {
+        "status": status,
+        "score": {"savings": final["savings"], "productivity": final["productivity"],
+                  "sum": final["savings"] + final["productivity"]}[score],
+        "path": path,
+        "stats": {
+            "levels": levels,
+            "step": step,
+            "variables": len(model.variables()),
+            "constraints": len(model.constraints),
+            "elapsed_seconds": time.perf_counter() - start,
+        },
+    }
+
+if __name__ == "__main__":
+    addVariablesToModel()
+    result = solve_multiperiod(levels=12)
+    print(f"\n=== Multi-Period MILP ({result['status']}) ===")
+    for point in result["path"][1:]:
+        print(f"Month: {point['month']} Investment %: {point['percentage']:.1f} "
+              f"Productivity: {point['productivity']:.2f} Savings: {point['savings']:.2f} "
+              f"Allocation: {point['allocation']}")
+    print(f"\nScore: {result['score']:.2f} Elapsed: {result['stats']['elapsed_seconds']:.2f}s")
@@ -0,0 +1,398 @@
+"""
+scenarios.py
+
+Monte Carlo engine for uncertain profits in the single-period LP and the generate.py horizon.
+
+- Each variable's profit can follow a distribution ("normal", "uniform", "triangular",
+  "lognormal" or "fixed"); thousands of profit scenarios are sampled at once with NumPy.
+- Any allocation solved for one scenario stays feasible in every other scenario (only the
+  objective changes), so the profit of every known allocation in every scenario is a single
+  matrix product.
+- A scenario is re-optimized only when no known allocation is certified optimal for it.
+  Every scenario q solved exactly gives upper bounds min over t >= 0 of t·V(q) + max_x (p - t·q)·x
+  (x over the LP relaxation) for all other scenarios p; an allocation whose profit meets the
+  bound (within the tolerance) is optimal without calling the solver. The bound is exact when
+  p lies in the cone spanned by q and the constraints active at q's optimal allocation.
+- Reports the distribution of profit (mean, spread, quantiles, tail averages) and of the
+  allocation of each variable.
+- ScenarioEngine.returnFunc plugs the engine into generate.py and value_iteration.py in place
+  of LP_optimizeCall, so the horizon simulation maximizes an expected (or tail) return.
+
+Dependencies:
+- LP_PULP.py (variable definitions and exact solves)
+- shared_tables.py (integrality check for per-budget memoization)
+- NumPy
+
+@author: Mafu
+@date: 2026-10-19
+"""
+
+import json
+import threading
+import time
+import numpy as np
+import LP_PULP
+from LP_PULP import IntegerVariable, solveModel
+from shared_tables import is_integral
+
+# Samplers by distribution name: (rng, size, spec, nominal profit) -> ndarray
+DISTRIBUTIONS = {
+    "fixed": lambda rng, n, spec, nominal: np.full(n, float(spec.get("value", nominal))),
+    "normal": lambda rng, n, spec, nominal: rng.normal(spec.get("mean", nominal), spec["std"], n),
+    "uniform": lambda rng, n, spec, nominal: rng.uniform(spec["low"], spec["high"], n),
+    "triangular": lambda rng, n, spec, nominal: rng.triangular(spec["low"], spec.get("mode", nominal), spec["high"], n),
+    "lognormal": lambda rng, n, spec, nominal: spec.get("scale", nominal) * rng.lognormal(0.0, spec["sigma"], n),
+}
+
+def load_distributions(path):
+    """
+    Load profit distributions from a JSON file mapping variable names to specs, e.g.
+    {"coffee cake": {"dist": "normal", "std": 0.3}}.
+    """
+    with open(path, "r") as f:
+        return json.load(f)
+
+def sample_profits(variables, distributions, scenarios = 1000, seed = None):
+    """
+    Sample profit scenarios.
+
+    Args:
+        variables (list[IntegerVariable]): Catalogue; variables without a distribution keep their profit.
+        distributions (dict): Variable name to a number (fixed profit) or a spec with a "dist" key
+            (see DISTRIBUTIONS); omitted means/modes/scales default to the variable's profit.
+        scenarios (int): Number of scenarios.
+        seed (int): Seed of the random generator.
+    Returns:
+        ndarray: Profits per unit of budget, shape (scenarios, len(variables)).
+    """
+    unknown = set(distributions) - {var.name for var in variables}
+    if unknown:
+        raise ValueError(f"Distributions given for unknown variables: {', '.join(sorted(unknown))}")
+    rng = np.random.default_rng(seed)
+    profits = np.empty((scenarios, len(variables)))
+    for i, var in enumerate(variables):
+        spec = distributions.get(var.name, {"dist": "fixed"})
+        if isinstance(spec, (int, float)):
+            spec = {"dist": "fixed", "value": spec}
+        if spec.get("dist", "fixed") not in DISTRIBUTIONS:
+            raise ValueError(f"Unknown distribution {spec['dist']!r} for {var.name}, "
+                             f"expected one of {', '.join(DISTRIBUTIONS)}")
+        profits[:, i] = DISTRIBUTIONS[spec.get("dist", "fixed")](rng, scenarios, spec, var.profit)
+    return profits
+
+def relaxation_bounds(weights, lower_spend, capacity, budget):
+    """
+    Maximize weights·x over the LP relaxation of the budget constraint, for many weight vectors.
+
+    x is the spend per variable (quantity times multiplier), between the lower-bound spend and
+    the lower-bound spend plus capacity, with total spend at most budget. The fractional
+    knapsack is solved greedily for every row at once.
+
+    Args:
+        weights (ndarray): Profit (or profit change) per unit of budget, shape (n, variables).
+        lower_spend (ndarray): Spend forced by the lower bounds.
+        capacity (ndarray): Additional spend allowed by the upper bounds (inf if unbounded).
+        budget (float): Budget constraint value.
+    Returns:
+        ndarray: Optimal relaxation value per row.
+    """
+    remaining = max(budget - lower_spend.sum(), 0.0)
+    order = np.argsort(-weights, axis=1)
+    sorted_weights = np.take_along_axis(weights, order, axis=1)
+    caps = np.minimum(capacity, remaining)[order]
+    before = np.cumsum(caps, axis=1) - caps
+    amounts = np.clip(remaining - before, 0.0, caps)
+    amounts[sorted_weights <= 0] = 0.0
+    return weights @ lower_spend + (sorted_weights * amounts).sum(axis=1)
+
+def anchor_bounds(profits, anchor, optimum, lower_spend, capacity, budget, iterations = 60):
+    """
+    Upper bounds on the optimal profit of many scenarios from one exactly solved scenario.
+
+    Every feasible x satisfies anchor·x <= optimum, so for any t >= 0 the optimal profit at p is
+    at most t·optimum + max_x (p - t·anchor)·x over the LP relaxation. The right-hand side is
+    convex in t and minimized per scenario by golden-section search.
+
+    Args:
+        profits (ndarray): Profit scenarios, shape (n, variables).
+        anchor (ndarray): Profits of the solved scenario.
+        optimum (float): Optimal profit of the solved scenario.
+        lower_spend, capacity, budget: As for relaxation_bounds.
+        iterations (int): Golden-section iterations.
+    Returns:
+        ndarray: Upper bound per scenario.
+    """
+    def bound(t):
+        return t * optimum + relaxation_bounds(profits - t[:, None] * anchor, lower_spend, capacity, budget)
+
+    # Past the largest ratio p_i / anchor_i the bound only grows with t
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratios = np.where(anchor > 0, profits / anchor, 0.0)
+    low = np.zeros(len(profits))
+    high = np.maximum(ratios.max(axis=1), 0.0)
+    best = np.minimum(bound(low), bound(high))
+    golden = (np.sqrt(5) - 1) / 2
+    a, b = high - golden * (high - low), low + golden * (high - low)
+    fa, fb = bound(a), bound(b)
+    for _ in range(iterations):
+        left = fa <= fb
+        high = np.where(left, b, high)
+        low = np.where(left, low, a)
+        a, b = np.where(left, high - golden * (high - low), b), np.where(left, a, low + golden * (high - low))
+        fa, fb = np.where(left, bound(a), fb), np.where(left, fa, bound(b))
+        best = np.minimum(best, np.minimum(fa, fb))
+    return best
+
+def solve_optimal(variables, budget, msgShow = False):
+    """
+    solveModel, which raises unless CBC proves the allocation optimal.
+
+    Certificates derived from an anchor are only valid if its allocation is optimal, so a
+    failed or stopped solve must not reach them.
+
+    Raises:
+        ValueError: If the solver does not report an optimal solution.
+    """
+    return solveModel(variables, budget, msgShow)
+
+def spendable_budget(variables, budget):
+    """
+    Largest total spend a feasible allocation can reach, at most budget.
+
+    With only integer variables the spend moves in steps of the multipliers, so the budget
+    constraint of the relaxation can be tightened to this value (one solve, independent of
+    profits). Tighter relaxations certify many more scenarios.
+    """
+    if not all(var.integer for var in variables):
+        return budget
+    spend_vars = [IntegerVariable(var.name, var.lowerBound, var.upperBound, 1.0, True, var.multiplier)
+                  for var in variables]
+    _, allocation = solve_optimal(spend_vars, budget)
+    return min(budget, sum(allocation.values()))
+
+def _allocation_vector(variables, allocation):
+    return np.array([allocation[var.name] for var in variables], dtype=float)
+
+def evaluate_scenarios(variables, budget, profits, tolerance = 1e-6, max_solves = None, msgShow = False):
+    """
+    Optimal profit and allocation for every profit scenario, re-solving only uncertified scenarios.
+
+    Args:
+        variables (list[IntegerVariable]): Catalogue (bounds, multipliers and integrality).
+        budget (float): Budget constraint value.
+        profits (ndarray): Profit scenarios from sample_profits, shape (scenarios, variables).
+        tolerance (float): Relative gap under which a known allocation counts as optimal.
+        max_solves (int): Optional cap on exact solves; remaining scenarios keep the best known
+            allocation and their gap is reported.
+        msgShow (bool): Whether to show solver messages.
+    Returns:
+        dict: "profits" (optimal profit per scenario), "allocations" (spend per variable and
+        scenario), "gaps" (certified relative gap per scenario), "pool" (distinct allocations
+        found) and "stats" ("solves" includes the spendable_budget solve).
+    Raises:
+        ValueError: If the lower bounds exceed the budget or an exact solve is not optimal.
+    """
+    start = time.perf_counter()
+    profits = np.asarray(profits, dtype=float)
+    scenarios = len(profits)
+    lower_spend = np.array([var.lowerBound * var.multiplier for var in variables], dtype=float)
+    capacity = np.array([np.inf if var.upperBound is None else (var.upperBound - var.lowerBound) * var.multiplier
+                         for var in variables], dtype=float)
+    if lower_spend.sum() > budget:
+        raise ValueError("Lower bounds alone exceed the budget")
+
+    def solve(weights):
+        scenario_vars = [IntegerVariable(var.name, var.lowerBound, var.upperBound, float(p), var.integer, var.multiplier)
+                         for var, p in zip(variables, weights)]
+        _, allocation = solve_optimal(scenario_vars, budget, msgShow)
+        return _allocation_vector(variables, allocation)
+
+    # Bound from the tightened relaxation, then one anchor (the mean scenario) to seed the pool
+    spendable = spendable_budget(variables, budget)
+    upper = relaxation_bounds(profits, lower_spend, capacity, spendable)
+    pool = []
+    lower = np.full(scenarios, -np.inf)
+    choice = np.zeros(scenarios, dtype=int)
+    solved = np.zeros(scenarios, dtype=bool)
+    solves = 1 if all(var.integer for var in variables) else 0
+
+    def add(allocation, anchor):
+        nonlocal lower, upper
+        pool.append(allocation)
+        values = profits @ allocation
+        better = values > lower
+        lower = np.where(better, values, lower)
+        choice[better] = len(pool) - 1
+        upper = np.minimum(upper, anchor_bounds(profits, anchor, anchor @ allocation, lower_spend, capacity, spendable))
+
+    add(solve(profits.mean(axis=0)), profits.mean(axis=0))
+    solves += 1
+    while True:
+        gaps = np.where(solved, 0.0, (upper - lower) / np.maximum(np.abs(upper), 1e-9))
+        worst = int(np.argmax(gaps))
+        if gaps[worst] <= tolerance or (max_solves is not None and solves >= max_solves):
+            break
+        add(solve(profits[worst]), profits[worst])
+        solved[worst] = True
+        solves += 1
+
+    gaps = np.where(solved, 0.0, np.maximum(upper - lower, 0.0) / np.maximum(np.abs(upper), 1e-9))
+    pool = np.array(pool)
+    return {
+        "profits": lower,
+        "allocations": pool[choice],
+        "gaps": gaps,
+        "pool": pool,
+        "stats": {
+            "scenarios": scenarios,
+            "solves": solves,
+            "certified": int((gaps <= tolerance).sum()),
+            "pool_size": len(pool),
+            "max_gap": float(gaps.max()),
+            "elapsed_seconds": time.perf_counter() - start,
+        },
+    }
+
+def summarize_profits(values, quantiles = (5, 25, 50, 75, 95), tail = 5):
+    """
+    Summary of a profit distribution.
+
+    Args:
+        values (ndarray): Profit per scenario.
+        quantiles (tuple): Percentiles to report.
+        tail (float): Percentage of worst and best scenarios averaged for the tail means.
+    Returns:
+        dict: "mean", "std", "min", "max", "p<q>" per quantile, "worst_<tail>_mean" and "best_<tail>_mean".
+    """
+    values = np.sort(np.asarray(values, dtype=float))
+    count = max(1, int(np.ceil(len(values) * tail / 100)))
+    summary = {"mean": float(values.mean()), "std": float(values.std()),
+               "min": float(values[0]), "max": float(values[-1])}
+    for q in quantiles:
+        summary[f"p{q:g}"] = float(np.percentile(values, q))
+    summary[f"worst_{tail:g}_mean"] = float(values[:count].mean())
+    summary[f"best_{tail:g}_mean"] = float(values[-count:].mean())
+    return summary
+
+def summarize_allocations(variables, allocations, top = 5):
+    """
+    Distribution of the optimal allocation across scenarios.
+
+    Args:
+        variables (list[IntegerVariable]): Catalogue, in the column order of allocations.
+        allocations (ndarray): Spend per scenario and variable.
+        top (int): Number of most frequent allocations to list.
+    Returns:
+        dict: "per_variable" (mean, std, p5, p95 and share of scenarios funding it) and
+        "most_common" (allocation dictionaries with their share of scenarios).
+    """
+    per_variable = {}
+    for i, var in enumerate(variables):
+        column = allocations[:, i]
+        per_variable[var.name] = {
+            "mean": float(column.mean()),
+            "std": float(column.std()),
+            "p5": float(np.percentile(column, 5)),
+            "p95": float(np.percentile(column, 95)),
+            "funded_share": float((column > var.lowerBound * var.multiplier).mean()),
+        }
+    distinct, counts = np.unique(allocations, axis=0, return_counts=True)
+    order = np.argsort(-counts)[:top]
+    most_common = [{"allocation": {var.name: float(distinct[k, i]) for i, var in enumerate(variables)},
+                    "share": float(counts[k] / len(allocations))} for k in order]
+    return {"per_variable": per_variable, "most_common": most_common}
+
+class ScenarioEngine:
+    """
+    Profit scenarios sampled once and evaluated at any budget.
+
+    The same scenarios are used for every budget (common random numbers), so returns at
+    different budgets, and therefore different investment paths, are compared fairly.
+    Each budget costs at least two exact solves, so results are memoized per budget; integral
+    catalogues (see shared_tables.is_integral) are memoized per whole budget, since the
+    feasible allocations only change at integer budgets. Budgets may be evaluated from several
+    threads; concurrent calls for the same budget wait for a single evaluation.
+
+    Attributes:
+        variables (list[IntegerVariable]): Catalogue of variables.
+        profits (ndarray): Sampled profit scenarios.
+        statistic (str): Statistic returned by returnFunc: "mean", "p<q>" (e.g. "p5") or
+            "worst_<tail>_mean".
+        tolerance (float): Relative gap under which a known allocation counts as optimal.
+        integral (bool): Whether budgets are floored before evaluation.
+    """
+    def __init__(self, variables = None, distributions = None, scenarios = 1000, seed = None,
+                 statistic = "mean", tolerance = 1e-6, max_solves = None):
+        self.variables = list(LP_PULP.variables_list if variables is None else variables)
+        self.profits = sample_profits(self.variables, distributions or {}, scenarios, seed)
+        self.statistic = statistic
+        self.tolerance = tolerance
+        self.max_solves = max_solves
+        self.integral = is_integral(self.variables)
+        self._results = {}
+        self._lock = threading.Lock()
+        self._budget_locks = {}
+
+    def evaluate(self, Budget):
+        """Return the evaluate_scenarios result for a budget (cached per budget)."""
+        key = float(np.floor(Budget)) if self.integral else round(float(Budget), 9)
+        with self._lock:
+            lock = self._budget_locks.setdefault(key, threading.Lock())
+        with lock:
+            if key not in self._results:
+                self._results[key] = evaluate_scenarios(self.variables, key, self.profits,
+                                                        self.tolerance, self.max_solves)
+        return self._results[key]
+
+    def report(self, Budget, quantiles = (5, 25, 50, 75, 95), tail = 5):
+        """
+        Profit and allocation distributions at a budget.
+
+        Returns:
+            dict: "budget", "profit" (see summarize_profits), "allocation" (see
+            summarize_allocations) and "stats".
+        """
+        result = self.evaluate(Budget)
+        return {
+            "budget": Budget,
+            "profit": summarize_profits(result["profits"], quantiles, tail),
+            "allocation": summarize_allocations(self.variables, result["allocations"]),
+            "stats": result["stats"],
+        }
+
+    def returnFunc(self, Budget):
+        """Scenario statistic of the optimal profit at a budget, in place of LP_optimizeCall."""
+        profits = self.evaluate(Budget)["profits"]
+        if self.statistic == "mean":
+            return float(profits.mean())
+        if self.statistic.startswith("worst_"):
+            tail = float(self.statistic[len("worst_"):-len("_mean")])
+            return summarize_profits(profits, (), tail)[self.statistic]
+        if self.statistic.startswith("p"):
+            return float(np.percentile(profits, float(self.statistic[1:])))
+        raise ValueError(f"Unknown statistic {self.statistic!r}")
+
+    def stats(self):
+        """Totals over every budget evaluated so far."""
+        results = self._results.values()
+        return {
+            "budgets": len(self._results),
+            "scenarios": len(self.profits),
+            "solves": sum(r["stats"]["solves"] for r in results),
+            "scenario_evaluations": sum(r["stats"]["scenarios"] for r in results),
+        }
+
+if __name__ == "__main__":
+    from LP_Interface import addVariablesToModel, Budget
+    addVariablesToModel()
+    engine = ScenarioEngine(distributions={var.name: {"dist": "normal", "std": 0.25 * var.profit}
+                                           for var in LP_PULP.variables_list}, scenarios=5000, seed=0)
+    report = engine.report(Budget)
+    print(f"\n=== Profit scenarios (budget {Budget}) ===")
+    for name, value in report["profit"].items():
+        print(f"{name}: {value:.2f}")
+    for name, summary in report["allocation"]["per_variable"].items():
+        print(f"{name}: mean {summary['mean']:.2f} p5 {summary['p5']:.2f} p95 {summary['p95']:.2f} "
+              f"funded in {summary['funded_share']:.0%} of scenarios")
+    print(f"\nExact solves: {report['stats']['solves']} for {report['stats']['scenarios']} scenarios "
+          f"({report['stats']['elapsed_seconds']:.2f}s)")
@@ -0,0 +1,363 @@
+"""
+shared_tables.py
+
+Budget -> profit/allocation tables for a variable set, published once in shared memory and
+attached zero-copy by every process working on the same catalogue.
+
+- A table covers the budgets 0, step, 2*step, ... up to a maximum budget. Catalogues of
+  integer variables with integer multipliers and bounds are tabulated for every integer budget
+  in one vectorized bounded-knapsack pass; other catalogues are solved budget by budget.
+- Tables live in multiprocessing.shared_memory segments named after the catalogue hash, so
+  processes using the same catalogue find and share the same segment, and a changed catalogue
+  gets a new one.
+- A reference count in the segment header (updated under a file lock) tracks attached processes;
+  the last one to release a table unlinks it. Holders are recorded by process id, so references
+  left by crashed processes are dropped the next time any process attaches or releases.
+  Segments are kept out of Python's resource tracker, which would otherwise unlink them when
+  the first process that touched them exits.
+- SharedTable.returnFunc answers LP_optimizeCall-style lookups for generate.py and
+  value_iteration.py, falling back to the solver on the table's own catalogue for budgets the
+  table does not cover.
+
+Dependencies:
+- LP_PULP.py (variable definitions and solves for non-integral catalogues)
+- NumPy
+
+@author: Mafu
+@date: 2026-10-19
+"""
+
+import contextlib
+import hashlib
+import json
+import os
+import struct
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+import numpy as np
+import LP_PULP
+from LP_PULP import IntegerVariable, solveModel
+from solve_cache import problem_key
+
+MAGIC = b"LPTABLE1"
+# magic, reference count, budgets, variables, metadata length
+HEADER = struct.Struct("<8sqqqq")
+REFCOUNT_OFFSET = 8
+# Process ids holding a reference, so references of crashed processes can be dropped
+MAX_HOLDERS = 1024
+HOLDERS = struct.Struct(f"<{MAX_HOLDERS}q")
+META_OFFSET = HEADER.size + HOLDERS.size
+
+def is_integral(variables):
+    """Whether every feasible spend is an integer (integer variables, multipliers and bounds)."""
+    return all(var.integer and float(var.multiplier).is_integer() and float(var.lowerBound).is_integer()
+               and (var.upperBound is None or float(var.upperBound).is_integer()) for var in variables)
+
+def table_name(variables, max_budget, step = 1):
+    """Shared-memory name of the table for a catalogue and budget grid."""
+    digest = hashlib.sha256(f"{problem_key(variables, max_budget)}:{step!r}".encode()).hexdigest()
+    return f"lptab_{digest[:16]}"
+
+def knapsack_table(variables, max_budget):
+    """
+    Optimal profit and spend allocation for every integer budget 0..max_budget.
+
+    Bounded knapsack by dynamic programming over budgets, with each variable's quantity split
+    into power-of-two chunks; allocations for all budgets are recovered in one vectorized
+    backtrack. Requires an integral catalogue (see is_integral).
+
+    Returns:
+        tuple: (profits, allocations) with shapes (max_budget + 1,) and (max_budget + 1, variables);
+        profits are -inf where the lower bounds do not fit the budget.
+    """
+    max_budget = int(max_budget)
+    lower_spend = sum(int(var.lowerBound) * int(var.multiplier) for var in variables)
+    lower_profit = sum(var.profit * var.lowerBound * var.multiplier for var in variables)
+    capacity = max(max_budget - lower_spend, -1)
+
+    chunks = []  # (variable index, units, weight, value)
+    for i, var in enumerate(variables):
+        weight = int(var.multiplier)
+        if var.profit <= 0 or capacity < weight:
+            continue
+        count = capacity // weight
+        if var.upperBound is not None:
+            count = min(count, int(var.upperBound) - int(var.lowerBound))
+        units = 1
+        while count > 0:
+            take = min(units, count)
+            chunks.append((i, take, take * weight, take * weight * var.profit))
+            count -= take
+            units *= 2
+
+    best = np.zeros(max(capacity, 0) + 1)
+    taken = np.zeros((len(chunks), len(best)), dtype=bool)
+    for k, (_, _, weight, value) in enumerate(chunks):
+        candidate = best[:-weight] + value
+        improves = candidate > best[weight:]
+        taken[k, weight:] = improves
+        best[weight:] = np.where(improves, candidate, best[weight:])
+
+    allocation = np.zeros((len(best), len(variables)))
+    position = np.arange(len(best))
+    for k in range(len(chunks) - 1, -1, -1):
+        i, units, weight, _ = chunks[k]
+        take = taken[k, position]
+        allocation[take, i] += units * variables[i].multiplier
+        position = position - take * weight
+
+    profits = np.full(max_budget + 1, -np.inf)
+    allocations = np.zeros((max_budget + 1, len(variables)))
+    if capacity >= 0:
+        profits[lower_spend:] = best + lower_profit
+        allocations[lower_spend:] = allocation + [var.lowerBound * var.multiplier for var in variables]
+    return profits, allocations
+
+def solved_table(variables, budgets, workers = None):
+    """Optimal profit and spend allocation per budget, solving each budget with CBC (-inf if infeasible)."""
+    required = sum(var.lowerBound * var.multiplier for var in variables)
+    def solve(budget):
+        if budget < required:
+            return -np.inf, [0.0] * len(variables)
+        profit, allocation = solveModel(variables, budget)
+        return profit, [allocation[var.name] for var in variables]
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1) as executor:
+        results = list(executor.map(solve, budgets))
+    return np.array([r[0] for r in results]), np.array([r[1] for r in results], dtype=float).reshape(len(budgets), len(variables))
+
+@contextlib.contextmanager
+def _file_lock(name):
+    """Exclusive lock shared by every process using the same table name."""
+    path = os.path.join(tempfile.gettempdir(), f"{name}.lock")
+    with open(path, "a+b") as f:
+        try:
+            import fcntl
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+        except ImportError:
+            import msvcrt
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+def _untrack(segment):
+    """Keep the resource tracker from unlinking a segment other processes still use."""
+    if os.name == "posix":
+        resource_tracker.unregister(segment._name, "shared_memory")
+
+def _unlink(segment):
+    """Unlink an untracked segment (SharedMemory.unlink also unregisters it from the tracker)."""
+    if os.name == "posix":
+        resource_tracker.register(segment._name, "shared_memory")
+    segment.unlink()
+
+def _alive(pid):
+    if os.name != "posix":
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+def _update_holders(segment, add = False, remove = False):
+    """Add or remove this process as a holder, dropping dead holders; return the reference count."""
+    holders = [pid for pid in HOLDERS.unpack_from(segment.buf, HEADER.size) if pid and _alive(pid)]
+    if remove and os.getpid() in holders:
+        holders.remove(os.getpid())
+    if add:
+        if len(holders) >= MAX_HOLDERS:
+            raise RuntimeError(f"More than {MAX_HOLDERS} references to table {segment.name}")
+        holders.append(os.getpid())
+    HOLDERS.pack_into(segment.buf, HEADER.size, *holders, *[0] * (MAX_HOLDERS - len(holders)))
+    struct.pack_into("<q", segment.buf, REFCOUNT_OFFSET, len(holders))
+    return len(holders)
+
+def reference_count(name):
+    """Number of live processes attached to a table, or 0 if it does not exist."""
+    with _file_lock(name):
+        try:
+            segment = shared_memory.SharedMemory(name)
+        except FileNotFoundError:
+            return 0
+        _untrack(segment)
+        count = _update_holders(segment)
+        segment.close()
+    return count
+
+class SharedTable:
+    """
+    A budget table attached from shared memory.
+
+    Attributes:
+        name (str): Shared-memory segment name.
+        variables (list[IntegerVariable]): Catalogue the table was built for.
+        names (list): Variable names, in the column order of allocations.
+        budgets (ndarray): Tabulated budgets (view into shared memory).
+        profits (ndarray): Optimal profit per budget (view into shared memory).
+        allocations (ndarray): Optimal spend per budget and variable (view into shared memory).
+        step (float): Spacing of the budget grid.
+        integral (bool): Whether optimal values only change at integer budgets.
+    """
+    def __init__(self, segment):
+        self._segment = segment
+        self.name = segment.name
+        magic, _, budgets, variables, meta_length = HEADER.unpack_from(segment.buf, 0)
+        if magic != MAGIC:
+            raise ValueError(f"Shared memory segment {segment.name} is not a solution table")
+        meta = json.loads(bytes(segment.buf[META_OFFSET:META_OFFSET + meta_length]))
+        self.variables = [IntegerVariable(**fields) for fields in meta["variables"]]
+        self.names = [var.name for var in self.variables]
+        self.step = meta["step"]
+        self.integral = meta["integral"]
+        offset = META_OFFSET + meta_length + (-(META_OFFSET + meta_length) % 8)
+        self.budgets = np.ndarray((budgets,), np.float64, segment.buf, offset)
+        self.profits = np.ndarray((budgets,), np.float64, segment.buf, offset + 8 * budgets)
+        self.allocations = np.ndarray((budgets, variables), np.float64, segment.buf, offset + 16 * budgets)
+
+    def index(self, Budget):
+        """Row answering a budget exactly, or None if the table does not cover it."""
+        if Budget < 0 or not len(self.budgets):
+            return None
+        position = (np.floor(Budget) if self.integral else Budget) / self.step
+        row = int(round(position))
+        if abs(position - row) > 1e-9 and not (self.integral and self.step == 1):
+            return None
+        if self.integral and self.step == 1:
+            row = int(np.floor(Budget))
+        return row if row < len(self.budgets) else None
+
+    def lookup(self, Budget):
+        """Return (profit, allocation dictionary) for a covered budget, or None."""
+        row = self.index(Budget)
+        if row is None or not np.isfinite(self.profits[row]):
+            return None
+        return float(self.profits[row]), dict(zip(self.names, self.allocations[row].tolist()))
+
+    def returnFunc(self, Budget):
+        """Optimal profit at a budget, from the table when covered (drop-in for LP_optimizeCall)."""
+        row = self.index(Budget)
+        if row is not None and np.isfinite(self.profits[row]):
+            return float(f"{self.profits[row]:.2f}")
+        return solveModel(self.variables, Budget)[0]
+
+    def release(self):
+        """Detach from the table, unlinking it when no other process is attached."""
+        if self._segment is None:
+            return
+        segment, self._segment = self._segment, None
+        self.budgets = self.profits = self.allocations = None
+        with _file_lock(segment.name):
+            remaining = _update_holders(segment, remove=True)
+            segment.close()
+            if remaining <= 0:
+                _unlink(segment)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+def attach_table(variables = None, max_budget = 1000, step = 1, workers = None):
+    """
+    Attach the shared table of a catalogue, building and publishing it first if no process has.
+
+    Args:
+        variables (list[IntegerVariable]): Catalogue (default: LP_PULP.variables_list).
+        max_budget (float): Largest tabulated budget.
+        step (float): Spacing of the budget grid (integral catalogues with step 1 answer any budget
+            up to max_budget by flooring it).
+        workers (int): Concurrent CBC solves when the catalogue needs the solver.
+    Returns:
+        SharedTable: The attached table; call release() (or use it as a context manager) when done.
+    """
+    if variables is None:
+        variables = LP_PULP.variables_list
+    name = table_name(variables, max_budget, step)
+    with _file_lock(name):
+        try:
+            segment = shared_memory.SharedMemory(name)
+        except FileNotFoundError:
+            segment = _publish(name, variables, max_budget, step, workers)
+        _untrack(segment)
+        _update_holders(segment, add=True)
+    return SharedTable(segment)
+
+def _publish(name, variables, max_budget, step, workers):
+    budgets = np.arange(0, max_budget + step / 2, step, dtype=float)
+    integral = is_integral(variables) and float(step).is_integer()
+    if integral:
+        profits, allocations = knapsack_table(variables, int(budgets[-1]))
+        profits, allocations = profits[::int(step)], allocations[::int(step)]
+    else:
+        profits, allocations = solved_table(variables, budgets.tolist(), workers)
+
+    catalogue = [{"name": var.name, "lowerBound": var.lowerBound, "upperBound": var.upperBound, "profit": var.profit,
+                  "integer": var.integer, "multiplier": var.multiplier} for var in variables]
+    meta = json.dumps({"variables": catalogue, "step": step, "integral": integral}).encode()
+    offset = META_OFFSET + len(meta) + (-(META_OFFSET + len(meta)) % 8)
+    size = offset + 8 * len(budgets) * (2 + len(variables))
+    segment = shared_memory.SharedMemory(name, create=True, size=size)
+    HEADER.pack_into(segment.buf, 0, MAGIC, 0, len(budgets), len(variables), len(meta))
+    segment.buf[META_OFFSET:META_OFFSET + len(meta)] = meta
+    for start, array in ((offset, budgets), (offset + 8 * len(budgets), profits),
+                         (offset + 16 * len(budgets), allocations)):
+        np.ndarray(array.shape, np.float64, segment.buf, start)[...] = array
+    return segment
+
+def destroy_table(variables = None, max_budget = 1000, step = 1):
+    """Unlink a table regardless of its reference count."""
+    if variables is None:
+        variables = LP_PULP.variables_list
+    name = table_name(variables, max_budget, step)
+    with _file_lock(name):
+        try:
+            segment = shared_memory.SharedMemory(name)
+        except FileNotFoundError:
+            return False
+        _untrack(segment)
+        segment.close()
+        _unlink(segment)
+    return True
+
+class SharedTables:
+    """
+    The table of the catalogue currently in use by this process.
+
+    Switching to a different catalogue (or budget grid) releases the previous table, so the
+    last process to move on cleans it up.
+    """
+    def __init__(self, max_budget = 1000, step = 1, workers = None):
+        self.max_budget = max_budget
+        self.step = step
+        self.workers = workers
+        self.table = None
+        self._name = None
+
+    def use(self, variables = None):
+        """Return the shared table for a catalogue, attaching (or publishing) it if needed."""
+        if variables is None:
+            variables = LP_PULP.variables_list
+        name = table_name(variables, self.max_budget, self.step)
+        if name != self._name:
+            self.close()
+            self.table = attach_table(variables, self.max_budget, self.step, self.workers)
+            self._name = name
+        return self.table
+
+    def close(self):
+        """Release the current table."""
+        if self.table is not None:
+            self.table.release()
+        self.table = self._name = None
@@ -0,0 +1,161 @@
+"""
+solve_cache.py
+
+Persistent on-disk cache of solved optimization problems, shared across runs and processes.
+
+- Problems are keyed by a canonical hash of the variable set and the budget.
+- Entries store the maximum profit and the allocation that achieves it.
+- Backed by SQLite in WAL mode, so several worker processes can read and write concurrently
+  (connections come from sqlite_connection.py, shared with the Flask state store).
+- A configurable entry limit is enforced with least-recently-used eviction.
+- Hit/miss counters are kept per cache instance (see SolveCache.stats).
+- Shared by LP_PULP.py and the Flask optimizer_core, which imports it from the installed
+  search/ package (see pyproject.toml).
+
+@author: Mafu
+@date: 2026-10-19
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Optional, Tuple
+from sqlite_connection import ThreadConnections
+
+def problem_key(variables: Iterable, budget: float) -> str:
+    """
+    Compute the canonical hash of a problem.
+
+    Variables may be any objects with name, lowerBound, upperBound, profit, integer and
+    multiplier attributes. Their order does not affect the key.
+
+    Args:
+        variables: Variables of the problem.
+        budget: Budget constraint value.
+
+    Returns:
+        Hex digest identifying the problem.
+    """
+    canonical = sorted(
+        (var.name, var.lowerBound, var.upperBound, float(var.profit), bool(var.integer), var.multiplier)
+        for var in variables
+    )
+    payload = json.dumps([canonical, repr(float(budget))], separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class SolveCache:
+    """
+    SQLite-backed cache of (profit, allocation) results keyed by problem hash.
+
+    Safe to share between threads and between processes using the same file; each thread
+    (and each forked process) opens its own connection.
+
+    Attributes:
+        path: Path of the SQLite database file.
+        max_entries: Maximum number of cached problems before LRU eviction.
+        evict_every: Number of inserts between checks of the entry limit.
+    """
+    def __init__(self, path: str, max_entries: int = 1_000_000, evict_every: int = 100):
+        self.path = path
+        self.max_entries = max_entries
+        self.evict_every = evict_every
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._puts = 0
+        self._connections = ThreadConnections(path)
+        self._lock = threading.Lock()
+
+        connection = self._connection()
+        connection.execute("""
+            CREATE TABLE IF NOT EXISTS solves (
+                key TEXT PRIMARY KEY,
+                profit REAL NOT NULL,
+                allocation TEXT NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        connection.execute("CREATE INDEX IF NOT EXISTS solves_last_used ON solves (last_used)")
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return this thread's connection."""
+        return self._connections.get()
+
+    def get(self, key: str) -> Optional[Tuple[float, Dict[str, float]]]:
+        """
+        Look up a problem.
+
+        Args:
+            key: Problem hash from problem_key.
+
+        Returns:
+            (profit, allocation) if cached, otherwise None.
+        """
+        connection = self._connection()
+        row = connection.execute("SELECT profit, allocation FROM solves WHERE key = ?", (key,)).fetchone()
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        connection.execute("UPDATE solves SET last_used = ? WHERE key = ?", (time.time(), key))
+        return row[0], json.loads(row[1])
+
+    def put(self, key: str, profit: float, allocation: Dict[str, float]) -> None:
+        """
+        Store a solved problem, evicting least-recently-used entries when over the limit.
+
+        Args:
+            key: Problem hash from problem_key.
+            profit: Maximum profit.
+            allocation: Optimal value per variable name.
+        """
+        connection = self._connection()
+        connection.execute(
+            "INSERT OR REPLACE INTO solves (key, profit, allocation, last_used) VALUES (?, ?, ?, ?)",
+            (key, profit, json.dumps(allocation), time.time()))
+        with self._lock:
+            self._puts += 1
+            check = self._puts % self.evict_every == 0
+        if check:
+            self.evict()
+
+    def evict(self) -> int:
+        """
+        Delete least-recently-used entries beyond max_entries.
+
+        Returns:
+            Number of entries deleted.
+        """
+        connection = self._connection()
+        excess = connection.execute("SELECT COUNT(*) FROM solves").fetchone()[0] - self.max_entries
+        if excess <= 0:
+            return 0
+        connection.execute(
+            "DELETE FROM solves WHERE key IN (SELECT key FROM solves ORDER BY last_used LIMIT ?)", (excess,))
+        with self._lock:
+            self.evictions += excess
+        return excess
+
+    def stats(self) -> Dict[str, float]:
+        """Return hit/miss counters for this instance and the number of cached entries."""
+        entries = self._connection().execute("SELECT COUNT(*) FROM solves").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'entries': entries,
+            'max_entries': self.max_entries,
+        }
+
+    def clear(self) -> None:
+        """Delete every cached entry."""
+        self._connection().execute("DELETE FROM solves")
+
+    def close(self) -> None:
+        """Close this thread's connection."""
+        self._connections.close()
@@ -0,0 +1,51 @@
+"""
+sqlite_connection.py
+
+Per-thread SQLite connections for the on-disk stores shared between processes.
+
+- Used by solve_cache.py and the Flask state_store, so both open their database files the
+  same way.
+- Each thread (and each forked process) gets its own connection; a connection inherited
+  through fork is never reused.
+- Connections run in autocommit mode with WAL journaling, so readers proceed while another
+  process writes, and wait up to a timeout for locks instead of failing.
+
+@author: Mafu
+@date: 2026-10-19
+"""
+
+import os
+import sqlite3
+import threading
+
+class ThreadConnections:
+    """
+    Opens and hands out one SQLite connection per thread and process for a database file.
+
+    Attributes:
+        path: Path of the SQLite database file (its directory is created if missing).
+        timeout: Seconds to wait for a lock held by another connection.
+    """
+    def __init__(self, path: str, timeout: float = 30):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def get(self) -> sqlite3.Connection:
+        """Return this thread's connection, reopening it after a fork."""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def close(self) -> None:
+        """Close this thread's connection."""
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
@@ -0,0 +1,215 @@
+"""
+value_iteration.py
+
+Discretized value-iteration engine for the savings/productivity model simulated in generate.py.
+
+- The dynamics of investmentHandler are deterministic and depend only on (productivity, savings),
+  so the horizon problem is a Bellman recursion over a 2-D state grid rather than a tree.
+- The LP optimizer is tabulated once over a budget grid; all backups are vectorized with NumPy.
+- The optimal policy (investment % per state and month) is computed backward, then the best
+  forward path is reconstructed from the initial state using exact LP calls.
+- Runtime grows linearly with the horizon instead of exponentially.
+
+Dependencies:
+- LP_Interface.py (for LP optimization logic)
+- NumPy
+
+@author: Mafu
+@date: 2026-10-19
+"""
+
+import time
+import numpy as np
+from LP_Interface import addVariablesToModel, LP_optimizeCall
+
+# Terminal value functions, matching the metrics reported by generate.find_highest_nodes
+TERMINAL_SCORES = {
+    "savings": lambda productivity, savings: savings,
+    "productivity": lambda productivity, savings: productivity,
+    "sum": lambda productivity, savings: productivity + savings,
+}
+
+def investment_step(productivity, savings, percentage, investmentReturn):
+    """
+    Apply one month of the investmentHandler recurrence (vectorized).
+
+    Args:
+        productivity (float or ndarray): Current productivity values.
+        savings (float or ndarray): Current savings values.
+        percentage (float or ndarray): Percentage of savings to invest (0-100).
+        investmentReturn (float or ndarray): LP return for the invested allocation.
+    Returns:
+        tuple: (newProductivity, newSavings).
+    """
+    fraction = np.asarray(percentage) / 100
+    newSavings = savings - savings * fraction + productivity
+    newProductivity = productivity + investmentReturn
+    return newProductivity, newSavings
+
+def tabulate_returns(max_budget, budget_points = 201, returnFunc = LP_optimizeCall):
+    """
+    Tabulate the LP investment return over an evenly spaced budget grid.
+
+    Args:
+        max_budget (float): Largest budget to tabulate.
+        budget_points (int): Number of grid points (including 0).
+        returnFunc (callable): Function of Budget returning the optimal profit.
+    Returns:
+        tuple: (budgets, returns) as NumPy arrays.
+    """
+    budgets = np.linspace(0.0, max_budget, budget_points)
+    returns = np.array([returnFunc(Budget=float(b)) if b > 0 else 0.0 for b in budgets])
+    return budgets, returns
+
+def state_bounds(levels, productivity, savings, returnFunc = LP_optimizeCall):
+    """
+    Compute per-month bounds on reachable (productivity, savings) states.
+
+    Productivity never decreases and savings never fall below the previous productivity,
+    so lower bounds are immediate. Upper bounds assume the whole savings are invested
+    while also being kept, which over-approximates every real schedule since the LP
+    return is non-decreasing in the budget.
+
+    Args:
+        levels (int): Number of months.
+        productivity (float): Initial productivity.
+        savings (float): Initial savings.
+        returnFunc (callable): Function of Budget returning the optimal profit.
+    Returns:
+        list: (p_low, p_high, s_low, s_high) for months 0..levels.
+    """
+    bounds = [(productivity, productivity, savings, savings)]
+    p_high, s_high = productivity, savings
+    for _ in range(levels):
+        p_high, s_high = p_high + returnFunc(Budget=s_high), s_high + p_high
+        bounds.append((productivity, p_high, productivity, s_high))
+    return bounds
+
+def _interp2d(values, p_axis, s_axis, P, S):
+    """Bilinear interpolation of a grid of values at points (P, S), clamped to the grid."""
+    pi = np.interp(P, p_axis, np.arange(len(p_axis)))
+    si = np.interp(S, s_axis, np.arange(len(s_axis)))
+    p0 = np.minimum(np.floor(pi).astype(int), len(p_axis) - 2) if len(p_axis) > 1 else np.zeros_like(pi, dtype=int)
+    s0 = np.minimum(np.floor(si).astype(int), len(s_axis) - 2) if len(s_axis) > 1 else np.zeros_like(si, dtype=int)
+    p1 = np.minimum(p0 + 1, len(p_axis) - 1)
+    s1 = np.minimum(s0 + 1, len(s_axis) - 1)
+    wp = pi - p0
+    ws = si - s0
+    return ((1 - wp) * (1 - ws) * values[p0, s0] + wp * (1 - ws) * values[p1, s0]
+            + (1 - wp) * ws * values[p0, s1] + wp * ws * values[p1, s1])
+
+def solve_value_iteration(levels = 12, step = 5, productivity = 10, savings = 10, score = "sum",
+                          grid_points = 101, budget_points = 201, returnFunc = LP_optimizeCall):
+    """
+    Compute the optimal investment policy by backward value iteration on a state grid.
+
+    Args:
+        levels (int): Number of months to plan.
+        step (int): Step size for investment percentage (0-100).
+        productivity (float): Initial productivity.
+        savings (float): Initial savings.
+        score (str): Terminal objective, one of "savings", "productivity", "sum".
+        grid_points (int): Grid points per state axis and month.
+        budget_points (int): Budget grid points used to tabulate the LP return.
+        returnFunc (callable): Function of Budget returning the optimal profit.
+    Returns:
+        dict: "policy" (per-month arrays of percentages), "grids" (per-month axes), "value"
+        (per-month value arrays), "path" (reconstructed forward path), "score" and "stats".
+    """
+    if score not in TERMINAL_SCORES:
+        raise ValueError(f"Unknown score {score!r}, expected one of {sorted(TERMINAL_SCORES)}")
+    start = time.perf_counter()
+    terminal = TERMINAL_SCORES[score]
+    # Count only budgets actually solved (zero budgets are answered without the solver)
+    solver_calls = 0
+    def countedReturn(Budget):
+        nonlocal solver_calls
+        solver_calls += 1
+        return returnFunc(Budget=Budget)
+    percentages = np.arange(0, 101, step, dtype=float)
+
+    bounds = state_bounds(levels, productivity, savings, countedReturn)
+    grids = [(np.linspace(p_low, p_high, grid_points if p_high > p_low else 1),
+              np.linspace(s_low, s_high, grid_points if s_high > s_low else 1))
+             for p_low, p_high, s_low, s_high in bounds]
+    budgets, returns = tabulate_returns(max(b[3] for b in bounds), budget_points, countedReturn)
+
+    # Backward recursion: value[t] is the best terminal score reachable from month t
+    value = [None] * (levels + 1)
+    policy = [None] * levels
+    p_axis, s_axis = grids[levels]
+    value[levels] = terminal(*np.meshgrid(p_axis, s_axis, indexing="ij"))
+    for month in range(levels - 1, -1, -1):
+        P, S = np.meshgrid(*grids[month], indexing="ij")
+        # Shape (actions, nP, nS)
+        invested = S[None] * percentages[:, None, None] / 100
+        newP, newS = investment_step(P[None], S[None], percentages[:, None, None],
+                                     np.interp(invested, budgets, returns))
+        candidates = _interp2d(value[month + 1], *grids[month + 1], newP, newS)
+        best = np.argmax(candidates, axis=0)
+        value[month] = np.take_along_axis(candidates, best[None], axis=0)[0]
+        policy[month] = percentages[best]
+
+    path = reconstruct_path(levels, percentages, productivity, savings, grids, value, budgets, returns, countedReturn)
+    return {
+        "policy": policy,
+        "grids": grids,
+        "value": value,
+        "path": path,
+        "score": terminal(path[-1]["productivity"], path[-1]["savings"]),
+        "stats": {
+            "levels": levels,
+            "step": step,
+            "grid_points": grid_points,
+            "budget_points": budget_points,
+            "solver_calls": solver_calls,
+            "elapsed_seconds": time.perf_counter() - start,
+        },
+    }
+
+def reconstruct_path(levels, percentages, productivity, savings, grids, value, budgets, returns, returnFunc = LP_optimizeCall):
+    """
+    Reconstruct the best forward path from the initial state.
+
+    Each month the action is chosen against the interpolated value function, then the
+    transition is applied with an exact LP call so the reported path is not discretized.
+
+    Returns:
+        list: Dictionaries with month, percentage, productivity and savings (month 0 first).
+    """
+    path = [{"month": 0, "percentage": None, "productivity": productivity, "savings": savings}]
+    for month in range(levels):
+        invested = savings * percentages / 100
+        newP, newS = investment_step(productivity, savings, percentages, np.interp(invested, budgets, returns))
+        percentage = float(percentages[np.argmax(_interp2d(value[month + 1], *grids[month + 1], newP, newS))])
+        investmentReturn = returnFunc(Budget=savings * percentage / 100) if percentage > 0 else 0.0
+        productivity, savings = (float(x) for x in investment_step(productivity, savings, percentage, investmentReturn))
+        path.append({"month": month + 1, "percentage": percentage, "productivity": productivity, "savings": savings})
+    return path
+
+def lookup_policy(result, month, productivity, savings):
+    """
+    Look up the investment percentage for a state from a computed policy (nearest grid point).
+
+    Args:
+        result (dict): Return value of solve_value_iteration.
+        month (int): Month of the decision (0-based).
+        productivity (float): Current productivity.
+        savings (float): Current savings.
+    Returns:
+        float: Investment percentage (0-100).
+    """
+    p_axis, s_axis = result["grids"][month]
+    i = int(np.abs(p_axis - productivity).argmin())
+    j = int(np.abs(s_axis - savings).argmin())
+    return float(result["policy"][month][i, j])
+
+if __name__ == "__main__":
+    addVariablesToModel()
+    result = solve_value_iteration(levels=12, step=5)
+    print("\n=== Value Iteration Path ===")
+    for point in result["path"]:
+        print(f"Month: {point['month']} Investment %: {point['percentage']} "
+              f"Productivity: {point['productivity']:.2f} Savings: {point['savings']:.2f}")
+    print(f"\nScore: {result['score']:.2f}")
+    print(f"Solver calls: {result['stats']['solver_calls']} Elapsed: {result['stats']['elapsed_seconds']:.2f}s")